@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+import time
+
+from discord.ext import commands
+
+from database import LatencyStats
+
+logger = logging.getLogger("discord")
+
+# Discord drops interactions that are not acknowledged within 3 seconds
+DEFER_THRESHOLD = float(os.getenv("ACK_DEFER_THRESHOLD", "1.5"))
+
+
+class AckContext(commands.Context):
+    """Context that timestamps its first response and defers at most once.
+
+    `defer()` after the interaction was already acknowledged is a no-op, and
+    `send()` waits for a defer that is still in flight, so cogs can call both
+    freely while AckManager defers in the background.
+    """
+
+    def __init__(self, **attrs):
+        super().__init__(**attrs)
+        self.ack_started = time.perf_counter()
+        self.ack_at = None
+        self.responded_at = None
+        self.auto_deferred = False
+        self.pending_defer = None
+        self.defer_timer = None
+
+    def _acked(self):
+        if self.ack_at is None:
+            self.ack_at = time.perf_counter()
+
+    def cancel_timer(self):
+        if self.defer_timer is not None:
+            self.defer_timer.cancel()
+            self.defer_timer = None
+
+    async def defer(self, *, ephemeral=False):
+        if self.interaction is None:
+            return await super().defer(ephemeral=ephemeral)
+        if self.pending_defer is not None:
+            await self.pending_defer
+            return
+        if self.interaction.response.is_done():
+            return
+        self.cancel_timer()
+        await self._defer(ephemeral)
+
+    async def _defer(self, ephemeral):
+        await super().defer(ephemeral=ephemeral)
+        self._acked()
+
+    def start_defer(self, ephemeral=False):
+        """Acknowledges the interaction in the background while the handler runs"""
+        self.defer_timer = None
+        if self.pending_defer is None and self.ack_at is None and not self.interaction.response.is_done():
+            self.auto_deferred = True
+            self.pending_defer = asyncio.ensure_future(self._defer(ephemeral))
+
+    async def send(self, *args, **kwargs):
+        self.cancel_timer()
+        if self.pending_defer is not None:
+            try:
+                await self.pending_defer
+            except Exception as e:
+                logger.error(f"Background defer failed for /{self.command}: {e}")
+        message = await super().send(*args, **kwargs)
+        self._acked()
+        if self.responded_at is None:
+            self.responded_at = time.perf_counter()
+        return message
+
+
+class AckManager:
+    """Measures time-to-first-ack per command and defers only when needed.
+
+    Every hybrid command invoked through an interaction either answers on
+    its own before `threshold` seconds, or gets deferred in the background
+    when the timer fires. Commands whose recent time to first response
+    (an exponential moving average) is above the threshold are deferred
+    right away, in parallel with the handler's first database reads.
+    Commands can set `extras={"ephemeral": True}` so the automatic defer
+    keeps their replies private.
+    """
+
+    def __init__(self, threshold=DEFER_THRESHOLD, alpha=0.2):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.ack = {}  # command -> LatencyStats of time to first ack
+        self.predicted = {}  # command -> seconds until first real response
+        self.deferred = {}
+
+    def install(self, bot):
+        get_context = bot.get_context
+
+        async def ack_context(origin, *, cls=AckContext):
+            return await get_context(origin, cls=cls)
+
+        # before_invoke/after_invoke are called from the bot-wide hooks in app.py
+        bot.get_context = ack_context
+        bot.acks = self
+
+    async def before_invoke(self, ctx):
+        if not isinstance(ctx, AckContext) or ctx.interaction is None:
+            return
+        name = ctx.command.qualified_name
+        ephemeral = ctx.command.extras.get("ephemeral", False)
+        if self.predicted.get(name, 0.0) >= self.threshold:
+            ctx.start_defer(ephemeral)
+        else:
+            delay = max(0.0, self.threshold - (time.perf_counter() - ctx.ack_started))
+            ctx.defer_timer = asyncio.get_running_loop().call_later(delay, ctx.start_defer, ephemeral)
+
+    async def after_invoke(self, ctx):
+        if not isinstance(ctx, AckContext):
+            return
+        ctx.cancel_timer()
+        name = ctx.command.qualified_name
+        end = time.perf_counter()
+        if ctx.ack_at is not None:
+            stats = self.ack.get(name)
+            if stats is None:
+                stats = self.ack[name] = LatencyStats()
+            stats.record(ctx.ack_at - ctx.ack_started)
+        if ctx.auto_deferred:
+            self.deferred[name] = self.deferred.get(name, 0) + 1
+        # Learn how long the handler takes to produce its real answer
+        took = (ctx.responded_at or end) - ctx.ack_started
+        previous = self.predicted.get(name)
+        self.predicted[name] = took if previous is None else previous + self.alpha * (took - previous)
+
+    def snapshot(self):
+        return {
+            name: {
+                **stats.snapshot(),
+                "deferred": self.deferred.get(name, 0),
+                "predicted_ms": round(self.predicted.get(name, 0.0) * 1000, 1),
+            }
+            for name, stats in sorted(self.ack.items())
+        }
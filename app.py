@@ -1,10 +1,36 @@
+import time
+BOOT_STARTED = time.perf_counter()
+
 import discord
 from discord.ext import commands
 import logging
 import os
+import signal
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import asyncio
+from database import AsyncDatabase
+from cache import DocumentCache
+import schema
+from cooldowns import CooldownService, MongoCooldownBackend
+from log_pipeline import DiscordHandler
+from game_data import GameDataRegistry
+import cluster
+from sync_manager import SyncManager
+from startup import StartupTimer
+import hot_reload
+from counters import GlobalStats
+from ack import AckManager
+from metrics import Instrumentation, METRICS_PORT
+from view_registry import ViewRegistry
+from economy import EconomyEngine
+from timers import TimerScheduler, DEFAULT_POLL_INTERVAL as TIMER_POLL_INTERVAL
+from battle import BattleEngine
+from leaderboard import Leaderboards
+from premium import PremiumService
+
+startup = StartupTimer(BOOT_STARTED)
+startup.mark("import", time.perf_counter() - BOOT_STARTED)
 
 # Load environment variables
 load_dotenv()
@@ -13,142 +39,241 @@ DEV_GUILD_ID = 1364844968375619604  # Your development guild ID
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+
+# Under cluster.py each process runs only the shards it was assigned
+cluster_info = cluster.current()
+if cluster_info:
+    bot = commands.AutoShardedBot(command_prefix="!", intents=intents,
+                                  shard_ids=cluster_info.shard_ids, shard_count=cluster_info.shard_count)
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents)
+# Cluster 0 (or the only process) runs the game-wide background jobs
+primary = not cluster_info or cluster_info.cluster_id == 0
 
 # Setup logging
 LOGGING_CHANNEL_ID = 1364844968375619607
 logger = logging.getLogger("discord")
 logger.setLevel(logging.INFO)
 
-class DiscordHandler(logging.Handler):
-    def __init__(self, bot, channel_id):
-        super().__init__()
-        self.bot = bot
-        self.channel_id = channel_id
-        self.channel = None
-        self.queue = asyncio.Queue()
-        self.task = None
-        
-    async def send(self, message):
-        if self.channel is None:
-            self.channel = self.bot.get_channel(self.channel_id)
-            if self.channel is None:
-                return
-        
-        # Split message if too long
-        if len(message) > 1900:  # Discord message limit is 2000 chars
-            chunks = [message[i:i+1900] for i in range(0, len(message), 1900)]
-            for chunk in chunks:
-                await self.channel.send(chunk)
-                await asyncio.sleep(1)  # Wait between chunks
-        else:
-            await self.channel.send(message)
-
-    async def queue_processor(self):
-        """Background task to process log messages"""
-        while True:
-            # Gather up to 5 messages or wait up to 5 seconds
-            messages = []
-            try:
-                # Get at least one message
-                messages.append(await asyncio.wait_for(self.queue.get(), timeout=5.0))
-                self.queue.task_done()
-                
-                # Try to get more messages without waiting too long
-                for _ in range(4):  # Up to 4 more (5 total)
-                    try:
-                        messages.append(await asyncio.wait_for(self.queue.get(), timeout=0.5))
-                        self.queue.task_done()
-                    except asyncio.TimeoutError:
-                        break
-                
-                # Send the batch
-                if messages:
-                    combined = "\n".join(messages)
-                    await self.send(combined)
-                    # Rate limit ourselves
-                    await asyncio.sleep(2)
-                    
-            except asyncio.TimeoutError:
-                # No messages for a while, just continue the loop
-                continue
-            except Exception as e:
-                print(f"Error in queue processor: {e}")
-                await asyncio.sleep(5)  # Back off on error
-
-    def emit(self, record):
-        """This runs in the logging thread, not in the asyncio loop"""
-        log_entry = self.format(record)
-        
-        # Put in queue for async processing
-        asyncio.run_coroutine_threadsafe(self.queue.put(log_entry), self.bot.loop)
-        
-        # Start the background task if not already running
-        if self.task is None or self.task.done():
-            self.task = self.bot.loop.create_task(self.queue_processor())
+# Records are buffered from import time and shipped once the bot is ready
+discord_handler = DiscordHandler(bot, LOGGING_CHANNEL_ID)
+log_prefix = f"[cluster {cluster_info.cluster_id}] " if cluster_info else ""
+discord_handler.setFormatter(logging.Formatter(log_prefix + '%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+logger.addHandler(discord_handler)
+bot.logger = logger
+
+# Hybrid commands get an AckContext; slow ones are deferred in the background
+acks = AckManager()
+acks.install(bot)
+instrumentation = Instrumentation()
+instrumentation.install(bot)
+
+@bot.before_invoke
+async def before_invoke(ctx):
+    instrumentation.begin(ctx)
+    await acks.before_invoke(ctx)
+
+@bot.after_invoke
+async def after_invoke(ctx):
+    await acks.after_invoke(ctx)
+    instrumentation.end(ctx)
+
+@bot.event
+async def on_app_command_completion(interaction, command):
+    # Slash-only commands (ping, sync) skip the invoke hooks above
+    if not isinstance(command, commands.hybrid.HybridAppCommand):
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        instrumentation.observe_app_command(command.qualified_name, elapsed)
 
 @bot.command(name='reload')
 @commands.is_owner()
-async def reload_cogs(ctx):
-    for file in os.listdir('./commands'):
-        if file.endswith('.py') and not file.startswith('__'):
-            ext = f'commands.{file[:-3]}'
-            try:
-                await bot.unload_extension(ext)
-                await bot.load_extension(ext)
-                await ctx.send(f"🔄 Reloaded `{ext}`")
-                logger.info(f"Reloaded `{ext}`")
-            except Exception as e:
-                await ctx.send(f"❌ Failed to reload `{ext}`")
-                logger.error(f"Failed to reload {ext}: {e}")
+async def reload_cogs(ctx, mode: str = "changed"):
+    # `!reload` swaps only edited cogs (and cogs importing an edited module),
+    # `!reload all` reloads every extension like before
+    report = await bot.hot_reload.reload(force=mode == "all")
     
-    # Sync commands after reload
+    # Sync commands after reload, only if a reloaded cog changed them
+    if report.changed:
+        try:
+            dev_guild = discord.Object(id=DEV_GUILD_ID)
+            result = await bot.command_sync.sync(guild=dev_guild)
+            report.sync = f"{result.count} commands pushed" if result.synced else "unchanged"
+        except Exception as e:
+            report.sync = f"failed ({e})"
+            logger.error(f"Failed to sync commands: {e}")
+    await ctx.send(report.summary())
+
+async def dev_reload_sync(report):
+    # File-watcher mode: push command changes without anyone typing !reload
     try:
-        dev_guild = discord.Object(id=DEV_GUILD_ID)
-        synced = await bot.tree.sync(guild=dev_guild)
-        await ctx.send(f"✅ Synced {len(synced)} commands to dev guild")
+        await bot.command_sync.sync(guild=discord.Object(id=DEV_GUILD_ID))
     except Exception as e:
-        await ctx.send(f"❌ Failed to sync commands: {e}")
         logger.error(f"Failed to sync commands: {e}")
 
+def cog_extensions():
+    return [f'commands.{file[:-3]}' for file in sorted(os.listdir('./commands'))
+            if file.endswith('.py') and not file.startswith('__')]
+
+async def load_cog(ext):
+    try:
+        await bot.load_extension(ext)
+        logger.info(f"Loaded {ext}")
+    except Exception as e:
+        logger.error(f"Error loading {ext}: {e}")
+
 async def load_cogs():
-    for file in os.listdir('./commands'):
-        if file.endswith('.py') and not file.startswith('__'):
-            ext = f'commands.{file[:-3]}'
-            try:
-                await bot.load_extension(ext)
-                logger.info(f"Loaded {ext}")
-            except Exception as e:
-                logger.error(f"Error loading {ext}: {e}")
+    # Extensions are independent, so their setup() calls can overlap
+    with startup.phase("cog load"):
+        await asyncio.gather(*(load_cog(ext) for ext in cog_extensions()))
+
+async def load_game_data():
+    # JSON parsing and validation stay off the event loop
+    with startup.phase("game data"):
+        await asyncio.to_thread(bot.game_data.load)
+    # Edits to data/ are picked up in the background, never inside a command
+    bot.game_data.start()
+
+async def warm_database():
+    with startup.phase("db connect"):
+        try:
+            await bot.db.run("admin.ping", bot.db.db.client.admin.command, "ping")
+        except Exception as e:
+            logger.error(f"MongoDB ping failed: {e}")
+    with startup.phase("index check"):
+        await schema.bootstrap(bot.db)
+    await bot.global_stats.bootstrap()
+    # Clustered workers all flush user counts, cluster 0 alone publishes them
+    bot.global_stats.start(publisher=primary)
+    # Ranks are rebuilt in the background; /leaderboard says so until they are ready
+    bot.loop.create_task(rebuild_leaderboards())
+    # One scheduled production pass for all players, run by a single process
+    if primary:
+        bot.economy.start()
+        bot.premium.start()
+
+async def rebuild_leaderboards():
+    try:
+        await bot.leaderboards.rebuild()
+    except Exception as e:
+        logger.error(f"Failed to build leaderboards: {e}", exc_info=True)
+    bot.leaderboards.start()
+
+async def sync_commands():
+    # Skipped entirely when the command tree is unchanged since the last push
+    with startup.phase("sync"):
+        try:
+            dev_guild = discord.Object(id=DEV_GUILD_ID)
+            result = await bot.command_sync.sync(guild=dev_guild)
+            if result.synced:
+                logger.info(f"Synced {result.count} commands to dev guild ({result.describe()})")
+        except Exception as e:
+            logger.error(f"Failed to sync commands: {e}")
+
+def handle_sigterm():
+    # cluster.py stops and restarts workers with SIGTERM; closing the bot runs the shutdown flushes
+    bot.loop.remove_signal_handler(signal.SIGTERM)
+    bot.loop.create_task(bot.close())
 
 @bot.event
-async def on_ready():
-    handler = DiscordHandler(bot, LOGGING_CHANNEL_ID)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-    
-    # Start the log processing task
-    handler.task = bot.loop.create_task(handler.queue_processor())
+async def setup_hook():
+    # Runs once after login and before connecting to the gateway, so commands
+    # are loaded and synced by the time the bot shows up online
+    try:
+        bot.loop.add_signal_handler(signal.SIGTERM, handle_sigterm)
+    except NotImplementedError:
+        pass  # No loop signal handlers on Windows
+    discord_handler.start()
+    await asyncio.gather(load_game_data(), warm_database(), load_cogs())
+    await asyncio.to_thread(bot.hot_reload.mark_loaded)
+    # Started once the cogs have registered their timer handlers
+    if primary:
+        bot.timers.start()
+    await sync_commands()
+    if METRICS_PORT:
+        bot.metrics_server = await instrumentation.serve(METRICS_PORT)
+    if hot_reload.WATCH:
+        bot.hot_reload.start_watching(on_reload=dev_reload_sync)
+    bot.setup_finished = time.perf_counter()
+    if cluster_info:
+        bot.loop.create_task(cluster_heartbeat())
 
-    bot.logger = logger
+async def cluster_heartbeat():
+    # A blocked loop stops the beats, and the coordinator restarts this process
+    while True:
+        cluster.beat(ready=bot.is_ready(), guilds=len(bot.guilds), latency=round(bot.latency, 3))
+        await asyncio.sleep(cluster.HEARTBEAT_INTERVAL)
 
+@bot.event
+async def on_ready():
     print(f"{bot.user} is online!")
     logger.info(f"{bot.user} is online!")
     
-    # Load all cogs first
-    await load_cogs()
+    # on_ready fires again after every gateway reconnect; only report once
+    if bot.started:
+        return
+    bot.started = True
     
-    # Then sync commands AFTER all cogs are loaded
-    try:
-        dev_guild = discord.Object(id=DEV_GUILD_ID)
-        synced = await bot.tree.sync(guild=dev_guild)
-        logger.info(f"Synced {len(synced)} commands to dev guild")
-    except Exception as e:
-        logger.error(f"Failed to sync commands: {e}")
+    startup.mark("gateway", time.perf_counter() - bot.setup_finished)
+    print(startup.report())
+    logger.info(f"Startup took {startup.total():.2f}s: {startup.snapshot()['phases_ms']}")
+    await asyncio.to_thread(startup.save)
 
 # MongoDB setup
 mongo_uri = os.getenv("MONGO_URI")
-bot.db = MongoClient(mongo_uri)["Forgelegion"]
+# The document cache is per process with no cross-process invalidation, so
+# clustered workers read through to Mongo instead of serving stale copies
+bot.db = AsyncDatabase(MongoClient(mongo_uri)["Forgelegion"], cache=None if cluster_info else DocumentCache())
+
+# Cooldowns live on the bot so they survive !reload; the Mongo backend shares them across processes
+use_mongo_cooldowns = os.getenv("COOLDOWN_BACKEND", "mongo" if cluster_info else "memory") == "mongo"
+cooldown_backend = MongoCooldownBackend(bot.db["cooldowns"]) if use_mongo_cooldowns else None
+bot.cooldowns = CooldownService(backend=cooldown_backend)
+
+# Signups are counted on striped documents instead of one hot globaldata document
+bot.global_stats = GlobalStats(bot.db)
+
+# Flush signups still tallied in this process and spill buffered log records before disconnecting
+bot_close = bot.close
+async def close():
+    try:
+        await bot.global_stats.aclose()
+    except Exception as e:
+        logger.error(f"Failed to flush global stats: {e}")
+    await bot.timers.aclose()
+    # Last, so records logged while shutting down are spilled too
+    try:
+        await discord_handler.aclose()
+    except Exception as e:
+        logger.error(f"Failed to flush the Discord log handler: {e}")
+    await bot_close()
+bot.close = close
+
+# Construction completions, persisted in `timers` and fired in batches by cluster 0,
+# which also polls for the timers the other clusters schedule
+bot.timers = TimerScheduler(bot.db["timers"], poll_interval=TIMER_POLL_INTERVAL if cluster_info else None)
+
+# Batched PvP resolution with faction buffs; results are replayable from battle_log
+bot.battles = BattleEngine(bot.db)
+
+# In-memory ranks for /leaderboard, kept current from the userdata writes themselves
+bot.leaderboards = Leaderboards(bot.db)
+
+# Cached premium checks for every cog; expired trials are reset by one periodic sweep
+bot.premium = PremiumService(bot.db)
+
+# Newest menu per user and kind; sent views are released straight away
+bot.views = ViewRegistry()
+
+# Slash command fingerprints are shared by every process through Mongo
+bot.command_sync = SyncManager(bot, bot.db["command_sync"])
+bot.started = False
+
+# Buildings and emojis are parsed once in setup_hook and hot-swapped when data/ changes
+bot.game_data = GameDataRegistry()
+bot.startup = startup
+bot.hot_reload = hot_reload.HotReloader(bot)
+
+# Building production, settled lazily on read and in scheduled batch passes
+bot.economy = EconomyEngine(bot.db, bot.game_data)
 
 bot.run(TOKEN)
@@ -0,0 +1,12 @@
+import logging
+
+from discord.ext import commands
+
+
+class BaseCog(commands.Cog):
+    """Common base of the command cogs: the bot, its AsyncDatabase and the shared logger"""
+
+    def __init__(self, bot, db):
+        self.bot = bot
+        self.db = db
+        self.logger = getattr(bot, "logger", None) or logging.getLogger("discord")
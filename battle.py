@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import random
+import time
+
+import inventory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger("discord")
+
+# (attack, defense) multipliers, as advertised by /start and /choosefaction
+FACTION_BUFFS = {
+    "Nova Pact": (1.15, 1.0),
+    "Sentinel Order": (1.0, 1.10),
+    "Crimson Reign": (1.05, 1.05),
+}
+
+# Per-unit (attack, defense, hp); `invdata.units` maps unit type to count
+UNIT_STATS = {
+    "infantry": (10, 8, 50),
+    "scout": (4, 3, 20),
+    "artillery": (60, 10, 90),
+    "tank": (45, 30, 220),
+}
+
+ROUNDS = 5
+# Each side's damage per round is scaled by a luck factor in [LUCK_MIN, LUCK_MIN + LUCK_SPREAD)
+LUCK_MIN = 0.85
+LUCK_SPREAD = 0.3
+
+ATTACKER = 0
+DEFENDER = 1
+
+_MASK = (1 << 64) - 1
+
+
+def _mix(x):
+    """SplitMix64 finalizer on a Python int"""
+    z = (x + 0x9E3779B97F4A7C15) & _MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+    return z ^ (z >> 31)
+
+
+def _stream(round_index, side):
+    # Hashed rather than packed next to the seed, so no round of one battle lines up with another seed's
+    return _mix(round_index * 2 + side)
+
+
+def luck(seed, round_index, side):
+    """Deterministic luck for one side of one round of the battle with `seed`"""
+    z = _mix((seed ^ _stream(round_index, side)) & _MASK)
+    return LUCK_MIN + LUCK_SPREAD * ((z >> 11) * 2.0 ** -53)
+
+
+def _luck_array(seeds, round_index, side):
+    # Same arithmetic as luck(); uint64 operations wrap exactly like the masks above
+    z = seeds ^ np.uint64(_stream(round_index, side))
+    z = z + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return LUCK_MIN + LUCK_SPREAD * ((z >> np.uint64(11)).astype(np.float64) * 2.0 ** -53)
+
+
+def army_stats(units, faction="", table=UNIT_STATS):
+    """Total (attack, defense, hp) of a `{unit type: count}` army with its faction buff applied"""
+    attack = defense = hp = 0
+    for unit, count in units.items():
+        stats = table.get(unit)
+        if stats is None or count <= 0:
+            continue
+        attack += stats[0] * count
+        defense += stats[1] * count
+        hp += stats[2] * count
+    attack_buff, defense_buff = FACTION_BUFFS.get(faction, (1.0, 1.0))
+    return (attack * attack_buff, defense * defense_buff, float(hp))
+
+
+def resolve_one(attacker, defender, seed, rounds=ROUNDS):
+    """One battle; returns (winner, attacker hp left, defender hp left).
+
+    Both sides strike at once each round. Damage is the side's attack,
+    scaled by its remaining strength, its luck and the share its attack has
+    against the other side's defense. The side with the larger share of its
+    hp left wins; the defender keeps ties.
+    """
+    a_attack, a_defense, a_hp0 = attacker
+    d_attack, d_defense, d_hp0 = defender
+    a_hp, d_hp = a_hp0, d_hp0
+    a_full, d_full = max(a_hp0, 1.0), max(d_hp0, 1.0)
+    for r in range(rounds):
+        a_strength = a_hp / a_full
+        d_strength = d_hp / d_full
+        to_defender = a_attack * a_strength * luck(seed, r, ATTACKER) * (a_attack / max(a_attack + d_defense, 1.0))
+        to_attacker = d_attack * d_strength * luck(seed, r, DEFENDER) * (d_attack / max(d_attack + a_defense, 1.0))
+        a_hp = max(a_hp - to_attacker, 0.0)
+        d_hp = max(d_hp - to_defender, 0.0)
+    winner = ATTACKER if a_hp / a_full > d_hp / d_full else DEFENDER
+    return winner, a_hp, d_hp
+
+
+def resolve_batch(attackers, defenders, seeds, rounds=ROUNDS):
+    """Vectorized resolve_one over many battles.
+
+    `attackers` and `defenders` are lists of army_stats() tuples and
+    `seeds` one int per battle. Returns (winners, attacker hp, defender hp)
+    lists. The NumPy path performs the same float64 operations in the same
+    order as resolve_one(), so a single battle replayed from its seed gives
+    the identical result.
+    """
+    if np is None:
+        results = [resolve_one(a, d, s, rounds) for a, d, s in zip(attackers, defenders, seeds)]
+        return [r[0] for r in results], [r[1] for r in results], [r[2] for r in results]
+
+    a = np.asarray(attackers, dtype=np.float64).reshape(-1, 3)
+    d = np.asarray(defenders, dtype=np.float64).reshape(-1, 3)
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    a_attack, a_defense, a_hp = a[:, 0], a[:, 1], a[:, 2].copy()
+    d_attack, d_defense, d_hp = d[:, 0], d[:, 1], d[:, 2].copy()
+    a_full, d_full = np.maximum(a[:, 2], 1.0), np.maximum(d[:, 2], 1.0)
+    # The attack shares do not change between rounds
+    a_share = a_attack / np.maximum(a_attack + d_defense, 1.0)
+    d_share = d_attack / np.maximum(d_attack + a_defense, 1.0)
+    for r in range(rounds):
+        to_defender = a_attack * (a_hp / a_full) * _luck_array(seeds, r, ATTACKER) * a_share
+        to_attacker = d_attack * (d_hp / d_full) * _luck_array(seeds, r, DEFENDER) * d_share
+        a_hp = np.maximum(a_hp - to_attacker, 0.0)
+        d_hp = np.maximum(d_hp - to_defender, 0.0)
+    winners = np.where(a_hp / a_full > d_hp / d_full, ATTACKER, DEFENDER)
+    return winners.tolist(), a_hp.tolist(), d_hp.tolist()
+
+
+class BattleEngine:
+    """Resolves many player-vs-player battles per call.
+
+    Armies are read for all participants with two `$in` queries, every
+    battle is resolved in one resolve_batch() call off the event loop, and
+    the `battles`/`wins` counters are applied with a single unordered
+    `bulk_write`. Each battle gets its own seed, stored with the armies in
+    the `battle_log` collection so any result can be replayed with
+    resolve_one().
+    """
+
+    def __init__(self, db, rounds=ROUNDS, log=True):
+        self.userdata = db["userdata"]
+        self.invdata = db["invdata"]
+        self.battle_log = db["battle_log"]
+        self.rounds = rounds
+        self.log = log
+        self.resolved = 0
+        self.last_batch = {}
+
+    async def _armies(self, user_ids):
+        users, inventories = await asyncio.gather(
+            self.userdata.find({"userid": {"$in": user_ids}}, {"userid": 1, "faction": 1}),
+            self.invdata.find({"userid": {"$in": user_ids}}, {"userid": 1, "units": 1}),
+        )
+        factions = {user["userid"]: user.get("faction", "") for user in users}
+        units = {inv_data["userid"]: inventory.unit_counts(inv_data) for inv_data in inventories}
+        # Only registered players can fight
+        return {
+            user_id: (army_stats(units.get(user_id, {}), faction), faction)
+            for user_id, faction in factions.items()
+        }
+
+    async def fight(self, matchups, seed=None):
+        """Resolves `(attacker_id, defender_id)` pairs; returns one result dict per fought battle"""
+        started = time.perf_counter()
+        base = random.getrandbits(52) if seed is None else seed
+        armies = await self._armies(list({user_id for pair in matchups for user_id in pair}))
+        fought = [
+            (attacker, defender, base + i) for i, (attacker, defender) in enumerate(matchups)
+            if attacker != defender and attacker in armies and defender in armies
+        ]
+        if not fought:
+            return []
+
+        attackers = [armies[attacker][0] for attacker, _, _ in fought]
+        defenders = [armies[defender][0] for _, defender, _ in fought]
+        seeds = [battle_seed for _, _, battle_seed in fought]
+        compute = time.perf_counter()
+        winners, attacker_hp, defender_hp = await asyncio.to_thread(resolve_batch, attackers, defenders, seeds, self.rounds)
+        compute = time.perf_counter() - compute
+
+        now = int(time.time())
+        results = []
+        totals = {}
+        for (attacker, defender, battle_seed), winner, a_left, d_left in zip(fought, winners, attacker_hp, defender_hp):
+            winner_id = attacker if winner == ATTACKER else defender
+            results.append({
+                "attacker": attacker, "defender": defender, "winner": winner_id, "seed": battle_seed,
+                "attacker_hp": round(a_left, 2), "defender_hp": round(d_left, 2), "at": now,
+            })
+            for user_id in (attacker, defender):
+                battles, wins = totals.get(user_id, (0, 0))
+                totals[user_id] = (battles + 1, wins + (user_id == winner_id))
+
+        # One write per player however many battles they were in
+        await self.userdata.bulk_update(
+            (({"userid": user_id}, {"$inc": {"battles": battles, "wins": wins}}) for user_id, (battles, wins) in totals.items()),
+            ordered=False,
+        )
+        if self.log:
+            try:
+                await self.battle_log.insert_many([
+                    dict(result,
+                         armies=[armies[result["attacker"]][0], armies[result["defender"]][0]],
+                         factions=[armies[result["attacker"]][1], armies[result["defender"]][1]],
+                         rounds=self.rounds)
+                    for result in results
+                ], ordered=False)
+            except Exception as e:
+                # The counters are already applied; a missing log only loses replays
+                logger.error(f"Failed to write battle log: {e}", exc_info=True)
+
+        self.resolved += len(results)
+        self.last_batch = {
+            "battles": len(results),
+            "compute_ms": round(compute * 1000, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        return results
+
+    def snapshot(self):
+        return {"numpy": np is not None, "resolved": self.resolved, "last_batch": self.last_batch}
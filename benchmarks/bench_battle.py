@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import importlib.util
+import random
+import time
+
+# Battles per second for N concurrent matchups. Part one resolves them with
+# resolve_batch() (NumPy when installed) and with one resolve_one() per
+# battle, and checks both agree bit for bit. Part two runs
+# BattleEngine.fight() against the in-memory Mongo stand-in, which needs
+# pymongo for the bulk request objects; the stand-in scans per write, so it
+# uses a smaller population.
+# Run with: python -m benchmarks.bench_battle
+
+
+def make_army(rng, table):
+    return {unit: rng.randrange(0, 60) for unit in table if rng.random() < 0.8}
+
+
+def make_matchups(rng, players, count):
+    matchups = []
+    while len(matchups) < count:
+        attacker, defender = rng.sample(range(players), 2)
+        matchups.append((str(attacker), str(defender)))
+    return matchups
+
+
+async def end_to_end(players, matchups, latency):
+    from benchmarks.memory_mongo import MemoryDatabase
+    from battle import BattleEngine
+    from database import AsyncDatabase
+    from models import new_inventory, new_user
+
+    memory = MemoryDatabase(latency)
+    for user_id, units, faction in players:
+        memory["userdata"].insert_one(dict(new_user(user_id), faction=faction))
+        memory["invdata"].insert_one(dict(new_inventory(user_id), units=units))
+    memory["userdata"].calls = 0
+    db = AsyncDatabase(memory)
+
+    engine = BattleEngine(db)
+    start = time.perf_counter()
+    results = await engine.fight(matchups, seed=7)
+    elapsed = time.perf_counter() - start
+    battles = sum(doc["battles"] for doc in memory["userdata"].docs)
+    print(f"BattleEngine.fight : {len(results) / elapsed:10.0f} battles/s  {engine.last_batch}  "
+          f"userdata round-trips {memory['userdata'].calls}  battles recorded {battles // 2}")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matchups", type=int, default=10_000)
+    parser.add_argument("--players", type=int, default=5_000)
+    parser.add_argument("--db-players", type=int, default=1_000, help="population for the end-to-end run")
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    import battle
+
+    rng = random.Random(3)
+    factions = list(battle.FACTION_BUFFS) + [""]
+    players = [(str(i), make_army(rng, battle.UNIT_STATS), rng.choice(factions)) for i in range(args.players)]
+    matchups = make_matchups(rng, args.players, args.matchups)
+
+    by_id = {user_id: battle.army_stats(units, faction) for user_id, units, faction in players}
+    attackers = [by_id[attacker] for attacker, _ in matchups]
+    defenders = [by_id[defender] for _, defender in matchups]
+    seeds = [7 + i for i in range(len(matchups))]
+
+    start = time.perf_counter()
+    batched = battle.resolve_batch(attackers, defenders, seeds)
+    batch_s = time.perf_counter() - start
+    start = time.perf_counter()
+    single = [battle.resolve_one(a, d, s) for a, d, s in zip(attackers, defenders, seeds)]
+    single_s = time.perf_counter() - start
+    assert list(zip(*batched)) == single, "batched and replayed battles disagree"
+
+    print(f"{args.matchups} matchups, numpy {'on' if battle.np is not None else 'off'}")
+    print(f"resolve_batch      : {args.matchups / batch_s:10.0f} battles/s  ({batch_s * 1000:.1f} ms)")
+    print(f"resolve_one loop   : {args.matchups / single_s:10.0f} battles/s  ({single_s * 1000:.1f} ms)")
+    print(f"attacker win rate  : {batched[0].count(battle.ATTACKER) / args.matchups:.1%}")
+
+    db_players = min(args.db_players, args.players)
+    db_matchups = make_matchups(rng, db_players, db_players * 2)
+    asyncio.run(end_to_end(players[:db_players], db_matchups, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    if importlib.util.find_spec("pymongo") is None:
+        raise SystemExit("pymongo is not installed; battle.py builds pymongo bulk requests")
+    main()
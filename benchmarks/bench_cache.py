@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.memory_mongo import MemoryDatabase
+from cache import DocumentCache
+from database import AsyncDatabase
+
+# Replays back-to-back command sessions (tutorial -> choosefaction -> build ->
+# profile) and counts how many Mongo reads the document cache removes.
+# Run with: python -m benchmarks.bench_cache
+
+
+async def session(db, user_id):
+    userdata = db["userdata"]
+    invdata = db["invdata"]
+    await userdata.find_one({"userid": user_id})  # /tutorial
+    user = await userdata.find_one({"userid": user_id})  # /choosefaction
+    if not user["faction"]:
+        await userdata.update_one({"userid": user_id}, {"$set": {"faction": "Nova Pact"}})
+    await userdata.find_one({"userid": user_id})  # /build
+    await invdata.find_one({"userid": user_id})
+    await userdata.find_one({"userid": user_id})  # /profile
+
+
+async def run(label, cache, users, sessions, latency):
+    memory = MemoryDatabase(latency=latency)
+    for i in range(users):
+        memory["userdata"].insert_one({"userid": str(i), "faction": "", "gold": 1000})
+        memory["invdata"].insert_one({"userid": str(i), "buildings": []})
+    memory["userdata"].calls = memory["invdata"].calls = 0
+
+    db = AsyncDatabase(memory, max_workers=32, cache=cache)
+    rng = random.Random(7)
+    start = time.perf_counter()
+    for _ in range(sessions // 100):
+        await asyncio.gather(*(session(db, str(rng.randrange(users))) for _ in range(100)))
+    elapsed = time.perf_counter() - start
+    reads = sum(stats["count"] for name, stats in db.metrics.snapshot().items() if name.endswith("find_one"))
+    print(f"{label:10} {sessions / elapsed:8.0f} sessions/s  Mongo reads {reads:7}")
+    if cache is not None:
+        print(f"  {cache.snapshot()}")
+    db.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    await run("no cache", None, args.users, args.sessions, args.latency_ms / 1000)
+    await run("cached", DocumentCache(max_entries=args.max_entries), args.users, args.sessions, args.latency_ms / 1000)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import cluster
+from game_data import GameData
+
+# Gateway throughput with shards split over 1..N worker processes. Each
+# worker replays a mocked gateway: MESSAGE_CREATE payloads for its shards are
+# decoded and answered with a rendered /build page, which is the CPU-bound
+# part of handling an event. Optionally crashes one worker once to show the
+# coordinator restarting it.
+# Run with: python -m benchmarks.bench_cluster
+
+
+def make_data(count):
+    rng = random.Random(5)
+    buildings = {f"Building {i}": {"id": i, "description": f"Generated building number {i}",
+                                   "Steel": rng.randrange(50, 2000), "Oil": rng.randrange(50, 2000),
+                                   "Gold": rng.randrange(50, 2000)} for i in range(count)}
+    return GameData(buildings, {"steel": "⚙️", "oil": "🛢️", "gold": "💰"}, 1)
+
+
+def render_page(data, page_num, user_data):
+    # The dict form of BuildCommand.create_building_embed, without discord
+    building = data.buildings[page_num]
+    return {
+        "title": f"Building: {building.name}",
+        "description": building.description,
+        "color": 0x00aaff,
+        "fields": [{"name": f"{label} {emoji}",
+                    "value": f"{amount}  {'✅' if user_data.get(resource, 0) >= amount else '❌'}",
+                    "inline": True}
+                   for resource, label, emoji, amount in building.requirements],
+        "footer": {"text": f"Building {page_num + 1}/{len(data.buildings)}"},
+    }
+
+
+def fake_gateway_worker(info, heartbeats):
+    events = int(os.environ["BENCH_EVENTS_PER_SHARD"])
+    crash_marker = os.environ.get("BENCH_CRASH_MARKER")
+    if crash_marker and info.cluster_id == 0 and not os.path.exists(crash_marker):
+        open(crash_marker, "w").close()
+        os._exit(1)
+
+    data = make_data(200)
+    rng = random.Random(info.cluster_id)
+    start = time.perf_counter()
+    handled = 0
+    for shard_id in info.shard_ids:
+        for i in range(events):
+            raw = json.dumps({"op": 0, "t": "MESSAGE_CREATE", "s": i, "d": {
+                "guild_id": str(shard_id), "author": {"id": str(rng.randrange(10**17, 10**18))},
+                "content": f"!build {rng.randrange(len(data.buildings))}"}})
+            event = json.loads(raw)
+            page = int(event["d"]["content"].split()[1])
+            user = {"steel": rng.randrange(2500), "oil": rng.randrange(2500), "gold": rng.randrange(2500)}
+            json.dumps(render_page(data, page, user))
+            handled += 1
+            if handled % 5000 == 0:
+                cluster.beat(events=handled)
+    cluster.beat(events=handled, seconds=time.perf_counter() - start, done=True)
+    # Give the queue's feeder thread time to flush the last beat
+    time.sleep(0.2)
+
+
+def run(shards, clusters, events, crash):
+    os.environ["BENCH_EVENTS_PER_SHARD"] = str(events)
+    if crash:
+        os.environ["BENCH_CRASH_MARKER"] = os.path.join(tempfile.mkdtemp(), "crashed")
+    else:
+        os.environ.pop("BENCH_CRASH_MARKER", None)
+
+    coordinator = cluster.ClusterCoordinator(shards, clusters, target=fake_gateway_worker, min_backoff=0.1)
+    start = time.perf_counter()
+    coordinator.run(poll_interval=0.05)
+    elapsed = time.perf_counter() - start
+    snapshot = coordinator.snapshot()
+    handled = sum(worker["stats"].get("events", 0) for worker in snapshot)
+    restarts = sum(worker["restarts"] for worker in snapshot)
+    print(f"{clusters} cluster(s): {handled} events in {elapsed:5.2f}s = {handled / elapsed:8.0f} events/s  restarts {restarts}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--events", type=int, default=20_000, help="events per shard")
+    parser.add_argument("--clusters", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--crash", action="store_true", help="kill cluster 0 once to exercise restarts")
+    args = parser.parse_args()
+
+    print(f"{args.shards} shards, {args.events} events per shard, {os.cpu_count()} CPUs")
+    for clusters in args.clusters:
+        run(args.shards, clusters, args.events, args.crash)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from cooldowns import CooldownService, CooldownStore
+
+# Memory per million users on cooldown and raw checks per second, compared
+# with the old per-cog dict of datetime deadlines that was never pruned.
+# Run with: python -m benchmarks.bench_cooldowns
+
+
+def measure(fill):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = fill()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+
+def legacy_fill(users):
+    cooldowns = {}
+    for i in range(users):
+        cooldowns[str(i)] = datetime.now() + timedelta(seconds=15)
+    return cooldowns
+
+
+def store_fill(users):
+    store = CooldownStore(max_entries=users)
+    now = time.monotonic()
+    for i in range(users):
+        store.set("build", str(i), 15, now)
+    return store
+
+
+async def checks_per_second(users, checks):
+    service = CooldownService(CooldownStore())
+    ids = [str(i % users) for i in range(checks)]
+    start = time.perf_counter()
+    for user_id in ids:
+        await service.check("build", user_id, 15)
+    return checks / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--checks", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    scale = 1_000_000 / args.users
+    _, legacy_bytes = measure(lambda: legacy_fill(args.users))
+    print(f"legacy dict     : {legacy_bytes * scale / 2**20:8.1f} MiB per million users (never freed)")
+    store, store_bytes = measure(lambda: store_fill(args.users))
+    print(f"CooldownStore   : {store_bytes * scale / 2**20:8.1f} MiB per million users while on cooldown")
+    store.prune(time.monotonic() + 16)
+    print(f"  after expiry  : {len(store)} entries, heap {len(store.heap)}")
+
+    rate = asyncio.run(checks_per_second(args.users, args.checks))
+    print(f"checks/s        : {rate:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
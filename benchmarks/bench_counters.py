@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks.memory_mongo import MemoryDatabase, MemoryCollection
+from counters import StripedCounter
+from database import AsyncDatabase
+
+# Signup-wave write throughput for the global user counter: one `$inc` per
+# signup on the single globaldata document versus random stripes versus the
+# in-process tally flushed on an interval. Mongo serialises writes to one
+# document, which is modelled by holding a per-document lock for
+# --doc-write-ms on every update.
+# Run with: python -m benchmarks.bench_counters
+
+
+class ContendedCollection(MemoryCollection):
+    def __init__(self, name, latency, hold):
+        super().__init__(name, latency)
+        self.hold = hold
+        self.doc_locks = defaultdict(threading.Lock)
+
+    def update_one(self, query, update, upsert=False, **kwargs):
+        with self.doc_locks[repr(sorted(query.items()))]:
+            time.sleep(self.hold)
+            return super().update_one(query, update, upsert, **kwargs)
+
+
+class ContendedDatabase(MemoryDatabase):
+    def __init__(self, latency, hold):
+        super().__init__(latency)
+        self.hold = hold
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = ContendedCollection(name, self.latency, self.hold)
+        return self.collections[name]
+
+
+async def signup_wave(signups, concurrency, register):
+    queue = list(range(signups))
+
+    async def worker():
+        while queue:
+            queue.pop()
+            await register()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--signups", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--doc-write-ms", type=float, default=0.5)
+    parser.add_argument("--stripes", type=int, default=16)
+    args = parser.parse_args()
+
+    def database():
+        return AsyncDatabase(ContendedDatabase(args.latency_ms / 1000, args.doc_write_ms / 1000), max_workers=args.concurrency)
+
+    # Old path: every signup increments the one globaldata document
+    db = database()
+    globaldata = db["globaldata"]
+    await globaldata.insert_one({"owner": "alphayg", "users": 0})
+    elapsed = await signup_wave(args.signups, args.concurrency,
+                                lambda: globaldata.update_one({"owner": "alphayg"}, {"$inc": {"users": 1}}))
+    count = (await globaldata.find_one({"owner": "alphayg"}))["users"]
+    print(f"single document : {args.signups / elapsed:8.0f} signups/s  total {count}  writes {args.signups}")
+
+    db = database()
+    counter = StripedCounter(db["counters"], "users", stripes=args.stripes)
+    elapsed = await signup_wave(args.signups, args.concurrency, counter.add)
+    print(f"{args.stripes} stripes      : {args.signups / elapsed:8.0f} signups/s  total {await counter.total(exact=True)}  "
+          f"writes {args.signups}")
+
+    db = database()
+    counter = StripedCounter(db["counters"], "users", stripes=args.stripes, flush_interval=0.05)
+    counter.start()
+
+    async def tally():
+        counter.increment()
+        await asyncio.sleep(0)
+
+    elapsed = await signup_wave(args.signups, args.concurrency, tally)
+    await counter.aclose()
+    print(f"tally + flush   : {args.signups / elapsed:8.0f} signups/s  total {await counter.total(exact=True)}  "
+          f"writes {counter.flushes}")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        await counter.total()
+    print(f"cached total()  : {(time.perf_counter() - start) * 1000:.2f} us per read")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
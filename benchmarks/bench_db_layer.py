@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.memory_mongo import MemoryDatabase
+from database import AsyncDatabase
+
+# Load test: N concurrent simulated commands, each doing the read + write
+# pair a typical cog performs. Compares calling pymongo directly from the
+# coroutine (what the cogs used to do) with the shared AsyncDatabase layer.
+# Run with: python -m benchmarks.bench_db_layer
+
+
+async def heartbeat(stop, lags, interval=0.01):
+    # Stand-in for the gateway heartbeat: measures how late the loop wakes us
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def blocking_command(db, user_id):
+    user = db["userdata"].find_one({"userid": user_id})
+    db["userdata"].update_one({"userid": user_id}, {"$inc": {"exp": 1}})
+    return user
+
+
+async def async_command(db, user_id):
+    user = await db["userdata"].find_one({"userid": user_id})
+    await db["userdata"].update_one({"userid": user_id}, {"$inc": {"exp": 1}})
+    return user
+
+
+async def run(command, db, concurrency):
+    stop = asyncio.Event()
+    lags = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(command(db, str(i % 1000)) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, max(lags, default=0.0)
+
+
+def seed(memory, users=1000):
+    for i in range(users):
+        memory["userdata"].insert_one({"userid": str(i), "exp": 0})
+    memory["userdata"].calls = 0
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    memory = MemoryDatabase(latency=args.latency_ms / 1000)
+    seed(memory)
+    elapsed, lag = await run(blocking_command, memory, args.commands)
+    print(f"blocking pymongo : {args.commands / elapsed:8.0f} cmd/s  max loop lag {lag * 1000:8.1f} ms")
+
+    db = AsyncDatabase(memory, max_workers=args.workers)
+    elapsed, lag = await run(async_command, db, args.commands)
+    print(f"AsyncDatabase    : {args.commands / elapsed:8.0f} cmd/s  max loop lag {lag * 1000:8.1f} ms")
+    for name, stats in db.metrics.snapshot().items():
+        print(f"  {name:22} {stats}")
+    db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import importlib.util
+import random
+import time
+
+from models import RESOURCES
+
+# Production settlement for a synthetic population. Part one times the
+# accrual maths alone for a large population (NumPy batch when installed,
+# per-player Python otherwise). Part two runs a full EconomyEngine.tick()
+# against the in-memory Mongo stand-in and compares it with settling every
+# player through their own update_one, which is what per-user timers cost.
+# Part two needs pymongo for the bulk request objects.
+# Run with: python -m benchmarks.bench_economy
+
+BUILDINGS = ["Oil Refinery", "Steel Foundry", "Grain Silos", "Armory", "Research Lab"]
+
+
+def make_data():
+    from game_data import GameData
+    return GameData({name: {"id": i + 1, "Steel": 100} for i, name in enumerate(BUILDINGS)}, {}, 1)
+
+
+def make_population(players, now, rng):
+    population = []
+    for i in range(players):
+        owned = rng.sample(range(1, len(BUILDINGS) + 1), rng.randrange(0, len(BUILDINGS) + 1))
+        buildings = [{"id": building_id, "since": now - rng.randrange(0, 86_400)} for building_id in owned]
+        population.append((str(i), now - rng.randrange(0, 7_200), buildings))
+    return population
+
+
+class Registry:
+    def __init__(self, data):
+        self.data = data
+
+    def current(self):
+        return self.data
+
+
+async def end_to_end(population, now, latency):
+    from benchmarks.memory_mongo import MemoryDatabase
+    from database import AsyncDatabase
+    from economy import EconomyEngine, accrue, needs_settle, settle_update
+
+    def seeded():
+        memory = MemoryDatabase(latency)
+        for user_id, settled, buildings in population:
+            memory["userdata"].insert_one({"userid": user_id, "economy_at": settled, **{r: 0 for r in RESOURCES}})
+            memory["invdata"].insert_one({"userid": user_id, "buildings": buildings})
+        memory["userdata"].calls = memory["invdata"].calls = 0
+        return memory, AsyncDatabase(memory)
+
+    data = make_data()
+    memory, db = seeded()
+    engine = EconomyEngine(db, Registry(data), batch_size=1000)
+    stats = await engine.tick(now)
+    total = sum(doc.get("oil", 0) for doc in memory["userdata"].docs)
+    print(f"batched tick      : {stats['total_ms']:8.1f} ms  userdata round-trips {memory['userdata'].calls:6}  oil credited {total}")
+    db.close()
+
+    # One read-modify-write per player, like a per-user production timer
+    memory, db = seeded()
+    table = engine.table
+    start = time.perf_counter()
+
+    async def settle(user_id):
+        inventory = await db["invdata"].find_one({"userid": user_id})
+        user = await db["userdata"].find_one({"userid": user_id})
+        amounts, carry = accrue(inventory["buildings"], user["economy_at"], table, now, carry=user.get("economy_carry"))
+        amounts = [amounts[r] for r in RESOURCES]
+        if needs_settle(user["economy_at"], amounts):
+            await db["userdata"].update_one(*settle_update(user_id, user["economy_at"], amounts, carry, now))
+
+    await asyncio.gather(*(settle(user_id) for user_id, _, _ in population))
+    elapsed = time.perf_counter() - start
+    total = sum(doc.get("oil", 0) for doc in memory["userdata"].docs)
+    print(f"per-player settle : {elapsed * 1000:8.1f} ms  userdata round-trips {memory['userdata'].calls:6}  oil credited {total}")
+    db.close()
+
+
+async def frequent_settles(now):
+    # /profile settles on every call: a Research Lab (20 intel/h) checked every
+    # two minutes must still pay 20 an hour, and a player from before the
+    # economy (no economy_at, buildings with since 0) must start producing
+    from benchmarks.memory_mongo import MemoryDatabase
+    from database import AsyncDatabase
+    from economy import EconomyEngine
+
+    memory = MemoryDatabase()
+    start = now - 3 * 3600
+    memory["userdata"].insert_one({"userid": "new", "economy_at": start, "intel": 0})
+    memory["invdata"].insert_one({"userid": "new", "buildings": [{"id": 5, "since": start}]})
+    memory["userdata"].insert_one({"userid": "legacy", "intel": 0})
+    memory["invdata"].insert_one({"userid": "legacy", "buildings": [{"id": 5}]})
+    db = AsyncDatabase(memory)
+    engine = EconomyEngine(db, Registry(make_data()))
+    for clock in range(start, now + 1, 120):
+        await engine.settle_user("new", now=clock)
+        await engine.settle_user("legacy", now=clock)
+    intel = {doc["userid"]: doc["intel"] for doc in memory["userdata"].docs}
+    print(f"settled every 120s for 3h: intel {intel['new']} (expected 60), from before the economy {intel['legacy']} (expected 60)")
+    assert intel == {"new": 60, "legacy": 60}
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=300_000, help="population for the compute benchmark")
+    parser.add_argument("--db-players", type=int, default=3_000, help="population for the end-to-end run")
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    import economy
+
+    rng = random.Random(11)
+    now = int(time.time())
+    table = economy.production_table(make_data())
+    population = make_population(args.players, now, rng)
+    rows = [(settled, buildings, None) for _, settled, buildings in population]
+
+    start = time.perf_counter()
+    batched = economy.accrue_batch(rows, table, now)
+    batch_s = time.perf_counter() - start
+    start = time.perf_counter()
+    looped = [economy.accrue(buildings, settled, table, now, carry=carry) for settled, buildings, carry in rows]
+    looped = ([[amounts[r] for r in RESOURCES] for amounts, _ in looped], [carry for _, carry in looped])
+    loop_s = time.perf_counter() - start
+    assert batched == looped
+    print(f"{args.players} players, numpy {'on' if economy.np is not None else 'off'}")
+    print(f"accrue_batch      : {batch_s * 1000:8.1f} ms  ({args.players / batch_s:10.0f} players/s)")
+    print(f"per-player accrue : {loop_s * 1000:8.1f} ms  ({args.players / loop_s:10.0f} players/s)")
+
+    asyncio.run(end_to_end(population[:args.db_players], now, args.latency_ms / 1000))
+    asyncio.run(frequent_settles(now))
+
+
+if __name__ == "__main__":
+    if importlib.util.find_spec("pymongo") is None:
+        raise SystemExit("pymongo is not installed; economy.py builds pymongo bulk requests")
+    main()
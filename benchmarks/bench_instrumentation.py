@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from benchmarks.memory_mongo import MemoryDatabase
+from cache import DocumentCache
+from database import AsyncDatabase
+from metrics import Instrumentation
+from models import user_fields
+
+# Hot-path cost of the per-command instrumentation: a /profile-shaped
+# handler (one cached userdata read) with and without begin()/end() around
+# it, plus the cost of rendering the Prometheus text.
+# Run with: python -m benchmarks.bench_instrumentation
+
+FIELDS = user_fields("faction", "exp", "gold")
+
+
+def fake_ctx(name):
+    return SimpleNamespace(command=SimpleNamespace(qualified_name=name), command_failed=False)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=50_000)
+    args = parser.parse_args()
+
+    db = AsyncDatabase(MemoryDatabase(), cache=DocumentCache())
+    userdata = db["userdata"]
+    await userdata.insert_one({"userid": "1", "faction": "Nova Pact", "exp": 1, "gold": 2})
+
+    async def handler():
+        await FIELDS.fetch(userdata, "1")
+
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        await handler()
+    bare = (time.perf_counter() - start) / args.calls
+
+    instrumentation = Instrumentation()
+    names = [f"command{i % 8}" for i in range(args.calls)]
+
+    async def instrumented(name):
+        ctx = fake_ctx(name)
+        instrumentation.begin(ctx)
+        try:
+            await handler()
+        finally:
+            instrumentation.end(ctx)
+
+    start = time.perf_counter()
+    for name in names:
+        # Each command runs in its own task in discord.py, which gives the span its own context
+        await asyncio.create_task(instrumented(name))
+    wrapped = (time.perf_counter() - start) / args.calls
+
+    start = time.perf_counter()
+    for name in names:
+        await asyncio.create_task(handler())
+    tasked = (time.perf_counter() - start) / args.calls
+
+    print(f"bare handler        : {bare * 1e6:6.2f} us/call")
+    print(f"handler in a task   : {tasked * 1e6:6.2f} us/call")
+    print(f"instrumented + task : {wrapped * 1e6:6.2f} us/call  (overhead {(wrapped - tasked) * 1e6:.2f} us)")
+    start = time.perf_counter()
+    text = instrumentation.render_prometheus()
+    print(f"prometheus render   : {(time.perf_counter() - start) * 1000:.2f} ms for {text.count(chr(10))} lines")
+    db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
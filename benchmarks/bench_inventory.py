@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import inventory
+
+# Document size and lookup cost of the array inventory layout (version 1)
+# against the keyed one (version 2), for players with growing numbers of
+# buildings and recruitment batches, then a lazy migration followed by
+# concurrent $inc recruits against the in-memory Mongo stand-in.
+# Sizes are JSON bytes, a close stand-in for BSON here.
+# Run with: python -m benchmarks.bench_inventory
+
+UNIT_TYPES = ["infantry", "scout", "artillery", "tank"]
+
+
+def legacy_document(rng, buildings, batches):
+    return {
+        "userid": "1",
+        "buildings": [{"id": i, "name": f"Building {i}", "since": 1_700_000_000 + i} for i in range(buildings)],
+        "units": [{"type": rng.choice(UNIT_TYPES), "count": rng.randrange(1, 50)} for _ in range(batches)],
+        "timedowns": [],
+    }
+
+
+def keyed_document(legacy):
+    document = {"userid": legacy["userid"]}
+    update = inventory.migration(legacy)
+    for field, value in update["$set"].items():
+        document[field] = value
+    return document
+
+
+def per_call(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def migrate_and_recruit(recruits, latency):
+    from benchmarks.memory_mongo import MemoryDatabase
+    from database import AsyncDatabase
+
+    memory = MemoryDatabase(latency)
+    legacy = legacy_document(random.Random(1), 20, 200)
+    expected = sum(unit["count"] for unit in legacy["units"] if unit["type"] == "infantry") + recruits
+    memory["invdata"].insert_one(legacy)
+    db = AsyncDatabase(memory)
+
+    start = time.perf_counter()
+    # Every recruit races the lazy migration; only one of them performs it
+    await asyncio.gather(*(inventory.recruit(db["invdata"], "1", "infantry", 1) for _ in range(recruits)))
+    elapsed = time.perf_counter() - start
+    document = memory["invdata"].docs[0]
+    infantry = document["units"].get("infantry", 0)
+    print(f"migration + {recruits} concurrent recruits: {elapsed * 1000:.0f} ms, infantry {infantry} (expected {expected}), "
+          f"version {document['inv_version']}, legacy arrays left: {'buildings' in document}")
+    assert infantry == expected
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--recruits", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = random.Random(4)
+    print(f"{'buildings':>9} {'batches':>8}  {'v1 bytes':>9} {'v2 bytes':>9}  {'v1 owns us':>10} {'v2 owns us':>10}  "
+          f"{'v1 count us':>11} {'v2 count us':>11}")
+    for buildings, batches in ((10, 10), (50, 1_000), (60, 10_000), (60, 50_000)):
+        legacy = legacy_document(rng, buildings, batches)
+        keyed = keyed_document(legacy)
+        legacy_size = len(json.dumps(legacy))
+        keyed_size = len(json.dumps(keyed))
+        # Probe the last building, the worst case for the array scan
+        probe = buildings - 1
+        v1_owns = per_call(lambda i: any(b.get("id") == probe for b in legacy["buildings"]), args.calls)
+        v2_owns = per_call(lambda i: inventory.owns(keyed, probe), args.calls)
+        calls = max(10, args.calls // max(1, batches // 100))
+        v1_count = per_call(lambda i: sum(u["count"] for u in legacy["units"] if u["type"] == "tank"), calls)
+        v2_count = per_call(lambda i: inventory.unit_counts(keyed).get("tank", 0), args.calls)
+        print(f"{buildings:>9} {batches:>8}  {legacy_size:>9} {keyed_size:>9}  {v1_owns:>10.2f} {v2_owns:>10.2f}  "
+              f"{v1_count:>11.1f} {v2_count:>11.2f}")
+
+    asyncio.run(migrate_and_recruit(args.recruits, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
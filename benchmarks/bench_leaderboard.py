@@ -0,0 +1,75 @@
+import argparse
+import bisect
+import random
+import time
+
+from leaderboard import Leaderboard
+
+# Rank, top-10 and update cost of a Leaderboard at growing populations, up
+# to one million players. Rank and update times should grow with log(n)
+# while the naive approach (sort everyone per request, which is what
+# sort().limit() plus a count of higher scores costs the database) grows
+# with n. Ranks are checked against a brute-force count on a sample.
+# Run with: python -m benchmarks.bench_leaderboard
+
+
+def scores(rng, players):
+    # Long-tailed like exp or gold: most players low, a few very high
+    return [(str(i), int(rng.paretovariate(1.2) * 100) - 100) for i in range(players)]
+
+
+def per_call(func, args):
+    start = time.perf_counter()
+    for arg in args:
+        func(arg)
+    return (time.perf_counter() - start) / len(args) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    sizes = [size for size in (1_000, 10_000, 100_000, 1_000_000) if size < args.players] + [args.players]
+    print(f"{'players':>9}  {'load s':>7}  {'rank us':>8}  {'update us':>9}  {'top10 us':>8}  {'naive rank ms':>13}")
+    for size in sizes:
+        rows = scores(rng, size)
+        board = Leaderboard("exp")
+        start = time.perf_counter()
+        board.load(rows)
+        load_s = time.perf_counter() - start
+
+        sample = [rng.choice(rows)[0] for _ in range(args.queries)]
+        rank_us = per_call(board.rank, sample)
+
+        def update(user_id):
+            board.add(user_id, rng.randrange(-50, 500))
+        update_us = per_call(update, sample)
+
+        def top(_):
+            board.top_cache.clear()
+            board.top(10)
+        top_us = per_call(top, range(min(args.queries, 2_000)))
+
+        # Brute force: sort every score and count the higher ones
+        start = time.perf_counter()
+        naive_queries = 5
+        for user_id in sample[:naive_queries]:
+            ordered = sorted(board.scores.values())
+            len(ordered) - bisect.bisect_right(ordered, board.scores[user_id])
+        naive_ms = (time.perf_counter() - start) / naive_queries * 1000
+
+        ordered = sorted(board.scores.values())
+        for user_id in sample[:200]:
+            expected = len(ordered) - bisect.bisect_right(ordered, board.scores[user_id]) + 1
+            assert board.rank(user_id) == expected, (user_id, board.rank(user_id), expected)
+        leader = board.top(1)[0]
+        assert leader[2] == ordered[-1] and leader[0] == 1
+
+        print(f"{size:>9}  {load_s:>7.2f}  {rank_us:>8.2f}  {update_us:>9.2f}  {top_us:>8.1f}  {naive_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
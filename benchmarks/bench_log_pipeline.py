@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from log_pipeline import DiscordHandler
+
+# Floods the Discord log handler with an error burst while a fake channel
+# answers slowly and rate-limits every few sends. Reports how long emit()
+# holds the caller, how far the event loop falls behind and where the
+# records ended up.
+# Run with: python -m benchmarks.bench_log_pipeline
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"429, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class FakeChannel:
+    def __init__(self, every=5):
+        self.every = every
+        self.sent = []
+
+    async def send(self, message):
+        await asyncio.sleep(0.05)
+        if len(self.sent) % self.every == self.every - 1 and not getattr(self, "limited", False):
+            self.limited = True
+            raise RateLimited(0.2)
+        self.limited = False
+        assert len(message) <= 2000
+        self.sent.append(message)
+
+
+class FakeBot:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def get_channel(self, channel_id):
+        return self.channel
+
+    async def wait_until_ready(self):
+        return None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--capacity", type=int, default=5_000)
+    parser.add_argument("--drain-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    fallback = os.path.join(tempfile.mkdtemp(), "fallback.log")
+    channel = FakeChannel()
+    handler = DiscordHandler(FakeBot(channel), 0, capacity=args.capacity, fallback_path=fallback,
+                             linger=0.05, min_interval=0.05)
+    handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+    logger = logging.getLogger("bench.discord")
+    logger.propagate = False
+    logger.addHandler(handler)
+    handler.start()
+
+    lags = []
+
+    async def heartbeat():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    for i in range(args.records):
+        logger.error(f"Error in /build: simulated failure #{i}")
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+    emit_us = (time.perf_counter() - start) / args.records * 1e6
+    await asyncio.sleep(args.drain_seconds)
+    beat.cancel()
+    await handler.aclose()
+
+    print(f"emit cost        : {emit_us:.2f} us/record")
+    print(f"max loop lag     : {max(lags) * 1000:.1f} ms")
+    print(f"messages sent    : {len(channel.sent)} (avg {sum(map(len, channel.sent)) / max(1, len(channel.sent)):.0f} chars)")
+    print(f"handler stats    : {handler.snapshot()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.memory_mongo import MemoryDatabase
+from cache import DocumentCache
+from database import AsyncDatabase
+from premium import PremiumService, is_active
+
+# One million players, most holding a premium expiry spread over the next
+# few hours. A simulated clock advances sweep by sweep; after every sweep
+# each document is checked: nobody expired keeps premium and nobody active
+# loses it. Each sweep is one update_many round-trip however many expire.
+# The stand-in has no secondary indexes, so its sweep scans every player;
+# on Mongo it reads only the expired range of the partial premium index.
+# Cached documents are checked to agree with the store after the sweeps,
+# and a sweep that downgrades nobody to leave the cache alone. Then
+# is_premium() is timed cold and cached.
+# Run with: python -m benchmarks.bench_premium
+
+
+def seed(memory, players, now, spread, share, rng):
+    docs = []
+    for i in range(players):
+        expiry = int(now + rng.uniform(0, spread)) if rng.random() < share else 0
+        docs.append({"userid": str(i), "premium": expiry, "exp": 0})
+    memory["userdata"].insert_many(docs)
+
+
+def audit(memory, now):
+    kept = active = 0
+    for doc in memory["userdata"].store.values():
+        expiry = doc["premium"]
+        if 0 < expiry <= now:
+            kept += 1
+        elif expiry > now:
+            active += 1
+    return kept, active
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--share", type=float, default=0.8, help="fraction of players holding premium")
+    parser.add_argument("--spread-hours", type=float, default=6)
+    parser.add_argument("--sweeps", type=int, default=6)
+    parser.add_argument("--checks", type=int, default=2_000)
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    now = int(time.time())
+    memory = MemoryDatabase()
+    start = time.perf_counter()
+    seed(memory, args.players, now, args.spread_hours * 3600, args.share, rng)
+    expiries = {doc["userid"]: doc["premium"] for doc in memory["userdata"].store.values()}
+    print(f"seeded {args.players} players in {time.perf_counter() - start:.1f}s")
+
+    cache = DocumentCache(max_entries=args.checks * 2)
+    db = AsyncDatabase(memory, cache=cache)
+    service = PremiumService(db)
+    # Cached documents as /profile reads would leave them
+    cached = [str(rng.randrange(args.players)) for _ in range(args.checks)]
+    for user_id in cached:
+        cache.set(("userdata", user_id), {"userid": user_id, "premium": expiries[user_id], "exp": 0})
+
+    memory["userdata"].calls = 0
+    step = args.spread_hours * 3600 / args.sweeps
+    print(f"{'sweep':>5}  {'downgraded':>10}  {'ms':>8}  {'still active':>12}")
+    for i in range(1, args.sweeps + 1):
+        clock = int(now + step * i)
+        downgraded = await service.sweep(clock)
+        kept, active = audit(memory, clock)
+        expected_active = sum(1 for expiry in expiries.values() if expiry > clock)
+        assert kept == 0, f"{kept} expired players kept premium"
+        assert active == expected_active, f"{expected_active - active} active players lost premium"
+        print(f"{i:>5}  {downgraded:>10}  {service.last_sweep['ms']:>8.0f}  {active:>12}")
+    assert service.downgraded == sum(1 for expiry in expiries.values() if 0 < expiry <= clock)
+    swept = {user_id: 0 if expiries[user_id] <= clock else expiries[user_id] for user_id in cached}
+    stale = 0
+    for user_id in cached:
+        found, document = cache.get(("userdata", user_id))
+        stale += found and document["premium"] != swept[user_id]
+    assert stale == 0, f"{stale} cached documents kept a swept expiry"
+    for user_id in cached:
+        cache.set(("userdata", user_id), {"userid": user_id, "premium": swept[user_id], "exp": 0})
+    cached_before = len(cache.entries)
+    assert await service.sweep(clock) == 0
+    print(f"sweep round-trips {memory['userdata'].calls}, document cache entries kept by an empty sweep {len(cache.entries)}/{cached_before}")
+    assert len(cache.entries) == cached_before
+    db.close()
+
+    # is_premium with a real round-trip latency, first cold then cached
+    memory["userdata"].latency = args.latency_ms / 1000
+    db = AsyncDatabase(memory)
+    service = PremiumService(db)
+    sample = [str(rng.randrange(args.players)) for _ in range(args.checks)]
+    stored = {doc["userid"]: doc["premium"] for doc in memory["userdata"].store.values()}
+    expected = [is_active(stored[user_id]) for user_id in sample]
+    for label in ("uncached", "cached"):
+        start = time.perf_counter()
+        results = [await service.is_premium(user_id) for user_id in sample]
+        elapsed = (time.perf_counter() - start) / len(sample) * 1e6
+        assert results == expected
+        stats = service.snapshot()
+        print(f"is_premium {label:8}: {elapsed:8.1f} us/check  hits {stats['hits']}  misses {stats['misses']}")
+    db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
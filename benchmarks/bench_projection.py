@@ -0,0 +1,53 @@
+import argparse
+import timeit
+
+from models import new_user, new_inventory
+
+# Decode cost of a full document versus the projected fields a command reads,
+# as the per-user document grows. Uses BSON when pymongo is installed and
+# falls back to JSON as a rough proxy otherwise.
+# Run with: python -m benchmarks.bench_projection
+
+try:
+    import bson
+
+    def encode(document):
+        return bson.encode(document)
+
+    decode = bson.decode
+    CODEC = "bson"
+except ImportError:
+    import json
+
+    def encode(document):
+        return json.dumps(document).encode()
+
+    decode = json.loads
+    CODEC = "json"
+
+
+def grown_document(units):
+    document = {**new_user("123456789012345678"), **new_inventory("123456789012345678")}
+    document["units"] = [{"id": i, "name": f"Unit {i}", "level": i % 10, "hp": 100} for i in range(units)]
+    document["timedowns"] = [{"id": i, "due": 1_700_000_000 + i} for i in range(units // 10)]
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"codec: {CODEC}")
+    print(f"{'units':>7} {'full bytes':>11} {'full us':>9} {'proj bytes':>11} {'proj us':>9}")
+    for units in (0, 10, 100, 1000, 5000):
+        document = grown_document(units)
+        full = encode(document)
+        projected = encode({"_id": 1, "tutorial": document["tutorial"]})
+        full_us = timeit.timeit(lambda: decode(full), number=args.repeat) / args.repeat * 1e6
+        proj_us = timeit.timeit(lambda: decode(projected), number=args.repeat) / args.repeat * 1e6
+        print(f"{units:>7} {len(full):>11} {full_us:>9.1f} {len(projected):>11} {proj_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
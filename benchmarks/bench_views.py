@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+# Per-command cost of building the /build and /choosefaction button menus:
+# the old pattern of defining View subclasses inside the command body versus
+# instantiating the module-level DynamicItems, and the memory held per player
+# with an open menu. Needs discord.py installed.
+# Run with: python -m benchmarks.bench_views
+
+try:
+    import discord
+except ImportError:
+    discord = None
+
+
+def legacy_views(author_id):
+    # Mirrors the classes the old /build and /choosefaction defined per call
+    class BuildingView(discord.ui.View):
+        def __init__(self):
+            super().__init__(timeout=60)
+            self.current_page = 0
+
+        async def interaction_check(self, interaction):
+            return interaction.user.id == author_id
+
+        @discord.ui.button(label="◀️", style=discord.ButtonStyle.green, disabled=True)
+        async def prev_button(self, interaction, button):
+            pass
+
+        @discord.ui.button(label="Construct", style=discord.ButtonStyle.red)
+        async def construct_button(self, interaction, button):
+            pass
+
+        @discord.ui.button(label="▶️", style=discord.ButtonStyle.green)
+        async def next_button(self, interaction, button):
+            pass
+
+    class FactionButtons(discord.ui.View):
+        def __init__(self):
+            super().__init__(timeout=30)
+            self.value = None
+
+        @discord.ui.button(label="Nova Pact", style=discord.ButtonStyle.blurple)
+        async def nova_button(self, interaction, button):
+            pass
+
+        @discord.ui.button(label="Sentinel Order", style=discord.ButtonStyle.green)
+        async def sentinel_button(self, interaction, button):
+            pass
+
+        @discord.ui.button(label="Crimson Reign", style=discord.ButtonStyle.red)
+        async def crimson_button(self, interaction, button):
+            pass
+
+    return BuildingView(), FactionButtons()
+
+
+def module_views(author_id, data, cog):
+    expires = int(time.time()) + 60
+    return cog.menu_view(data, author_id, 0, expires), faction_view(author_id, expires)
+
+
+def measure(label, func, calls):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    keep = [func(i) for i in range(calls)]
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    print(f"{label:<14}: {elapsed / calls * 1e6:7.1f} us/command  {allocated / calls / 1024:6.1f} KiB/command retained")
+    return keep
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2_000)
+    parser.add_argument("--buildings", type=int, default=50)
+    args = parser.parse_args()
+
+    from game_data import GameData
+
+    data = GameData({f"Building {i}": {"id": i, "Steel": 100} for i in range(args.buildings)}, {}, 1)
+    cog = BuildCommand.__new__(BuildCommand)
+
+    # Views need a running loop; warm both paths before measuring
+    legacy_views(0)
+    module_views(0, data, cog)
+    measure("per-call class", legacy_views, args.calls)
+    measure("module items", lambda i: module_views(i, data, cog), args.calls)
+
+    # Memory for open menus: legacy views stay alive until their timeout,
+    # the registry keeps one snowflake per user and releases the views
+    registry = ViewRegistry()
+
+    def open_menu(i):
+        build, faction = module_views(i, data, cog)
+        registry.opened("build", i, i, build)
+        registry.opened("faction", i, i, faction)
+
+    measure("live legacy", legacy_views, args.calls)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(args.calls):
+        open_menu(i)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{'registry':<14}: {retained / args.calls / 1024:6.1f} KiB/player retained  {registry.snapshot()}")
+
+
+if __name__ == "__main__":
+    if discord is None:
+        raise SystemExit("discord.py is not installed; this benchmark builds real discord.ui views")
+    from commands.build import BuildCommand
+    from commands.choosefaction import faction_view
+    from view_registry import ViewRegistry
+    asyncio.run(main())
@@ -0,0 +1,474 @@
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from benchmarks.memory_mongo import MemoryDatabase
+
+# Offline load test for the cogs in commands/. No gateway, token or
+# MONGO_URI: the cogs are loaded into an unconnected commands.Bot wired up
+# like app.py, but on the in-memory Mongo stand-in (with a simulated
+# round-trip latency). Commands are invoked with fake slash (or prefix)
+# contexts, and button presses go through the same from_custom_id ->
+# interaction_check -> callback path discord.py uses for DynamicItems.
+#
+# A mix is a journey of steps, each either a command name or a press on the
+# last menu the player got:
+#   faction    any /choosefaction button
+#   next, prev /build page buttons
+#   construct  "Construct" on the /build menu
+#   confirm    "Yes" on the construction confirmation (cancel for "No")
+# Journeys starting with `start` use a new player; others use one of
+# --players pre-registered players who finished the tutorial. Journeys
+# arrive at random (Poisson) so the steps add up to --rps on average.
+#
+# Reports latency percentiles, Mongo round-trips and time per step, event
+# loop lag, and the most common reply of each step. Needs discord.py and
+# pymongo installed.
+# Run with: python -m benchmarks.load_test --mix onboarding --rps 50
+
+try:
+    import discord
+    from discord.ext import commands
+except ImportError:
+    discord = None
+
+MIXES = {
+    "onboarding": "start,choosefaction,faction,build,construct,confirm,profile",
+    "returning": "profile,build,next,construct,confirm,leaderboard",
+    "browse": "build,next,next,prev,profile",
+}
+
+# press step -> (custom_id prefix, button label or None for any)
+PRESSES = {
+    "faction": ("faction:", None),
+    "next": ("build:page:", "▶️"),
+    "prev": ("build:page:", "◀️"),
+    "construct": ("build:make:", None),
+    "confirm": ("build:yes:", None),
+    "cancel": ("build:no:", None),
+}
+
+# Used when data/buildings.json is absent; affordable with the /start resources
+TUTORIAL_BUILDINGS = {
+    "Oil Refinery": {"id": 1, "description": "Refines oil", "Steel": 300, "Gold": 100},
+    "Steel Foundry": {"id": 2, "description": "Smelts steel", "Oil": 300, "Gold": 100},
+    "Grain Silos": {"id": 3, "description": "Stores food", "Steel": 200, "Oil": 100},
+    "Armory": {"id": 4, "description": "Arms your Legion", "Steel": 400, "Oil": 200, "Gold": 200},
+    "Research Lab": {"id": 5, "description": "Gathers intel", "Gold": 300, "Intel": 50},
+}
+
+logger = logging.getLogger("discord")
+
+_step = ContextVar("load_test_step", default=None)
+# Tells "not passed" from an explicit None, like discord.utils.MISSING
+MISSING = object()
+_snowflakes = None
+
+
+def snowflake():
+    # Time-ordered like Discord's, and unique within a millisecond
+    return next(_snowflakes)
+
+
+class StepCall:
+    __slots__ = ("calls", "db", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.db = 0.0
+        self.errors = 0
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies = []
+        self.calls = 0
+        self.db = 0.0
+        self.errors = 0
+        self.skipped = 0
+        self.outcomes = {}
+
+    def record(self, elapsed, call, outcome):
+        self.latencies.append(elapsed)
+        self.calls += call.calls
+        self.db += call.db
+        self.errors += call.errors
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+
+class ErrorCounter(logging.Handler):
+    """Charges ERROR records to the step running in the current task"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.first = None
+
+    def emit(self, record):
+        call = _step.get()
+        if call is not None:
+            call.errors += 1
+        if self.first is None:
+            self.first = self.format(record)
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class FakeMessage:
+    def __init__(self, content=None, embed=None, view=None, ephemeral=False):
+        self.id = snowflake()
+        self.content = content
+        self.embeds = [embed] if embed is not None else []
+        self.view = view
+        self.ephemeral = ephemeral
+
+    def outcome(self):
+        text = self.embeds[0].title if self.embeds and self.embeds[0].title else (self.content or "")[:48]
+        # Player names, ids and countdowns would make every reply unique
+        return re.sub(r"[0-9]+", "#", text)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, content=None, *, embed=None, view=None, ephemeral=False, **kwargs):
+        self.done = True
+        message = FakeMessage(content, embed, view, ephemeral)
+        self.interaction.replies.append(message)
+        return message
+
+    async def edit_message(self, *, content=MISSING, embed=MISSING, view=MISSING, **kwargs):
+        self.done = True
+        message = self.interaction.message
+        if content is not MISSING:
+            message.content = content
+        if embed is not MISSING:
+            message.embeds = [embed] if embed is not None else []
+        if view is not MISSING:
+            message.view = view
+        self.interaction.replies.append(message)
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+
+class FakeInteraction:
+    def __init__(self, client, user, message=None):
+        self.id = snowflake()
+        self.client = client
+        self.user = user
+        self.message = message
+        self.created_at = datetime.now(timezone.utc)
+        self.response = FakeResponse(self)
+        self.replies = []
+
+
+class FakeContext:
+    """Just enough of commands.Context for the cogs' hybrid commands"""
+
+    def __init__(self, bot, user, command, slash=True):
+        self.bot = bot
+        self.author = user
+        self.command = command
+        self.interaction = FakeInteraction(bot, user) if slash else None
+        self.message = SimpleNamespace(id=snowflake(), author=user)
+        self.replies = []
+
+    async def send(self, content=None, *, embed=None, view=None, ephemeral=False, **kwargs):
+        message = FakeMessage(content, embed, view, ephemeral)
+        self.replies.append(message)
+        return message
+
+
+def fake_user(number):
+    user_id = 10**17 + number
+    return SimpleNamespace(
+        id=user_id, name=f"player{number}", display_name=f"Player {number}", mention=f"<@{user_id}>",
+        display_avatar=SimpleNamespace(url=f"https://cdn.example/avatars/{user_id}.png"),
+    )
+
+
+def find_button(message, prefix, label):
+    if message is None or message.view is None:
+        return None
+    buttons = [
+        child for child in message.view.children
+        if isinstance(child, discord.ui.DynamicItem) and child.custom_id.startswith(prefix)
+        and not child.item.disabled and (label is None or child.item.label == label)
+    ]
+    return random.choice(buttons) if buttons else None
+
+
+async def press(bot, user, message, button):
+    """Dispatches a press the way discord.py's view store does for DynamicItems"""
+    interaction = FakeInteraction(bot, user, message)
+    cls = type(button)
+    match = cls.__discord_ui_compiled_template__.fullmatch(button.custom_id)
+    item = await cls.from_custom_id(interaction, button.item, match)
+    if await item.interaction_check(interaction):
+        await item.callback(interaction)
+    return interaction.replies
+
+
+def count_calls(db):
+    # Charges every Mongo round-trip to the step running in the current task
+    run = db.run
+
+    async def counted(label, func, *args, **kwargs):
+        call = _step.get()
+        started = time.perf_counter()
+        try:
+            return await run(label, func, *args, **kwargs)
+        finally:
+            if call is not None:
+                call.calls += 1
+                call.db += time.perf_counter() - started
+    db.run = counted
+
+
+def game_data_registry(path):
+    from game_data import GameData, GameDataRegistry
+
+    if os.path.exists(path):
+        registry = GameDataRegistry(buildings_path=path)
+        registry.load()
+        return registry
+    registry = GameDataRegistry(buildings_path=path)
+    registry.data = GameData(TUTORIAL_BUILDINGS, {}, 1)
+    # Nothing on disk to watch
+    registry.mtimes = registry._stat()
+    return registry
+
+
+async def build_bot(db, game_data):
+    """An unconnected bot with the services app.py hangs off it"""
+    from battle import BattleEngine
+    from cooldowns import CooldownService
+    from counters import GlobalStats
+    from economy import EconomyEngine
+    from leaderboard import Leaderboards
+    from premium import PremiumService
+    from timers import TimerScheduler
+    from view_registry import ViewRegistry
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = commands.Bot(command_prefix="!", intents=intents)
+    bot.logger = logger
+    bot.db = db
+    bot.cooldowns = CooldownService()
+    bot.global_stats = GlobalStats(db)
+    bot.timers = TimerScheduler(db["timers"])
+    bot.leaderboards = Leaderboards(db)
+    bot.premium = PremiumService(db)
+    bot.views = ViewRegistry()
+    bot.game_data = game_data
+    bot.economy = EconomyEngine(db, game_data)
+    bot.battles = BattleEngine(db)
+
+    # A cog that fails to load would only show up later as an unknown step
+    failed = []
+    for file in sorted(os.listdir("commands")):
+        if file.endswith(".py") and not file.startswith("__"):
+            try:
+                await bot.load_extension(f"commands.{file[:-3]}")
+            except Exception as e:
+                failed.append(f"commands.{file[:-3]}: {e}")
+    if failed:
+        raise SystemExit("Failed to load extensions:\n" + "\n".join(failed))
+    return bot
+
+
+def seed_players(memory, players, factions):
+    from models import new_inventory, new_user
+
+    users, inventories = [], []
+    for number in range(players):
+        user_id = str(fake_user(number).id)
+        user = new_user(user_id)
+        user.update(tutorial=1, faction=factions[number % len(factions)], exp=number % 5000)
+        users.append(user)
+        inventories.append(new_inventory(user_id))
+    memory["userdata"].insert_many(users)
+    memory["invdata"].insert_many(inventories)
+
+
+class LoadTest:
+    def __init__(self, bot, steps, players, slash=True):
+        self.bot = bot
+        self.steps = steps
+        self.players = players
+        self.slash = slash
+        self.new_players = itertools.count(players)
+        self.stats = {step: StepStats() for step in steps}
+        self.journeys = 0
+        self.lag = []
+
+    async def run_step(self, step, user, menu):
+        """Runs one step; returns (outcome, menu for the next press)"""
+        if step in PRESSES:
+            button = find_button(menu, *PRESSES[step])
+            if button is None:
+                return None, menu
+            replies = await press(self.bot, user, menu, button)
+        else:
+            command = self.bot.get_command(step)
+            ctx = FakeContext(self.bot, user, command, slash=self.slash)
+            await command(ctx)
+            replies = ctx.replies
+        if not replies:
+            return "(no reply)", menu
+        # The next press goes to the newest message that still has buttons
+        for message in reversed(replies):
+            if message.view is not None:
+                menu = message
+                break
+        return replies[-1].outcome(), menu
+
+    async def journey(self, think):
+        self.journeys += 1
+        if self.steps[0] == "start":
+            user = fake_user(next(self.new_players))
+        else:
+            user = fake_user(random.randrange(self.players))
+        menu = None
+        for step in self.steps:
+            call = StepCall()
+            token = _step.set(call)
+            started = time.perf_counter()
+            try:
+                outcome, menu = await self.run_step(step, user, menu)
+            except Exception as e:
+                call.errors += 1
+                outcome = f"raised {type(e).__name__}"
+            finally:
+                _step.reset(token)
+            if outcome is None:
+                self.stats[step].skipped += 1
+            else:
+                self.stats[step].record(time.perf_counter() - started, call, outcome)
+            if think:
+                await asyncio.sleep(random.expovariate(1 / think))
+
+    async def watch_loop(self, interval=0.01):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.lag.append(time.perf_counter() - started - interval)
+
+    async def run(self, rps, duration, think):
+        # Journeys start at rps / steps per second so the steps add up to rps
+        rate = rps / len(self.steps)
+        watcher = asyncio.create_task(self.watch_loop())
+        tasks = []
+        started = time.perf_counter()
+        next_at = started
+        while next_at - started < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.journey(think)))
+            next_at += random.expovariate(rate)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        watcher.cancel()
+        return elapsed
+
+
+def report(test, elapsed, memory, errors):
+    total = sum(len(stats.latencies) for stats in test.stats.values())
+    print(f"{test.journeys} journeys, {total} steps in {elapsed:.1f}s ({total / elapsed:.1f}/s)")
+    print(f"{'step':<14}{'n':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'db/op':>7}{'db ms':>7}{'err':>5}{'skip':>6}  top reply")
+    for step, stats in test.stats.items():
+        ordered = sorted(stats.latencies)
+        n = len(ordered)
+        top = max(stats.outcomes.items(), key=lambda item: item[1]) if stats.outcomes else ("", 0)
+        print(
+            f"{step:<14}{n:>7}"
+            f"{percentile(ordered, 50) * 1000:>8.1f}{percentile(ordered, 95) * 1000:>8.1f}"
+            f"{percentile(ordered, 99) * 1000:>8.1f}{(ordered[-1] if ordered else 0) * 1000:>8.1f}"
+            f"{stats.calls / max(n, 1):>7.1f}{stats.db / max(n, 1) * 1000:>7.1f}{stats.errors:>5}{stats.skipped:>6}"
+            f"  {top[0]!r} x{top[1]}"
+        )
+    lag = sorted(test.lag)
+    print(f"loop lag ms   p50 {percentile(lag, 50) * 1000:.2f}  p99 {percentile(lag, 99) * 1000:.2f}  "
+          f"max {(lag[-1] if lag else 0) * 1000:.2f}")
+    print("mongo round-trips " + ", ".join(
+        f"{name} {collection.calls}" for name, collection in sorted(memory.collections.items()) if collection.calls
+    ))
+    if errors.first:
+        print(f"first error:\n{errors.first}")
+
+
+async def main():
+    global _snowflakes
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mix", default="onboarding", help=f"preset ({', '.join(MIXES)}) or comma-separated steps")
+    parser.add_argument("--rps", type=float, default=50, help="target steps per second")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of arrivals")
+    parser.add_argument("--players", type=int, default=2_000, help="pre-registered players")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a player's steps")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="simulated Mongo round-trip")
+    parser.add_argument("--workers", type=int, default=None, help="Mongo thread pool size")
+    parser.add_argument("--prefix", action="store_true", help="invoke as prefix commands instead of slash")
+    parser.add_argument("--no-cache", action="store_true", help="run without the document cache, like clustered mode")
+    parser.add_argument("--buildings", default=os.path.join("data", "buildings.json"))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    from cache import DocumentCache
+    from database import AsyncDatabase
+
+    random.seed(args.seed)
+    _snowflakes = itertools.count(discord.utils.time_snowflake(datetime.now(timezone.utc)))
+    steps = [step.strip() for step in MIXES.get(args.mix, args.mix).split(",") if step.strip()]
+
+    errors = ErrorCounter()
+    errors.setFormatter(logging.Formatter("%(name)s %(levelname)s %(message)s"))
+    logger.addHandler(errors)
+    logger.setLevel(logging.INFO)
+    # Keep per-command INFO lines off the terminal
+    logger.propagate = False
+
+    memory = MemoryDatabase(latency=args.latency_ms / 1000)
+    seed_players(memory, args.players, ("Nova Pact", "Sentinel Order", "Crimson Reign"))
+    kwargs = {"max_workers": args.workers} if args.workers else {}
+    db = AsyncDatabase(memory, cache=None if args.no_cache else DocumentCache(), **kwargs)
+    count_calls(db)
+    bot = await build_bot(db, game_data_registry(args.buildings))
+    unknown = [step for step in steps if step not in PRESSES and bot.get_command(step) is None]
+    if unknown:
+        raise SystemExit(f"Unknown steps: {', '.join(unknown)}")
+    if "leaderboard" in steps:
+        await bot.leaderboards.rebuild()
+    for collection in memory.collections.values():
+        collection.calls = 0
+
+    test = LoadTest(bot, steps, args.players, slash=not args.prefix)
+    print(f"mix {' -> '.join(steps)} at {args.rps:g} steps/s for {args.duration:g}s, "
+          f"{args.players} players, {args.latency_ms:g} ms Mongo latency")
+    elapsed = await test.run(args.rps, args.duration, args.think_ms / 1000)
+    report(test, elapsed, memory, errors)
+    db.close()
+
+
+if __name__ == "__main__":
+    if discord is None:
+        raise SystemExit("discord.py is not installed; the cogs under test import it")
+    asyncio.run(main())
@@ -0,0 +1,396 @@
+import copy
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+# In-memory stand-in for the small slice of the pymongo API the bot uses.
+# `latency` simulates a network round-trip with a blocking sleep, which is
+# exactly what a real pymongo call does to the calling thread. Transactions
+# run one at a time and are rolled back from an undo log if they raise.
+
+_ids = itertools.count(1)
+
+
+def _get(doc, key):
+    parts = key.split(".")
+    for i, part in enumerate(parts):
+        if isinstance(doc, list):
+            # Dotted paths fan out over arrays like they do in Mongo
+            rest = ".".join(parts[i:])
+            return [value for value in (_get(item, rest) for item in doc) if value is not None]
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+def _bitmask(arg):
+    # Like the server: a list of bit positions, or a numeric mask that fits a non-negative int32
+    if isinstance(arg, list):
+        return sum(1 << position for position in set(arg))
+    if not 0 <= arg < 2**31:
+        raise ValueError(f"bitmask {arg} is not representable as a 32-bit signed integer")
+    return arg
+
+
+def _match_value(value, cond):
+    if isinstance(value, list) and isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        if "$ne" in cond and cond["$ne"] in value:
+            return False
+        rest = {k: v for k, v in cond.items() if k != "$ne"}
+        return not rest or any(_match_value(item, rest) for item in value)
+    if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+        for op, arg in cond.items():
+            if op == "$gte" and not (value is not None and value >= arg):
+                return False
+            if op == "$gt" and not (value is not None and value > arg):
+                return False
+            if op == "$lte" and not (value is not None and value <= arg):
+                return False
+            if op == "$lt" and not (value is not None and value < arg):
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$exists" and (value is not None) != bool(arg):
+                return False
+            if op == "$bitsAllClear" and not (isinstance(value, int) and not value & _bitmask(arg)):
+                return False
+            if op == "$bitsAllSet" and not (isinstance(value, int) and value & _bitmask(arg) == _bitmask(arg)):
+                return False
+        return True
+    if isinstance(value, list) and not isinstance(cond, list):
+        return cond in value
+    return value == cond
+
+
+def matches(doc, query):
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif not _match_value(_get(doc, key), cond):
+            return False
+    return True
+
+
+def _set(doc, key, value):
+    parts = key.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set(doc, key, copy.deepcopy(value))
+            elif op == "$inc":
+                _set(doc, key, (_get(doc, key) or 0) + value)
+            elif op == "$push":
+                current = _get(doc, key)
+                if current is None:
+                    current = []
+                    _set(doc, key, current)
+                if isinstance(value, dict) and "$each" in value:
+                    current.extend(copy.deepcopy(value["$each"]))
+                else:
+                    current.append(copy.deepcopy(value))
+            elif op == "$addToSet":
+                current = _get(doc, key)
+                if current is None:
+                    current = []
+                    _set(doc, key, current)
+                if value not in current:
+                    current.append(copy.deepcopy(value))
+            elif op == "$pull":
+                current = _get(doc, key) or []
+                if isinstance(value, dict):
+                    kept = [item for item in current if not (isinstance(item, dict) and matches(item, value))]
+                else:
+                    kept = [item for item in current if item != value]
+                _set(doc, key, kept)
+            elif op == "$unset":
+                parts = key.split(".")
+                parent = _get(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+            elif op == "$bit":
+                current = _get(doc, key) or 0
+                for bitwise, mask in value.items():
+                    current = {"and": current & mask, "or": current | mask, "xor": current ^ mask}[bitwise]
+                _set(doc, key, current)
+            elif op == "$min":
+                current = _get(doc, key)
+                if current is None or value < current:
+                    _set(doc, key, value)
+            elif op == "$max":
+                current = _get(doc, key)
+                if current is None or value > current:
+                    _set(doc, key, value)
+
+
+def project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {key: 1 for key in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include or projection.get("_id") == 1 and len(projection) == 1:
+        result = {k: copy.deepcopy(doc[k]) for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {k: copy.deepcopy(v) for k, v in doc.items() if projection.get(k, 1)}
+
+
+class MemoryCollection:
+    def __init__(self, name, latency=0.0, database=None):
+        self.name = name
+        self.latency = latency
+        self.database = database
+        self.store = {}  # _id -> document, like the _id index every collection has
+        self.by_userid = {}  # userid -> set of _ids, like the userid indexes in schema.py
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def _roundtrip(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def docs(self):
+        return list(self.store.values())
+
+    def _add(self, doc):
+        doc.setdefault("_id", next(_ids))
+        self.store[doc["_id"]] = doc
+        # userid is never rewritten by the bot, so the index only changes on insert and delete
+        if isinstance(doc.get("userid"), str):
+            self.by_userid.setdefault(doc["userid"], set()).add(doc["_id"])
+
+    def _remove(self, doc):
+        del self.store[doc["_id"]]
+        ids = self.by_userid.get(doc.get("userid"))
+        if ids is not None:
+            ids.discard(doc["_id"])
+            if not ids:
+                del self.by_userid[doc["userid"]]
+
+    def _by_userid(self, cond):
+        users = cond["$in"] if isinstance(cond, dict) else [cond]
+        ids = set()
+        for user_id in users:
+            ids.update(self.by_userid.get(user_id, ()))
+        return [self.store[key] for key in sorted(ids)]
+
+    def _candidates(self, query):
+        # Queries on _id or userid (a value or $in) use the index instead of a scan
+        cond = (query or {}).get("_id")
+        if cond is None:
+            cond = (query or {}).get("userid")
+            if isinstance(cond, str) or (isinstance(cond, dict) and set(cond) == {"$in"}):
+                return self._by_userid(cond)
+            return self.store.values()
+        if isinstance(cond, dict):
+            if set(cond) != {"$in"}:
+                return self.store.values()
+            keys = cond["$in"]
+        else:
+            keys = [cond]
+        return [self.store[key] for key in keys if key in self.store]
+
+    def _find(self, query):
+        return [doc for doc in self._candidates(query) if matches(doc, query)]
+
+    def _restore(self, doc_id, before):
+        with self.lock:
+            doc = self.store.get(doc_id)
+            if doc is not None:
+                self._remove(doc)
+            if before is not None:
+                self._add(before)
+
+    def find_one(self, query=None, projection=None, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            for doc in self._candidates(query):
+                if matches(doc, query):
+                    return project(doc, projection)
+        return None
+
+    def find(self, query=None, projection=None, sort=None, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            found = [project(doc, projection) for doc in self._find(query)]
+        for key, direction in reversed(sort or []):
+            found.sort(key=lambda d: (_get(d, key) is None, _get(d, key)), reverse=direction < 0)
+        return _Cursor(found)
+
+    def count_documents(self, query, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            return len(self._find(query))
+
+    def insert_one(self, doc, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            doc.setdefault("_id", next(_ids))
+            self._add(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    def insert_many(self, docs, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            for doc in docs:
+                doc.setdefault("_id", next(_ids))
+                self._add(copy.deepcopy(doc))
+        return SimpleNamespace(inserted_ids=[doc["_id"] for doc in docs], acknowledged=True)
+
+    def _update(self, query, update, upsert, many, session=None):
+        matched = self._find(query)
+        if not many:
+            matched = matched[:1]
+        for doc in matched:
+            if session is not None:
+                session.record(self, doc["_id"], copy.deepcopy(doc))
+            apply_update(doc, update)
+        upserted_id = None
+        if not matched and upsert:
+            doc = {k: copy.deepcopy(v) for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(doc, update, inserting=True)
+            self._add(doc)
+            upserted_id = doc["_id"]
+            if session is not None:
+                session.record(self, upserted_id, None)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched),
+                               upserted_id=upserted_id, acknowledged=True)
+
+    def update_one(self, query, update, upsert=False, session=None, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            return self._update(query, update, upsert, many=False, session=session)
+
+    def update_many(self, query, update, upsert=False, session=None, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            return self._update(query, update, upsert, many=True, session=session)
+
+    def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=False, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            matched = self._find(query)[:1]
+            before = project(matched[0], projection) if matched else None
+            result = self._update(query, update, upsert, many=False)
+            if not return_document:
+                return before
+            if matched:
+                return project(matched[0], projection)
+            if result.upserted_id is not None:
+                return project(self.store[result.upserted_id], projection)
+            return None
+
+    def delete_one(self, query, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            for doc in self._candidates(query):
+                if matches(doc, query):
+                    self._remove(doc)
+                    return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    def delete_many(self, query, **kwargs):
+        self._roundtrip()
+        with self.lock:
+            matched = self._find(query)
+            for doc in matched:
+                self._remove(doc)
+        return SimpleNamespace(deleted_count=len(matched))
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        self._roundtrip()
+        matched = modified = 0
+        with self.lock:
+            for request in requests:
+                # pymongo request objects keep their arguments in private slots
+                kind = type(request).__name__
+                if kind == "InsertOne":
+                    doc = getattr(request, "_doc")
+                    doc.setdefault("_id", next(_ids))
+                    self._add(copy.deepcopy(doc))
+                    continue
+                query = getattr(request, "_filter")
+                update = getattr(request, "_doc")
+                upsert = getattr(request, "_upsert", False)
+                result = self._update(query, update, upsert, many=kind == "UpdateMany")
+                matched += result.matched_count
+                modified += result.modified_count
+        return SimpleNamespace(matched_count=matched, modified_count=modified, acknowledged=True)
+
+
+class _Cursor(list):
+    def limit(self, count):
+        return _Cursor(self[:count]) if count else self
+
+    def sort(self, key, direction=1):
+        ordered = sorted(self, key=lambda d: (_get(d, key) is None, _get(d, key)), reverse=direction < 0)
+        return _Cursor(ordered)
+
+
+class MemorySession:
+    """`ClientSession` stand-in supporting `with_transaction`"""
+
+    def __init__(self, client):
+        self.client = client
+        self.undo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def record(self, collection, doc_id, before):
+        # First touch only: that is the state to roll back to
+        if self.undo is not None and (collection, doc_id) not in self.undo:
+            self.undo[(collection, doc_id)] = before
+
+    def with_transaction(self, callback):
+        with self.client.transactions:
+            self.undo = {}
+            try:
+                return callback(self)
+            except BaseException:
+                for (collection, doc_id), before in reversed(self.undo.items()):
+                    collection._restore(doc_id, before)
+                raise
+            finally:
+                self.undo = None
+
+
+class MemoryDatabase:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.collections = {}
+        self.transactions = threading.Lock()
+
+    @property
+    def client(self):
+        # Collections reach the client through `collection.database.client`, like pymongo's
+        return self
+
+    def start_session(self):
+        return MemorySession(self)
+
+    def __getitem__(self, name):
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = MemoryCollection(name, self.latency, self)
+        return collection
@@ -0,0 +1,132 @@
+import copy
+import os
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+DEFAULT_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_TTL = float(os.getenv("CACHE_TTL", "300"))
+
+
+def approx_size(value):
+    # Cheap stand-in for the BSON size; good enough to enforce a memory budget
+    return len(repr(value))
+
+
+class DocumentCache:
+    """In-process LRU + TTL cache for per-user documents.
+
+    Keys are `(collection, userid)`. Values are stored and returned as deep
+    copies so cogs can mutate what they get back. Reads that race a write
+    for the same key are never stored, so a stale document cannot land in
+    the cache after the write invalidated it.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires_at, size, document, known fields or None if full)
+        self.bytes = 0
+        self.inflight = {}
+        self.versions = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, fields=None):
+        """Returns `(found, document)`; `document` may be None for cached misses.
+
+        Entries can hold a partial document from a projected read; those only
+        count as a hit when they cover every requested field.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        expires_at, size, document, known = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        if document is not None and known is not None and (fields is None or not known.issuperset(fields)):
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, copy.deepcopy(document)
+
+    def set(self, key, document, fields=None):
+        known = None if fields is None or document is None else set(fields) | {"_id"}
+        entry = self.entries.get(key)
+        if known is not None and entry is not None and entry[2] is not None and entry[3] is not None:
+            # Widen an existing partial entry instead of replacing it
+            document = {**entry[2], **document}
+            known |= entry[3]
+        self._drop(key)
+        document = copy.deepcopy(document)
+        size = approx_size(document)
+        self.entries[key] = (time.monotonic() + self.ttl, size, document, known)
+        self.bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def invalidate(self, key):
+        self._drop(key)
+        self.invalidations += 1
+        if key in self.inflight:
+            self.versions[key] = self.versions.get(key, 0) + 1
+
+    def invalidate_collection(self, collection):
+        for key in [key for key in self.entries if key[0] == collection]:
+            self._drop(key)
+        for key in self.inflight:
+            if key[0] == collection:
+                self.versions[key] = self.versions.get(key, 0) + 1
+        self.invalidations += 1
+
+    def begin_read(self, key):
+        self.inflight[key] = self.inflight.get(key, 0) + 1
+        return self.versions.get(key, 0)
+
+    def end_read(self, key, token, document=None, fill=True, fields=None):
+        remaining = self.inflight[key] - 1
+        if fill and self.versions.get(key, 0) == token:
+            self.set(key, document, fields)
+        if remaining:
+            self.inflight[key] = remaining
+        else:
+            del self.inflight[key]
+            self.versions.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,254 @@
+import logging
+import multiprocessing
+import os
+import queue
+import runpy
+import signal
+import time
+
+logger = logging.getLogger("discord")
+
+# Set in worker processes by the coordinator, read by app.py
+CLUSTER_ID_ENV = "CLUSTER_ID"
+SHARD_IDS_ENV = "SHARD_IDS"
+SHARD_COUNT_ENV = "SHARD_COUNT"
+
+HEARTBEAT_INTERVAL = float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", "10"))
+HEARTBEAT_TIMEOUT = float(os.getenv("CLUSTER_HEARTBEAT_TIMEOUT", "90"))
+
+# Queue the coordinator hands to this worker process, if any
+_heartbeats = None
+
+
+class ClusterInfo:
+    """Which shards this process runs"""
+
+    __slots__ = ("cluster_id", "shard_ids", "shard_count")
+
+    def __init__(self, cluster_id, shard_ids, shard_count):
+        self.cluster_id = cluster_id
+        self.shard_ids = list(shard_ids)
+        self.shard_count = shard_count
+
+    def to_env(self):
+        return {
+            CLUSTER_ID_ENV: str(self.cluster_id),
+            SHARD_IDS_ENV: ",".join(map(str, self.shard_ids)),
+            SHARD_COUNT_ENV: str(self.shard_count),
+        }
+
+    def __repr__(self):
+        return f"<Cluster {self.cluster_id} shards={self.shard_ids}/{self.shard_count}>"
+
+
+def current():
+    """The ClusterInfo of this process, or None when running unclustered"""
+    if not os.getenv(SHARD_IDS_ENV):
+        return None
+    return ClusterInfo(
+        int(os.getenv(CLUSTER_ID_ENV, "0")),
+        [int(shard) for shard in os.environ[SHARD_IDS_ENV].split(",")],
+        int(os.environ[SHARD_COUNT_ENV]),
+    )
+
+
+def shard_plan(shard_count, clusters):
+    """Splits `shard_count` shards into `clusters` contiguous, near-equal ranges"""
+    if shard_count < 1 or clusters < 1:
+        raise ValueError("shard_count and clusters must be positive")
+    clusters = min(clusters, shard_count)
+    size, extra = divmod(shard_count, clusters)
+    plan, start = [], 0
+    for cluster_id in range(clusters):
+        end = start + size + (1 if cluster_id < extra else 0)
+        plan.append(ClusterInfo(cluster_id, range(start, end), shard_count))
+        start = end
+    return plan
+
+
+def beat(**stats):
+    """Reports this worker as alive to the coordinator; a no-op when unclustered"""
+    info = current()
+    if _heartbeats is None or info is None:
+        return
+    try:
+        _heartbeats.put_nowait((info.cluster_id, os.getpid(), time.time(), stats))
+    except Exception:
+        pass
+
+
+def run_app(info, heartbeats):
+    """Default worker target: runs app.py with this cluster's shards"""
+    runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), run_name="__main__")
+
+
+def _worker_main(target, info, heartbeats):
+    global _heartbeats
+    _heartbeats = heartbeats
+    os.environ.update(info.to_env())
+    # The coordinator handles Ctrl+C and terminates workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(info, heartbeats)
+
+
+class WorkerState:
+    __slots__ = ("info", "process", "started", "last_beat", "stats", "restarts", "backoff", "next_start", "done")
+
+    def __init__(self, info):
+        self.info = info
+        self.process = None
+        self.started = 0.0
+        self.last_beat = 0.0
+        self.stats = {}
+        self.restarts = 0
+        self.backoff = 0.0
+        self.next_start = 0.0
+        self.done = False
+
+
+class ClusterCoordinator:
+    """Runs one bot process per cluster of shards on this host.
+
+    Each worker gets its shard ids through the environment and runs an
+    AutoShardedBot for just those shards. Workers report heartbeats over a
+    shared queue; a worker that dies or stops beating for `heartbeat_timeout`
+    seconds is restarted with exponential backoff. A worker that exits with
+    code 0 shut down on purpose and is left alone.
+
+    Workers are stopped with SIGTERM, which app.py turns into `bot.close()`
+    so counters, queued log records and timers are flushed; they are only
+    killed if they are still running after the join timeout.
+    """
+
+    def __init__(self, shard_count, clusters, target=run_app, heartbeat_timeout=HEARTBEAT_TIMEOUT,
+                 min_backoff=1.0, max_backoff=60.0, stable_after=300.0):
+        self.plan = shard_plan(shard_count, clusters)
+        self.target = target
+        self.heartbeat_timeout = heartbeat_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.context = multiprocessing.get_context("spawn")
+        self.heartbeats = self.context.Queue()
+        self.workers = [WorkerState(info) for info in self.plan]
+        self.stopping = False
+
+    def _spawn(self, worker):
+        worker.process = self.context.Process(
+            target=_worker_main,
+            args=(self.target, worker.info, self.heartbeats),
+            name=f"cluster-{worker.info.cluster_id}",
+            daemon=False,
+        )
+        worker.process.start()
+        worker.started = worker.last_beat = time.monotonic()
+        logger.info(f"Started {worker.info!r} as pid {worker.process.pid}")
+
+    def start(self):
+        for worker in self.workers:
+            self._spawn(worker)
+
+    def _drain(self):
+        now = time.monotonic()
+        while True:
+            try:
+                cluster_id, pid, sent, stats = self.heartbeats.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers[cluster_id]
+            # Ignore late beats from a process that has already been replaced
+            if worker.process is not None and worker.process.pid == pid:
+                worker.last_beat = now
+                worker.stats = stats
+
+    def poll(self):
+        """Collects heartbeats and restarts dead or silent workers"""
+        self._drain()
+        now = time.monotonic()
+        for worker in self.workers:
+            if self.stopping or worker.done:
+                continue
+            process = worker.process
+            if process is None:
+                if now >= worker.next_start:
+                    self._spawn(worker)
+                continue
+
+            if process.is_alive():
+                if now - worker.last_beat <= self.heartbeat_timeout:
+                    if now - worker.started >= self.stable_after:
+                        worker.backoff = 0.0
+                    continue
+                logger.error(f"{worker.info!r} missed heartbeats for {now - worker.last_beat:.0f}s, restarting")
+                process.terminate()
+                process.join(10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            elif process.exitcode == 0:
+                logger.info(f"{worker.info!r} exited cleanly")
+                worker.done = True
+                continue
+            else:
+                logger.error(f"{worker.info!r} died with exit code {process.exitcode}")
+
+            worker.process = None
+            worker.restarts += 1
+            worker.backoff = min(self.max_backoff, max(self.min_backoff, worker.backoff * 2))
+            worker.next_start = now + worker.backoff
+
+    def run(self, poll_interval=1.0, until=None):
+        """Blocks until every worker exited cleanly, `until()` is true or SIGTERM/Ctrl+C"""
+        def request_stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.start()
+        try:
+            while not self.stopping and not all(worker.done for worker in self.workers):
+                time.sleep(poll_interval)
+                self.poll()
+                if until is not None and until(self):
+                    break
+        finally:
+            self.stop()
+
+    def stop(self, timeout=30.0):
+        self.stopping = True
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+        self._drain()
+
+    def snapshot(self):
+        now = time.monotonic()
+        return [
+            {
+                "cluster": worker.info.cluster_id,
+                "shards": worker.info.shard_ids,
+                "pid": worker.process.pid if worker.process is not None else None,
+                "alive": worker.process is not None and worker.process.is_alive(),
+                "last_beat": round(now - worker.last_beat, 1),
+                "restarts": worker.restarts,
+                "stats": worker.stats,
+            }
+            for worker in self.workers
+        ]
+
+
+if __name__ == "__main__":
+    # python cluster.py — TOTAL_SHARDS shards split over CLUSTERS processes
+    # Go through the importable module so workers and app.py share its globals
+    import cluster
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    coordinator = cluster.ClusterCoordinator(int(os.getenv("TOTAL_SHARDS", "2")), int(os.getenv("CLUSTERS", "2")))
+    coordinator.run()
@@ -0,0 +1,62 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from base_cog import BaseCog
+
+# 👇 Replace with your development guild/server ID if needed
+DEV_GUILD_ID = 1364844968375619604
+
+class AttackCommand(BaseCog):
+    def __init__(self, bot, db):
+        super().__init__(bot, db)
+
+    @commands.hybrid_command(
+        name="attack",
+        description="Send your army against another Legion"
+    )
+    @app_commands.describe(opponent="The Legion to attack")
+    @app_commands.guilds(discord.Object(id=DEV_GUILD_ID))  # For faster slash command registration
+    async def attack(self, ctx, opponent: discord.User):
+        try:
+            user_id = str(ctx.author.id)
+            ephemeral = {"ephemeral": True} if ctx.interaction else {}
+
+            if opponent.id == ctx.author.id:
+                await ctx.send("You can't attack your own Legion!", **ephemeral)
+                return
+
+            on_cooldown, remaining = await self.bot.cooldowns.check("attack", user_id, 30)
+            if on_cooldown:
+                await ctx.send(f"You need to wait {remaining}s to use it again.", **ephemeral)
+                return
+
+            # Resolved and recorded by the shared BattleEngine; the seed replays it from battle_log
+            results = await self.bot.battles.fight([(user_id, str(opponent.id))])
+            if not results:
+                await ctx.send("Both sides need a Legion. Use the `/start` command first!", **ephemeral)
+                return
+            result = results[0]
+
+            won = result["winner"] == user_id
+            embed = discord.Embed(
+                title="Victory!" if won else "Defeat",
+                description=f"{ctx.author.mention} attacked {opponent.mention}",
+                color=0x00ff00 if won else 0xff0000
+            )
+            embed.add_field(name="Your army", value=f"`{result['attacker_hp']:.0f}` hp left", inline=True)
+            embed.add_field(name="Defenders", value=f"`{result['defender_hp']:.0f}` hp left", inline=True)
+            embed.set_footer(text=f"Battle seed {result['seed']}")
+
+            await ctx.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+        except Exception as e:
+            self.logger.error(f"Error in /attack: {e}", exc_info=True)
+            try:
+                await ctx.send("An error occurred. Try again later.", **({"ephemeral": True} if ctx.interaction else {}))
+            except:
+                pass
+
+# 🔁 This gets called automatically when the cog is loaded
+async def setup(bot):
+    db = getattr(bot, "db", None)
+    await bot.add_cog(AttackCommand(bot, db))
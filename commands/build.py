@@ -1,98 +1,274 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
+import asyncio
 import os
-from datetime import datetime, timedelta
+import time
 from base_cog import BaseCog
+from construction import ConstructionEngine, BUILT, ALREADY_BUILT
+from models import inventory_fields
+import inventory
 
 # 👇 Replace with your development guild/server ID if needed
 DEV_GUILD_ID = 1364844968375619604
 
+INVENTORY_FIELDS = inventory_fields("owned", "buildings", "inv_version")
+
+# How long menus and confirmations accept presses (seconds)
+MENU_TIMEOUT = 60
+CONFIRM_TIMEOUT = 10
+
+
+# Buttons are module-level DynamicItems: the author, page and expiry travel in
+# the custom_id, so no per-command classes are created and menus keep working
+# across restarts and !reload.
+
+async def edit_menu(interaction, view, **kwargs):
+    # discord.py would keep every edited-in view; the DynamicItems don't need it
+    await interaction.response.edit_message(view=view, **kwargs)
+    interaction.client.views.release(view)
+
+
+async def check_press(interaction, kind, author_id, expires, disabled_view):
+    # `disabled_view` is only built when the menu is actually closed
+    # Author-only check for all buttons
+    if interaction.user.id != author_id:
+        await interaction.response.send_message("You can't use these buttons!", ephemeral=True)
+        return False
+    
+    if time.time() > expires:
+        notice = "Interaction timed out."
+    elif interaction.client.views.is_superseded(kind, author_id, interaction.message.id):
+        notice = "This menu was replaced by a newer one."
+    else:
+        return True
+    
+    # Disable all buttons and show why
+    embed = interaction.message.embeds[0]
+    embed.description = (embed.description or "") + f"\n\n**{notice}**"
+    await edit_menu(interaction, disabled_view(), embed=embed)
+    return False
+
+
+class PageButton(discord.ui.DynamicItem[discord.ui.Button], template=r"build:page:(?P<author>[0-9]+):(?P<page>-?[0-9]+):(?P<expires>[0-9]+)"):
+    def __init__(self, author_id, page, expires, label="◀️", disabled=False):
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.green,
+            custom_id=f"build:page:{author_id}:{page}:{expires}",
+            disabled=disabled
+        ))
+        self.author_id = author_id
+        self.page = page
+        self.expires = expires
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["author"]), int(match["page"]), int(match["expires"]), item.label)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        cog = interaction.client.get_cog("BuildCommand")
+        data = interaction.client.game_data.current()
+        return await check_press(interaction, "build", self.author_id, self.expires,
+                                 lambda: cog.menu_view(data, self.author_id, max(self.page, 0), self.expires, disabled=True))
+    
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("BuildCommand")
+        data = interaction.client.game_data.current()
+        if not 0 <= self.page < len(data.buildings):
+            await interaction.response.defer()
+            return
+        
+        user_data = await data.user_fields.fetch(cog.userdata, str(self.author_id))
+        embed = cog.create_building_embed(data, self.page, user_data or {})
+        view = cog.menu_view(data, self.author_id, self.page, self.expires)
+        await edit_menu(interaction, view, embed=embed)
+
+
+class ConstructButton(discord.ui.DynamicItem[discord.ui.Button], template=r"build:make:(?P<author>[0-9]+):(?P<page>[0-9]+):(?P<expires>[0-9]+)"):
+    def __init__(self, author_id, page, expires, disabled=False):
+        super().__init__(discord.ui.Button(
+            label="Construct",
+            style=discord.ButtonStyle.red,
+            custom_id=f"build:make:{author_id}:{page}:{expires}",
+            disabled=disabled
+        ))
+        self.author_id = author_id
+        self.page = page
+        self.expires = expires
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["author"]), int(match["page"]), int(match["expires"]))
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        cog = interaction.client.get_cog("BuildCommand")
+        data = interaction.client.game_data.current()
+        return await check_press(interaction, "build", self.author_id, self.expires,
+                                 lambda: cog.menu_view(data, self.author_id, self.page, self.expires, disabled=True))
+    
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("BuildCommand")
+        data = interaction.client.game_data.current()
+        user_id = str(self.author_id)
+        if self.page >= len(data.buildings):
+            await interaction.response.send_message("Building data unavailable. Please try again later.", ephemeral=True)
+            return
+        building = data.buildings[self.page]
+        
+        # Check if user already has this building: one bit in the owned bitset
+        inv_data = await INVENTORY_FIELDS.fetch(cog.invdata, user_id) or {}
+        if inventory.owns(inv_data, building.id):
+            await interaction.response.send_message(
+                f"You already constructed {building.name}!",
+                ephemeral=True
+            )
+            return
+        
+        # Check if user meets requirements
+        user_data = await data.user_fields.fetch(cog.userdata, user_id) or {}
+        if not data.meets_requirements(user_data, building):
+            await interaction.response.send_message(
+                "You don't meet the requirements to build this!",
+                ephemeral=True
+            )
+            return
+        
+        # Create confirmation view
+        confirm_embed = discord.Embed(
+            title="Confirm Construction",
+            description=f"Are you sure you want to construct **{building.name}**?",
+            color=0xffaa00
+        )
+        view = confirm_view(self.author_id, building.id, int(time.time()) + CONFIRM_TIMEOUT)
+        await interaction.response.send_message(embed=confirm_embed, view=view)
+        # Any older confirmation of this user stops accepting presses
+        interaction.client.views.opened("build-confirm", self.author_id, interaction.id, view)
+
+
+class ConfirmButton(discord.ui.DynamicItem[discord.ui.Button], template=r"build:(?P<answer>yes|no):(?P<author>[0-9]+):(?P<building>-?[0-9]+):(?P<expires>[0-9]+)"):
+    def __init__(self, answer, author_id, building_id, expires, disabled=False):
+        super().__init__(discord.ui.Button(
+            label="Yes" if answer == "yes" else "No",
+            style=discord.ButtonStyle.green if answer == "yes" else discord.ButtonStyle.red,
+            custom_id=f"build:{answer}:{author_id}:{building_id}:{expires}",
+            disabled=disabled
+        ))
+        self.answer = answer
+        self.author_id = author_id
+        self.building_id = building_id
+        self.expires = expires
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["answer"], int(match["author"]), int(match["building"]), int(match["expires"]))
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await check_press(interaction, "build-confirm", self.author_id, self.expires,
+                                 lambda: confirm_view(self.author_id, self.building_id, self.expires, disabled=True))
+    
+    async def callback(self, interaction: discord.Interaction):
+        disabled = confirm_view(self.author_id, self.building_id, self.expires, disabled=True)
+        interaction.client.views.closed("build-confirm", self.author_id)
+        if self.answer == "no":
+            # Disable buttons and show cancellation message
+            cancel_embed = discord.Embed(
+                title="Construction Cancelled",
+                description="Interaction cancelled.",
+                color=0xff0000
+            )
+            await edit_menu(interaction, disabled, embed=cancel_embed)
+            return
+        
+        cog = interaction.client.get_cog("BuildCommand")
+        building = interaction.client.game_data.current().by_id.get(self.building_id)
+        if building is None:
+            await edit_menu(interaction, disabled, content="Building data unavailable. Please try again later.")
+            return
+        
+        # Check, deduct and record the building in one guarded operation
+        status = await cog.engine.construct(str(interaction.user.id), building)
+        
+        if status != BUILT:
+            if status == ALREADY_BUILT:
+                reason = f"You already constructed {building.name}!"
+            else:
+                reason = "You don't meet the requirements to build this!"
+            fail_embed = discord.Embed(title="Construction Failed", description=reason, color=0xff0000)
+            await edit_menu(interaction, disabled, embed=fail_embed)
+            return
+        
+        if building.build_time:
+            success_embed = discord.Embed(
+                title="Construction Started",
+                description=f"**{building.name}** will be finished <t:{int(time.time()) + building.build_time}:R>.",
+                color=0x00ff00
+            )
+        else:
+            success_embed = discord.Embed(
+                title="Construction Complete",
+                description=f"Successfully constructed **{building.name}**!",
+                color=0x00ff00
+            )
+        await edit_menu(interaction, disabled, embed=success_embed)
+
+
+def confirm_view(author_id, building_id, expires, disabled=False):
+    view = discord.ui.View(timeout=None)
+    view.add_item(ConfirmButton("yes", author_id, building_id, expires, disabled))
+    view.add_item(ConfirmButton("no", author_id, building_id, expires, disabled))
+    return view
+
+
+BUILD_ITEMS = (PageButton, ConstructButton, ConfirmButton)
+
+
 class BuildCommand(BaseCog):
     def __init__(self, bot, db):
         super().__init__(bot, db)
         self.userdata = db["userdata"]
         self.invdata = db["invdata"]
-        
-        # Load buildings from file
-        try:
-            with open(os.path.join("data", "buildings.json"), "r") as f:
-                self.buildings = json.load(f)
-                self.building_keys = list(self.buildings.keys())
-        except Exception as e:
-            self.logger.error(f"Error loading buildings: {e}")
-            self.buildings = {}
-            self.building_keys = []
-        
-        # Load emojis from file
-        try:
-            with open(os.path.join("data", "emojis.json"), "r") as f:
-                self.emojis = json.load(f)
-        except Exception as e:
-            self.logger.error(f"Error loading emojis: {e}")
-            self.emojis = {}
-        
-        # Cooldown tracking
-        self.cooldowns = {}
+        self.engine = ConstructionEngine(db, use_transactions=os.getenv("MONGO_TRANSACTIONS", "1") != "0",
+                                         scheduler=getattr(bot, "timers", None))
     
-    # Custom cooldown check
-    async def is_on_cooldown(self, user_id):
-        if user_id in self.cooldowns:
-            current_time = datetime.now()
-            if current_time < self.cooldowns[user_id]:
-                # Calculate remaining time in seconds
-                remaining = (self.cooldowns[user_id] - current_time).total_seconds()
-                return True, int(remaining)
-        
-        # Set cooldown for 15 seconds
-        self.cooldowns[user_id] = datetime.now() + timedelta(seconds=15)
-        return False, 0
+    async def cog_unload(self):
+        # !reload registers the fresh classes again from setup()
+        self.bot.remove_dynamic_items(*BUILD_ITEMS)
     
     # Create embed for building display
-    def create_building_embed(self, page_num, user_data):
-        if not self.building_keys or page_num >= len(self.building_keys):
+    def create_building_embed(self, data, page_num, user_data):
+        if not data.buildings or page_num >= len(data.buildings):
             return discord.Embed(title="No buildings available", color=0xff0000)
         
-        building_name = self.building_keys[page_num]
-        building_data = self.buildings[building_name]
+        building = data.buildings[page_num]
         
         embed = discord.Embed(
-            title=f"Building: {building_name}",
-            description=building_data.get("description", "No description available."),
+            title=f"Building: {building.name}",
+            description=building.description,
             color=0x00aaff
         )
         
         # Add requirements as fields
-        for req_name, req_value in building_data.items():
-            if req_name != "description" and req_name != "id":
-                emoji = self.emojis.get(req_name.lower(), "")
-                
-                # Check if user meets requirement
-                user_value = user_data.get(req_name.lower(), 0)
-                sufficient = user_value >= req_value
-                
-                # Format the field to show if requirement is met
-                status = "✅" if sufficient else "❌"
-                embed.add_field(
-                    name=f"{req_name.capitalize()} {emoji}",
-                    value=f"{req_value}  {status}",
-                    inline=True
-                )
+        for resource, label, emoji, amount in building.requirements:
+            # Format the field to show if requirement is met
+            status = "✅" if user_data.get(resource, 0) >= amount else "❌"
+            embed.add_field(
+                name=f"{label} {emoji}",
+                value=f"{amount}  {status}",
+                inline=True
+            )
         
-        embed.set_footer(text=f"Building {page_num+1}/{len(self.building_keys)}")
+        embed.set_footer(text=f"Building {page_num+1}/{len(data.buildings)}")
         return embed
     
-    # Check if user meets all requirements
-    def meets_requirements(self, user_data, building_name):
-        building_data = self.buildings.get(building_name, {})
-        for req_name, req_value in building_data.items():
-            if req_name != "description" and req_name != "id":
-                user_value = user_data.get(req_name.lower(), 0)
-                if user_value < req_value:
-                    return False
-        return True
-    
+    # Buttons for pagination and construction
+    def menu_view(self, data, author_id, page, expires, disabled=False):
+        view = discord.ui.View(timeout=None)
+        view.add_item(PageButton(author_id, page - 1, expires, "◀️", disabled=disabled or page <= 0))
+        view.add_item(ConstructButton(author_id, page, expires, disabled=disabled))
+        view.add_item(PageButton(author_id, page + 1, expires, "▶️", disabled=disabled or page + 1 >= len(data.buildings)))
+        return view
+
     @commands.hybrid_command(
         name="build",
         description="Build structures for your Legion"
@@ -103,7 +279,7 @@ class BuildCommand(BaseCog):
             user_id = str(ctx.author.id)
             
             # Check for cooldown
-            on_cooldown, remaining = await self.is_on_cooldown(user_id)
+            on_cooldown, remaining = await self.bot.cooldowns.check("build", user_id, 15)
             if on_cooldown:
                 if ctx.interaction:  # Slash command
                     await ctx.send(f"You need to wait {remaining}s to use it again.", ephemeral=True)
@@ -111,8 +287,13 @@ class BuildCommand(BaseCog):
                     await ctx.send(f"You need to wait {remaining}s to use it again.")
                 return
             
-            # First check: See if user exists in database
-            user_data = self.userdata.find_one({"userid": user_id})
+            data = self.bot.game_data.current()
+            
+            # First check: See if user exists in database; the inventory is read alongside
+            user_data, inv_data = await asyncio.gather(
+                data.user_fields.fetch(self.userdata, user_id),
+                INVENTORY_FIELDS.fetch(self.invdata, user_id)
+            )
             if not user_data:
                 if ctx.interaction:  # Slash command
                     await ctx.send("Please form a Legion by using the `/start` command first!", ephemeral=True)
@@ -121,194 +302,29 @@ class BuildCommand(BaseCog):
                 return
             
             # Check if buildings data loaded properly
-            if not self.building_keys:
+            if not data.buildings:
                 if ctx.interaction:
                     await ctx.send("Building data unavailable. Please try again later.", ephemeral=True)
                 else:
                     await ctx.send("Building data unavailable. Please try again later.")
                 return
             
-            # Get inventory data
-            inv_data = self.invdata.find_one({"userid": user_id})
+            # Make sure the inventory the construction claim writes to exists in the keyed layout
             if not inv_data:
-                inv_data = {"userid": user_id, "buildings": []}
-                self.invdata.insert_one(inv_data)
-            
-            # Create buttons for pagination and construction
-            class BuildingView(discord.ui.View):
-                def __init__(self, parent, user_data, inv_data, author_id):
-                    super().__init__(timeout=60)  # 1 minute timeout
-                    self.parent = parent
-                    self.page = 0
-                    self.user_data = user_data
-                    self.inv_data = inv_data
-                    self.author_id = author_id
-                    self.update_buttons()
-                
-                def update_buttons(self):
-                    # Update button states based on current page
-                    self.left_button.disabled = self.page <= 0
-                    self.right_button.disabled = self.page + 1 >= len(self.parent.building_keys) or self.page >= 12
-                
-                async def on_timeout(self):
-                    # Disable all buttons and show timeout message
-                    for child in self.children:
-                        child.disabled = True
-                    
-                    embed = self.message.embeds[0]
-                    embed.description += "\n\n**Interaction timed out.**"
-                    await self.message.edit(embed=embed, view=self)
-                
-                # Author-only check for all buttons
-                async def interaction_check(self, interaction: discord.Interaction) -> bool:
-                    if interaction.user.id != self.author_id:
-                        await interaction.response.send_message("You can't use these buttons!", ephemeral=True)
-                        return False
-                    return True
-                
-                @discord.ui.button(label="◀️", style=discord.ButtonStyle.green)
-                async def left_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    if self.page > 0:
-                        self.page -= 1
-                        self.update_buttons()
-                        embed = self.parent.create_building_embed(self.page, self.user_data)
-                        await interaction.response.edit_message(embed=embed, view=self)
-                    else:
-                        await interaction.response.defer()
-                
-                @discord.ui.button(label="Construct", style=discord.ButtonStyle.red)
-                async def construct_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    current_building = self.parent.building_keys[self.page]
-                    building_id = self.parent.buildings[current_building].get("id", 0)
-                    
-                    # Check if user already has this building
-                    user_buildings = self.inv_data.get("buildings", [])
-                    if any(b.get("id") == building_id for b in user_buildings):
-                        await interaction.response.send_message(
-                            f"You already constructed {current_building}!",
-                            ephemeral=True
-                        )
-                        return
-                    
-                    # Check if user meets requirements
-                    if not self.parent.meets_requirements(self.user_data, current_building):
-                        await interaction.response.send_message(
-                            "You don't meet the requirements to build this!",
-                            ephemeral=True
-                        )
-                        return
-                    
-                    # Create confirmation view
-                    confirm_view = ConfirmView(self.parent, current_building, building_id, self.user_data, self.inv_data, self.author_id)
-                    confirm_embed = discord.Embed(
-                        title="Confirm Construction",
-                        description=f"Are you sure you want to construct **{current_building}**?",
-                        color=0xffaa00
-                    )
-                    
-                    await interaction.response.send_message(embed=confirm_embed, view=confirm_view)
-                    confirm_view.message = await interaction.original_response()
-                
-                @discord.ui.button(label="▶️", style=discord.ButtonStyle.green)
-                async def right_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    if self.page + 1 < len(self.parent.building_keys) and self.page < 12:
-                        self.page += 1
-                        self.update_buttons()
-                        embed = self.parent.create_building_embed(self.page, self.user_data)
-                        await interaction.response.edit_message(embed=embed, view=self)
-                    else:
-                        await interaction.response.defer()
-            
-            # Create confirmation view for construction
-            class ConfirmView(discord.ui.View):
-                def __init__(self, parent, building_name, building_id, user_data, inv_data, author_id):
-                    super().__init__(timeout=10)  # 10 seconds timeout
-                    self.parent = parent
-                    self.building_name = building_name
-                    self.building_id = building_id
-                    self.user_data = user_data
-                    self.inv_data = inv_data
-                    self.author_id = author_id
-                
-                async def on_timeout(self):
-                    # Disable all buttons and show timeout message
-                    for child in self.children:
-                        child.disabled = True
-                    
-                    embed = self.message.embeds[0]
-                    embed.description += "\n\n**Interaction timed out.**"
-                    await self.message.edit(embed=embed, view=self)
-                
-                # Author-only check for all buttons
-                async def interaction_check(self, interaction: discord.Interaction) -> bool:
-                    if interaction.user.id != self.author_id:
-                        await interaction.response.send_message("You can't use these buttons!", ephemeral=True)
-                        return False
-                    return True
-                
-                @discord.ui.button(label="Yes", style=discord.ButtonStyle.green)
-                async def yes_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    # Subtract resources
-                    building_data = self.parent.buildings[self.building_name]
-                    updates = {}
-                    
-                    for req_name, req_value in building_data.items():
-                        if req_name != "description" and req_name != "id":
-                            updates[req_name.lower()] = -req_value
-                    
-                    # Update user's resources
-                    for resource, amount in updates.items():
-                        self.parent.userdata.update_one(
-                            {"userid": str(interaction.user.id)},
-                            {"$inc": {resource: amount}}
-                        )
-                    
-                    # Add building to inventory
-                    self.parent.invdata.update_one(
-                        {"userid": str(interaction.user.id)},
-                        {"$push": {"buildings": {"id": self.building_id, "name": self.building_name}}}
-                    )
-                    
-                    # Update message
-                    for child in self.children:
-                        child.disabled = True
-                    
-                    success_embed = discord.Embed(
-                        title="Construction Complete",
-                        description=f"Successfully constructed **{self.building_name}**!",
-                        color=0x00ff00
-                    )
-                    
-                    await interaction.response.edit_message(embed=success_embed, view=self)
-                
-                @discord.ui.button(label="No", style=discord.ButtonStyle.red)
-                async def no_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    # Disable buttons and show cancellation message
-                    for child in self.children:
-                        child.disabled = True
-                    
-                    cancel_embed = discord.Embed(
-                        title="Construction Cancelled",
-                        description="Interaction cancelled.",
-                        color=0xff0000
-                    )
-                    
-                    await interaction.response.edit_message(embed=cancel_embed, view=self)
+                await self.invdata.update_one({"userid": user_id}, {"$setOnInsert": inventory.empty()}, upsert=True)
+            elif inventory.is_legacy(inv_data):
+                await inventory.migrate(self.invdata, user_id)
             
             # Create initial building embed and view
-            embed = self.create_building_embed(0, user_data)
-            view = BuildingView(self, user_data, inv_data, ctx.author.id)
-            
-            # Send the embed with buttons
-            if ctx.interaction:  # Slash command
-                await ctx.defer(ephemeral=False)
-                message = await ctx.send(embed=embed, view=view)
-            else:  # Prefix command
-                message = await ctx.send(embed=embed, view=view)
-            
-            # Store the message for view callbacks
-            view.message = message
+            embed = self.create_building_embed(data, 0, user_data)
+            view = self.menu_view(data, ctx.author.id, 0, int(time.time()) + MENU_TIMEOUT)
             
+            # Send the embed with buttons (slow slash calls were already deferred by AckManager)
+            await ctx.send(embed=embed, view=view)
+            # A newer /build supersedes this user's previous menu
+            opened_by = ctx.interaction.id if ctx.interaction else ctx.message.id
+            self.bot.views.opened("build", ctx.author.id, opened_by, view)
+        
         except Exception as e:
             self.logger.error(f"Error in /build: {e}", exc_info=True)
             
@@ -323,4 +339,5 @@ class BuildCommand(BaseCog):
 # 🔁 This gets called automatically when the cog is loaded
 async def setup(bot):
     db = getattr(bot, "db", None)
+    bot.add_dynamic_items(*BUILD_ITEMS)
     await bot.add_cog(BuildCommand(bot, db))
@@ -1,17 +1,105 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import asyncio
+import time
 from base_cog import BaseCog
+from models import user_fields
 
 # 👇 Replace with your development guild/server ID if needed
 DEV_GUILD_ID = 1364844968375619604
 
+FACTION_FIELDS = user_fields("faction")
+
+# How long the faction buttons accept presses (seconds)
+FACTION_TIMEOUT = 30
+
+FACTIONS = (
+    ("Nova Pact", discord.ButtonStyle.blurple),
+    ("Sentinel Order", discord.ButtonStyle.green),
+    ("Crimson Reign", discord.ButtonStyle.red),
+)
+
+# Module-level DynamicItem: the author, faction and expiry travel in the
+# custom_id, so the command no longer defines a View class or parks in wait()
+class FactionButton(discord.ui.DynamicItem[discord.ui.Button], template=r"faction:(?P<author>[0-9]+):(?P<index>[0-9]):(?P<expires>[0-9]+)"):
+    def __init__(self, author_id, index, expires, disabled=False):
+        label, style = FACTIONS[index]
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=style,
+            custom_id=f"faction:{author_id}:{index}:{expires}",
+            disabled=disabled
+        ))
+        self.author_id = author_id
+        self.index = index
+        self.expires = expires
+    
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match["author"]), int(match["index"]), int(match["expires"]))
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("You can't use this button!", ephemeral=True)
+            return False
+        
+        if time.time() > self.expires:
+            notice = "Interaction timed out."
+        elif interaction.client.views.is_superseded("faction", self.author_id, interaction.message.id):
+            notice = "This menu was replaced by a newer one."
+        else:
+            return True
+        
+        # Disable all buttons and show why
+        embed = interaction.message.embeds[0]
+        embed.description = (embed.description or "") + f"\n\n**{notice}**"
+        view = faction_view(self.author_id, self.expires, disabled=True)
+        await interaction.response.edit_message(embed=embed, view=view)
+        interaction.client.views.release(view)
+        return False
+    
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("ChooseFactionCommand")
+        faction = FACTIONS[self.index][0]
+        interaction.client.views.closed("faction", self.author_id)
+        
+        # Update the user's faction in the database, only if they have not picked one yet
+        result = await cog.userdata.update_one(
+            {"userid": str(interaction.user.id), "faction": ""},
+            {"$set": {"faction": faction}}
+        )
+        if not result.matched_count:
+            await interaction.response.edit_message(content="You have already chosen your faction!", embed=None, view=None)
+            return
+        
+        # Create a new embed for the confirmation
+        success_embed = discord.Embed(
+            title="Faction Selected",
+            description=f"You have joined the **{faction}**! Let's do the next step.",
+            color=0x00ff00
+        )
+        
+        # Update the message
+        await interaction.response.edit_message(embed=success_embed, view=None)
+        cog.logger.info(f"User {interaction.user.display_name} ({interaction.user.id}) chose faction: {faction}")
+
+
+def faction_view(author_id, expires, disabled=False):
+    view = discord.ui.View(timeout=None)
+    for index in range(len(FACTIONS)):
+        view.add_item(FactionButton(author_id, index, expires, disabled))
+    return view
+
+
 class ChooseFactionCommand(BaseCog):
     def __init__(self, bot, db):
         super().__init__(bot, db)
         self.userdata = db["userdata"]
     
+    async def cog_unload(self):
+        # !reload registers the fresh class again from setup()
+        self.bot.remove_dynamic_items(FactionButton)
+    
     @commands.hybrid_command(
         name="choosefaction", 
         aliases=["cf"],  # Alias only works for prefix commands
@@ -23,7 +111,7 @@ class ChooseFactionCommand(BaseCog):
             user_id = str(ctx.author.id)
             
             # First check: See if user exists in database
-            user_data = self.userdata.find_one({"userid": user_id})
+            user_data = await FACTION_FIELDS.fetch(self.userdata, user_id)
             if not user_data:
                 if ctx.interaction:  # Slash command
                     await ctx.send("Please begin your Legion by using the `/start` command first!", ephemeral=True)
@@ -49,87 +137,13 @@ class ChooseFactionCommand(BaseCog):
                 color=0x00ffff
             )
             
-            # Create the buttons
-            class FactionButtons(discord.ui.View):
-                def __init__(self, parent, timeout=30):
-                    super().__init__(timeout=timeout)
-                    self.parent = parent
-                    self.value = None
-                
-                async def on_timeout(self):
-                    # When timeout occurs, disable all buttons
-                    for child in self.children:
-                        child.disabled = True
-                    
-                    # Update the message with disabled buttons and timeout message
-                    embed.description += "\n\n**Interaction timed out.**"
-                    await self.message.edit(embed=embed, view=self)
-                
-                @discord.ui.button(label="Nova Pact", style=discord.ButtonStyle.blurple)
-                async def nova_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    if interaction.user.id != ctx.author.id:
-                        await interaction.response.send_message("You can't use this button!", ephemeral=True)
-                        return
-                    
-                    await self.process_selection(interaction, "Nova Pact")
-                
-                @discord.ui.button(label="Sentinel Order", style=discord.ButtonStyle.green)
-                async def sentinel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    if interaction.user.id != ctx.author.id:
-                        await interaction.response.send_message("You can't use this button!", ephemeral=True)
-                        return
-                    
-                    await self.process_selection(interaction, "Sentinel Order")
-                
-                @discord.ui.button(label="Crimson Reign", style=discord.ButtonStyle.red)
-                async def crimson_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-                    if interaction.user.id != ctx.author.id:
-                        await interaction.response.send_message("You can't use this button!", ephemeral=True)
-                        return
-                    
-                    await self.process_selection(interaction, "Crimson Reign")
-                
-                async def process_selection(self, interaction, faction):
-                    # Update the user's faction in the database
-                    self.parent.userdata.update_one(
-                        {"userid": str(interaction.user.id)},
-                        {"$set": {"faction": faction}}
-                    )
-                    
-                    # Disable all buttons
-                    for child in self.children:
-                        child.disabled = True
-                    
-                    # Create a new embed for the confirmation
-                    success_embed = discord.Embed(
-                        title="Faction Selected",
-                        description=f"You have joined the **{faction}**! Let's do the next step.",
-                        color=0x00ff00
-                    )
-                    
-                    # Update the message
-                    await interaction.response.edit_message(embed=success_embed, view=None)
-                    self.value = faction
-                    self.stop()
-            
             # Send the embed with buttons
-            view = FactionButtons(self)
-            
-            # Handle different contexts for sending
-            if ctx.interaction:  # Slash command
-                await ctx.defer(ephemeral=False)
-                message = await ctx.send(embed=embed, view=view)
-            else:  # Prefix command
-                message = await ctx.send(embed=embed, view=view)
-            
-            # Store the message for the on_timeout handler
-            view.message = message
-            
-            # Wait for the view to finish (button clicked or timeout)
-            await view.wait()
+            view = faction_view(ctx.author.id, int(time.time()) + FACTION_TIMEOUT)
             
-            if view.value:
-                self.logger.info(f"User {ctx.author.display_name} ({user_id}) chose faction: {view.value}")
+            await ctx.send(embed=embed, view=view)
+            # A newer /choosefaction supersedes this user's previous menu
+            opened_by = ctx.interaction.id if ctx.interaction else ctx.message.id
+            self.bot.views.opened("faction", ctx.author.id, opened_by, view)
         
         except Exception as e:
             self.logger.error(f"Error in /choosefaction: {e}", exc_info=True)
@@ -145,4 +159,5 @@ class ChooseFactionCommand(BaseCog):
 # 🔁 This gets called automatically when the cog is loaded
 async def setup(bot):
     db = getattr(bot, "db", None)
+    bot.add_dynamic_items(FactionButton)
     await bot.add_cog(ChooseFactionCommand(bot, db))
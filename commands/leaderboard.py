@@ -0,0 +1,67 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from base_cog import BaseCog
+
+# 👇 Replace with your development guild/server ID if needed
+DEV_GUILD_ID = 1364844968375619604
+
+TOP_COUNT = 10
+
+class LeaderboardCommand(BaseCog):
+    def __init__(self, bot, db):
+        super().__init__(bot, db)
+
+    @commands.hybrid_command(
+        name="leaderboard",
+        aliases=["lb"],  # Alias only works for prefix commands
+        description="See the top Legions and your own rank"
+    )
+    @app_commands.describe(board="What to rank by, e.g. exp, wins or gold")
+    @app_commands.guilds(discord.Object(id=DEV_GUILD_ID))  # For faster slash command registration
+    async def leaderboard(self, ctx, board: str = "exp"):
+        try:
+            user_id = str(ctx.author.id)
+            ephemeral = {"ephemeral": True} if ctx.interaction else {}
+
+            on_cooldown, remaining = await self.bot.cooldowns.check("leaderboard", user_id, 10)
+            if on_cooldown:
+                await ctx.send(f"You need to wait {remaining}s to use it again.", **ephemeral)
+                return
+
+            leaderboards = self.bot.leaderboards
+            ranking = leaderboards.get(board.lower())
+            if ranking is None:
+                await ctx.send(f"Unknown leaderboard. Try one of: {', '.join(leaderboards.fields)}", **ephemeral)
+                return
+            if not leaderboards.rebuilt_at:
+                await ctx.send("Leaderboards are still loading. Try again in a moment.", **ephemeral)
+                return
+
+            # Served from memory; no query per request
+            top = ranking.top(TOP_COUNT)
+            lines = [f"**#{rank}** <@{player}> — `{score}`" for rank, player, score in top]
+            embed = discord.Embed(
+                title=f"{ranking.field.capitalize()} Leaderboard",
+                description="\n".join(lines) or "Nobody is ranked yet.",
+                color=0x00aaff
+            )
+
+            rank = ranking.rank(user_id)
+            if rank is not None:
+                embed.set_footer(text=f"Your rank: #{rank} of {len(ranking)} with {ranking.scores[user_id]}")
+            else:
+                embed.set_footer(text="Form a Legion with /start to get ranked")
+
+            await ctx.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+        except Exception as e:
+            self.logger.error(f"Error in /leaderboard: {e}", exc_info=True)
+            try:
+                await ctx.send("An error occurred. Try again later.", **({"ephemeral": True} if ctx.interaction else {}))
+            except:
+                pass
+
+async def setup(bot):
+    db = getattr(bot, "db", None)
+    await bot.add_cog(LeaderboardCommand(bot, db))
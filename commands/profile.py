@@ -1,50 +1,20 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
-from datetime import datetime, timedelta
 from base_cog import BaseCog
+from models import user_fields, RESOURCES
+import premium
 
 # 👇 Replace with your development guild/server ID if needed
 DEV_GUILD_ID = 1364844968375619604
 
+PROFILE_FIELDS = user_fields("tutorial", "premium", "faction", "exp", *RESOURCES)
+
 class ProfileCommand(BaseCog):
     def __init__(self, bot, db):
         super().__init__(bot, db)
         self.userdata = db["userdata"]
-        
-        # Load emojis from file
-        try:
-            with open(os.path.join("data", "emojis.json"), "r") as f:
-                self.emojis = json.load(f)
-        except Exception as e:
-            self.logger.error(f"Error loading emojis: {e}")
-            self.emojis = {
-                "experience": "✨",
-                "gold": "💰",
-                "steel": "⚙️",
-                "oil": "🛢️",
-                "food": "🍗",
-                "intel": "🔍"
-            }
-        
-        # Cooldown tracking
-        self.cooldowns = {}
-    
-    # Custom cooldown check
-    async def is_on_cooldown(self, user_id):
-        if user_id in self.cooldowns:
-            current_time = datetime.now()
-            if current_time < self.cooldowns[user_id]:
-                # Calculate remaining time in seconds
-                remaining = (self.cooldowns[user_id] - current_time).total_seconds()
-                return True, int(remaining)
-        
-        # Set cooldown for 15 seconds
-        self.cooldowns[user_id] = datetime.now() + timedelta(seconds=15)
-        return False, 0
-    
+
     @commands.hybrid_command(
         name="profile", 
         aliases=["pr"],  # Alias only works for prefix commands
@@ -56,7 +26,7 @@ class ProfileCommand(BaseCog):
             user_id = str(ctx.author.id)
             
             # Check for cooldown
-            on_cooldown, remaining = await self.is_on_cooldown(user_id)
+            on_cooldown, remaining = await self.bot.cooldowns.check("profile", user_id, 15)
             if on_cooldown:
                 if ctx.interaction:  # Slash command
                     await ctx.send(f"You need to wait {remaining}s to use it again.", ephemeral=True)
@@ -64,8 +34,11 @@ class ProfileCommand(BaseCog):
                     await ctx.send(f"You need to wait {remaining}s to use it again.")
                 return
             
+            # Credit building production first so the balances shown are current
+            await self.bot.economy.settle_user(user_id)
+            
             # First check: See if user exists in database
-            user_data = self.userdata.find_one({"userid": user_id})
+            user_data = await PROFILE_FIELDS.fetch(self.userdata, user_id)
             if not user_data:
                 if ctx.interaction:  # Slash command
                     await ctx.send("Please begin your Legion by using the `/start` command first!", ephemeral=True)
@@ -81,8 +54,10 @@ class ProfileCommand(BaseCog):
                     await ctx.send("Please finish your tutorial commands first!")
                 return
             
-            # Calculate premium status
-            premium_status = True if user_data.get("premium", 0) == 1 else False
+            emojis = self.bot.game_data.current().emojis
+            
+            # `premium` holds when premium ends; the sweep may not have reset it yet
+            premium_status = premium.is_active(user_data.get("premium", 0))
             
             # Create the profile embed
             # Determine embed color based on premium status
@@ -102,37 +77,39 @@ class ProfileCommand(BaseCog):
                 f"**Faction**: `{user_data.get('faction', 'None')}`\n"
                 f"**Premium User**: `{premium_status}`\n"
             )
+            if premium_status:
+                description += f"**Premium Ends**: <t:{int(user_data['premium'])}:R>\n"
 
             embed.description = description
 
             embed.add_field(
                 name="Exp",
-                value=f"`{user_data.get('exp', 0)}` {self.emojis.get('experience', '✨')}",
+                value=f"`{user_data.get('exp', 0)}` {emojis.get('experience', '✨')}",
                 inline=True
             )
             embed.add_field(
                 name="Gold",
-                value=f"`{user_data.get('gold', 0)}` {self.emojis.get('gold', '💰')}",
+                value=f"`{user_data.get('gold', 0)}` {emojis.get('gold', '💰')}",
                 inline=True
             )
             embed.add_field(
                 name="Intel",
-                value=f"`{user_data.get('intel', 0)}` {self.emojis.get('intel', '🔍')}",
+                value=f"`{user_data.get('intel', 0)}` {emojis.get('intel', '🔍')}",
                 inline=True
             )
             embed.add_field(
                 name="Oil",
-                value=f"`{user_data.get('oil', 0)}` {self.emojis.get('oil', '🛢️')}",
+                value=f"`{user_data.get('oil', 0)}` {emojis.get('oil', '🛢️')}",
                 inline=True
             )
             embed.add_field(
                 name="Steel",
-                value=f"`{user_data.get('steel', 0)}` {self.emojis.get('steel', '⚙️')}",
+                value=f"`{user_data.get('steel', 0)}` {emojis.get('steel', '⚙️')}",
                 inline=True
             )
             embed.add_field(
                 name="Food",
-                value=f"`{user_data.get('food', 0)}` {self.emojis.get('food', '🍗')}",
+                value=f"`{user_data.get('food', 0)}` {emojis.get('food', '🍗')}",
                 inline=True
             )
             
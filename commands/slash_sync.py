@@ -8,23 +8,29 @@ class SlashSync(BaseCog):
         super().__init__(bot, db)
 
     @app_commands.command(name="sync", description="Sync slash commands with Discord")
+    @app_commands.describe(dry_run="Only show what would change", force="Push even if nothing changed")
     @app_commands.default_permissions(administrator=True)
-    async def sync_commands(self, interaction: discord.Interaction):
+    async def sync_commands(self, interaction: discord.Interaction, dry_run: bool = False, force: bool = False):
         try:
             await interaction.response.defer(thinking=True, ephemeral=True)
 
-            if interaction.guild:
-                # Sync only to current guild
-                synced = await self.bot.tree.sync(guild=interaction.guild)
+            # Sync only to current guild, or globally (slower, ratelimited) in DMs
+            guild = interaction.guild
+            where = f"this guild: `{guild.name}`" if guild else "global scope"
+
+            if dry_run:
+                result = await self.bot.command_sync.diff(guild=guild)
+                await interaction.followup.send(f"🔍 {result.count} slash commands for {where}: {result.describe()}", ephemeral=True)
+                return
+
+            result = await self.bot.command_sync.sync(guild=guild, force=force)
+            if result.synced:
                 await interaction.followup.send(
-                    f"✅ Synced {len(synced)} slash commands to this guild: `{interaction.guild.name}`", ephemeral=True
+                    f"✅ Synced {result.count} slash commands to {where} ({result.describe()})", ephemeral=True
                 )
-                self.logger.info(f"Manually synced {len(synced)} commands to guild {interaction.guild.name}")
+                self.logger.info(f"Manually synced {result.count} commands to {result.scope}")
             else:
-                # Global sync (slower, ratelimited)
-                synced = await self.bot.tree.sync()
-                await interaction.followup.send(f"✅ Globally synced {len(synced)} slash commands.", ephemeral=True)
-                self.logger.info(f"Manually synced {len(synced)} commands globally")
+                await interaction.followup.send(f"✅ Slash commands for {where} are already up to date.", ephemeral=True)
 
         except Exception as e:
             await interaction.followup.send(f"❌ Sync failed: `{e}`", ephemeral=True)
@@ -36,16 +42,12 @@ class SlashSync(BaseCog):
         try:
             await interaction.response.defer(thinking=True, ephemeral=True)
 
-            if interaction.guild:
-                self.bot.tree.clear_commands(guild=interaction.guild)
-                synced = await self.bot.tree.sync(guild=interaction.guild)
-                await interaction.followup.send(f"🧼 Cleared & re-synced {len(synced)} guild slash commands.", ephemeral=True)
-                self.logger.info(f"Cleared and re-synced {len(synced)} commands for guild {interaction.guild.name}")
-            else:
-                self.bot.tree.clear_commands()
-                synced = await self.bot.tree.sync()
-                await interaction.followup.send(f"🧼 Cleared & re-synced {len(synced)} global slash commands.", ephemeral=True)
-                self.logger.info(f"Cleared and re-synced {len(synced)} global commands")
+            # A sync overwrites the whole remote set, so forcing one replaces any
+            # stale commands without emptying the local tree first
+            result = await self.bot.command_sync.sync(guild=interaction.guild, force=True)
+            kind = "guild" if interaction.guild else "global"
+            await interaction.followup.send(f"🧼 Cleared & re-synced {result.count} {kind} slash commands.", ephemeral=True)
+            self.logger.info(f"Cleared and re-synced {result.count} commands for {result.scope}")
 
         except Exception as e:
             await interaction.followup.send(f"❌ Clear sync failed: `{e}`", ephemeral=True)
@@ -1,19 +1,21 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import time
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from base_cog import BaseCog
+from models import new_user, new_inventory, user_fields
 
 # 👇 Replace with your development guild/server ID
 DEV_GUILD_ID = 1364844968375619604
 
+# /start only needs to know whether the user exists
+EXISTS = user_fields()
+
 class StartCommand(BaseCog):
     def __init__(self, bot, db):
         super().__init__(bot, db)
         self.userdata = db["userdata"]
         self.invdata = db["invdata"]
-        self.globaldata = db["globaldata"]
     
     # Hybrid command - works as both slash and prefix command
     @commands.hybrid_command(
@@ -27,47 +29,34 @@ class StartCommand(BaseCog):
             user_id = str(ctx.author.id)
             
             # Exit early if user already exists
-            if self.userdata.find_one({"userid": user_id}):
+            if await EXISTS.fetch(self.userdata, user_id):
                 # Check if this is a slash command or prefix command
                 if ctx.interaction:  # This checks if it's invoked as a slash command
-                    await ctx.interaction.response.send_message("You already forged a Legion!", ephemeral=True)
+                    await ctx.send("You already forged a Legion!", ephemeral=True)
                 else:  # It's a regular prefix command
                     await ctx.send("You already forged a Legion!")
                 return
             
-            # Handle different contexts for defer
-            if ctx.interaction:  # Slash command
-                await ctx.defer()
-            else:  # Prefix command
-                message = await ctx.send("Registering...")
-            
-            user_data = {
-                "userid": user_id,
-                "exp": 0,
-                "premium": int(time.time() + 3600),
-                "oncepremium": 0,
-                "battles": 0,
-                "wins": 0,
-                "tutorial": 0,
-                "food": 100,
-                "steel": 1000,
-                "oil": 1000,
-                "gold": 1000,
-                "intel": 100,
-                "faction": "",
-                "ext1": 0, "ext2": 0, "ext3": 0, "ext4": 0, "ext5": 0,
-                "ext6": "", "ext7": "", "ext8": "", "ext9": "", "ext10": "", "cooldowns": []
-            }
+            # No "Registering..." placeholder: registration answers well within the
+            # ack window, and AckManager defers slash calls that run long
+            user_data = new_user(user_id)
+            inv_data = new_inventory(user_id)
             
-            inv_data = {
-                "userid": user_id,
-                "units": [],
-                "buildings": [], "timedowns": [], "ext1": [], "ext2": [], "ext3": [], "ext4": [], "ext5": []
-            }
+            # The unique userid index settles double /start races
+            try:
+                await self.userdata.insert_one(user_data)
+            except DuplicateKeyError:
+                if ctx.interaction:  # Slash command
+                    await ctx.send("You already forged a Legion!", ephemeral=True)
+                else:  # Prefix command
+                    await ctx.send("You already forged a Legion!")
+                return
             
-            self.userdata.insert_one(user_data)
-            self.invdata.insert_one(inv_data)
-            self.globaldata.update_one({"owner": "alphayg"}, {"$inc": {"users": 1}})
+            # /build may already have created an empty inventory for this user
+            inv_fields = {key: value for key, value in inv_data.items() if key != "userid"}
+            await self.invdata.update_one({"userid": user_id}, {"$setOnInsert": inv_fields}, upsert=True)
+            # Tallied in-process and flushed to a striped counter, see counters.py
+            self.bot.global_stats.users.increment()
             
             embed = discord.Embed(
                 title="Legion Forge",
@@ -75,11 +64,7 @@ class StartCommand(BaseCog):
                 color=0x00ff00
             )
             
-            # Handle different contexts for sending response
-            if ctx.interaction:  # Slash command
-                await ctx.send(embed=embed)
-            else:  # Prefix command
-                await message.edit(content=None, embed=embed)
+            await ctx.send(embed=embed)
             
             # Log the new user
             user_name = ctx.author.display_name
@@ -0,0 +1,89 @@
+import discord
+from discord import app_commands
+from base_cog import BaseCog
+import time
+
+class StatsCommand(BaseCog):
+    def __init__(self, bot, db):
+        super().__init__(bot, db)
+
+    @app_commands.command(name="stats", description="Command latency and error statistics (owner only)")
+    @app_commands.default_permissions(administrator=True)
+    async def stats(self, interaction: discord.Interaction):
+        try:
+            if not await self.bot.is_owner(interaction.user):
+                await interaction.response.send_message("This command is for the bot owner.", ephemeral=True)
+                return
+
+            commands_stats = self.bot.instrumentation.snapshot()
+            acks = self.bot.acks.snapshot()
+
+            # One fixed-width row per command keeps it readable on mobile too
+            rows = [f"{'command':<14}{'calls':>6}{'err':>5}{'run':>4}{'p50':>7}{'p95':>7}{'p99':>7}{'db':>6}{'api':>6}{'ack95':>7}"]
+            for name, stats in commands_stats.items():
+                ack_p95 = acks.get(name, {}).get("p95_ms", 0)
+                rows.append(
+                    f"{name[:14]:<14}{stats['calls']:>6}{stats['errors']:>5}{stats['in_flight']:>4}"
+                    f"{stats['p50_ms']:>7.0f}{stats['p95_ms']:>7.0f}{stats['p99_ms']:>7.0f}"
+                    f"{stats['db_avg_ms']:>6.0f}{stats['api_avg_ms']:>6.0f}{ack_p95:>7.0f}"
+                )
+            if len(rows) == 1:
+                rows.append("no commands recorded yet")
+
+            embed = discord.Embed(
+                title="Bot Stats",
+                description="```\n" + "\n".join(rows) + "\n```\nTimes in ms; p50-p99 are histogram bucket bounds.",
+                color=0x00aaff
+            )
+
+            uptime = int(time.time() - self.bot.instrumentation.started)
+            embed.add_field(name="Uptime", value=f"`{uptime // 3600}h {uptime % 3600 // 60}m`", inline=True)
+            embed.add_field(name="Gateway", value=f"`{round(self.bot.latency * 1000)}ms`", inline=True)
+
+            cache = getattr(self.db, "cache", None)
+            if cache is not None:
+                embed.add_field(name="Cache hit rate", value=f"`{cache.hit_rate:.1%}`", inline=True)
+
+            views = self.bot.views.snapshot(self.bot)
+            embed.add_field(
+                name="Menus",
+                value=f"`{views['menus']}` tracked, `{views.get('library_views')}` live views, "
+                      f"max RSS `{views.get('max_rss_mb', '?')} MB`",
+                inline=False
+            )
+
+            timers = self.bot.timers.snapshot()
+            embed.add_field(
+                name="Timers",
+                value=f"`{timers['in_memory']}` due soon, `{timers['fired']}` fired, `{timers['failed']}` retried",
+                inline=True
+            )
+
+            premium = self.bot.premium.snapshot()
+            embed.add_field(
+                name="Premium",
+                value=f"`{premium['downgraded']}` expired, `{premium['hits']}`/`{premium['misses']}` cache hits/misses",
+                inline=True
+            )
+
+            # Slowest Mongo operations by p95
+            ops = sorted(self.db.metrics.snapshot().items(), key=lambda item: item[1]["p95_ms"], reverse=True)[:5]
+            if ops:
+                embed.add_field(
+                    name="Slowest DB ops (p95)",
+                    value="\n".join(f"`{name}` {stats['p95_ms']:.1f}ms ×{stats['count']}" for name, stats in ops),
+                    inline=False
+                )
+
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+
+        except Exception as e:
+            self.logger.error(f"Error in /stats: {e}", exc_info=True)
+            try:
+                await interaction.response.send_message("An error occurred. Try again later.", ephemeral=True)
+            except:
+                pass
+
+async def setup(bot):
+    db = getattr(bot, "db", None)
+    await bot.add_cog(StatsCommand(bot, db))
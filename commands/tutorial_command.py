@@ -2,10 +2,13 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 from base_cog import BaseCog
+from models import user_fields
 
 # 👇 Replace with your development guild/server ID
 DEV_GUILD_ID = 1364844968375619604
 
+TUTORIAL_FIELDS = user_fields("tutorial")
+
 class TutorialCommand(BaseCog):
     def __init__(self, bot, db):
         super().__init__(bot, db)
@@ -14,7 +17,8 @@ class TutorialCommand(BaseCog):
     @commands.hybrid_command(
         name="tutorial",
         aliases=["tut"],
-        description="View the Legion tutorial steps"
+        description="View the Legion tutorial steps",
+        extras={"ephemeral": True}  # Keeps an automatic defer private too
     )
     @app_commands.guilds(discord.Object(id=DEV_GUILD_ID))
     async def tutorial(self, ctx):
@@ -22,7 +26,7 @@ class TutorialCommand(BaseCog):
             user_id = str(ctx.author.id)
 
             # Fetch user data
-            user_data = self.userdata.find_one({"userid": user_id})
+            user_data = await TUTORIAL_FIELDS.fetch(self.userdata, user_id)
 
             # Check if tutorial is already completed
             if user_data and user_data.get("tutorial", 0) != 0:
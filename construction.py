@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import random
+import time
+
+import inventory
+from timers import CONSTRUCTION
+
+logger = logging.getLogger("discord")
+
+# Construction outcomes
+BUILT = "built"
+ALREADY_BUILT = "already_built"
+INSUFFICIENT = "insufficient"
+NOT_REGISTERED = "not_registered"
+
+
+def _is_transient(error):
+    # pymongo tags retryable failures with error labels
+    has_label = getattr(error, "has_error_label", None)
+    return bool(has_label) and (
+        has_label("TransientTransactionError") or has_label("RetryableWriteError")
+    )
+
+
+class _Abort(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class ConstructionStats:
+    """Counters describing how constructions resolved under contention"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.built = 0
+        self.already_built = 0
+        self.insufficient = 0
+        self.not_registered = 0
+        self.conflicts = 0
+        self.retries = 0
+        self.completed = 0
+
+    def record(self, status):
+        if status == BUILT:
+            self.built += 1
+        elif status == ALREADY_BUILT:
+            self.already_built += 1
+        elif status == INSUFFICIENT:
+            self.insufficient += 1
+        elif status == NOT_REGISTERED:
+            self.not_registered += 1
+
+    def snapshot(self):
+        return dict(vars(self))
+
+
+class ConstructionEngine:
+    """Checks requirements, deducts resources and records a building atomically.
+
+    The building is claimed on `invdata` with a `$bitsAllClear` guard on its
+    owned bit, which makes concurrent clicks for the same building lose
+    cleanly, and every resource is deducted in one `$inc` whose filter
+    requires each balance to cover its cost. By default both writes run in
+    one multi-document transaction (replica set required), so a player never
+    ends up with a building they did not pay for.
+
+    `use_transactions=False` is for standalone servers only and is not
+    atomic: the claim and the deduction are separate writes and a failed
+    deduction pulls the claim back, so a crash in between leaves the
+    building claimed without payment. Balances still never go negative.
+
+    A claim that matches nothing costs one read to tell an owned building
+    from a missing inventory or one still in the version 1 layout.
+
+    Buildings with a `build_time` are claimed with their production clock
+    starting at completion and an entry in `invdata.timedowns`; a
+    construction timer on `scheduler` clears that entry when it is done.
+    """
+
+    def __init__(self, db, use_transactions=True, max_retries=3, scheduler=None):
+        self.db = db
+        self.userdata = db["userdata"]
+        self.invdata = db["invdata"]
+        self.use_transactions = use_transactions
+        self.max_retries = max_retries
+        self.stats = ConstructionStats()
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.register(CONSTRUCTION, self.complete)
+
+    async def construct(self, user_id, building):
+        """Builds a compiled `game_data.Building` for the user and returns the outcome"""
+        self.stats.attempts += 1
+        costs = building.cost_map
+        # `since` starts the building's production clock (economy.py)
+        due = int(time.time()) + building.build_time
+        record = {"id": building.id, "name": building.name, "since": due}
+        # Still under construction until `due`
+        timedown = {"name": building.name, "due": due} if building.build_time else None
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.use_transactions:
+                    status = await self._construct_transaction(user_id, costs, record, timedown)
+                else:
+                    status = await self._construct_guarded(user_id, costs, record, timedown)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_transient(e):
+                    raise
+                self.stats.retries += 1
+                await asyncio.sleep(0.01 * 2 ** attempt * random.random())
+
+        self.stats.record(status)
+        if status == BUILT and building.build_time and self.scheduler is not None:
+            try:
+                await self.scheduler.schedule(CONSTRUCTION, user_id, building.id, due, {"name": building.name})
+            except Exception as e:
+                # Paid for and claimed; finish it now rather than leave it under construction forever
+                logger.error(f"Failed to schedule construction of {building.name} for {user_id}, finishing it now: {e}",
+                             exc_info=True)
+                await self.complete([{"userid": user_id, "key": building.id}])
+        return status
+
+    async def complete(self, timers):
+        """Timer handler: clears finished constructions from `timedowns` in one bulk write"""
+        await self.invdata.bulk_update(
+            ((inventory.current({"userid": timer["userid"]}), {"$unset": {f"timedowns.{timer['key']}": ""}}) for timer in timers),
+            ordered=False,
+        )
+        self.stats.completed += len(timers)
+
+    def _deduct_filter(self, user_id, costs):
+        query = {"userid": user_id}
+        for resource, amount in costs.items():
+            query[resource] = {"$gte": amount}
+        return query
+
+    def _deduct_update(self, costs):
+        return {"$inc": {resource: -amount for resource, amount in costs.items()}}
+
+    def _claim(self, user_id, record, timedown=None):
+        # Unowned means the bit is clear, or its word of the bitset does not exist yet
+        field, position, mask = inventory.building_bit(record["id"])
+        query = inventory.current({
+            "userid": user_id,
+            "$or": [{field: {"$exists": False}}, {field: {"$bitsAllClear": [position]}}],
+        })
+        update = {"$bit": {field: {"or": mask}}, "$set": {f"built.{record['id']}": record["since"]}}
+        if timedown is not None:
+            update["$set"][f"timedowns.{record['id']}"] = timedown
+        return query, update
+
+    async def _construct_guarded(self, user_id, costs, record, timedown=None, migrated=False):
+        query, update = self._claim(user_id, record, timedown)
+        claimed = await self.invdata.update_one(query, update)
+        if not claimed.matched_count:
+            status = await self._claim_failure(user_id, migrated)
+            if status is None:
+                return await self._construct_guarded(user_id, costs, record, timedown, migrated=True)
+            return status
+
+        try:
+            deducted = await self.userdata.update_one(self._deduct_filter(user_id, costs), self._deduct_update(costs))
+        except Exception:
+            await self._release(user_id, record)
+            raise
+        if deducted.matched_count:
+            return BUILT
+
+        # Resources ran out between the menu render and the click
+        self.stats.conflicts += 1
+        await self._release(user_id, record)
+        return INSUFFICIENT
+
+    async def _release(self, user_id, record):
+        field, _, mask = inventory.building_bit(record["id"])
+        await self.invdata.update_one(
+            inventory.current({"userid": user_id}),
+            {"$bit": {field: {"and": ~mask}}, "$unset": {f"built.{record['id']}": "", f"timedowns.{record['id']}": ""}},
+        )
+
+    async def _claim_failure(self, user_id, migrated):
+        """Why a claim matched nothing; None when a legacy inventory was just converted and the claim should be retried"""
+        inv_data = await self.invdata.find_one({"userid": user_id}, {"inv_version": 1})
+        if inv_data is None:
+            return NOT_REGISTERED
+        # The claim never matches a version 1 inventory
+        if inventory.is_legacy(inv_data) and not migrated and await inventory.migrate(self.invdata, user_id):
+            return None
+        self.stats.conflicts += 1
+        return ALREADY_BUILT
+
+    async def _construct_transaction(self, user_id, costs, record, timedown=None, migrated=False):
+        userdata = self.db.db["userdata"]
+        invdata = self.db.db["invdata"]
+        claim_query, claim_update = self._claim(user_id, record, timedown)
+        deduct_query = self._deduct_filter(user_id, costs)
+        deduct_update = self._deduct_update(costs)
+        calls = 0
+        results = {}
+
+        def callback(session):
+            nonlocal calls
+            calls += 1
+            results["invdata"] = invdata.update_one(claim_query, claim_update, session=session)
+            if not results["invdata"].matched_count:
+                raise _Abort(ALREADY_BUILT)
+            results["userdata"] = userdata.update_one(deduct_query, deduct_update, session=session)
+            if not results["userdata"].matched_count:
+                raise _Abort(INSUFFICIENT)
+
+        def run():
+            with userdata.database.client.start_session() as session:
+                try:
+                    session.with_transaction(callback)
+                except _Abort as abort:
+                    return abort.status
+            return BUILT
+
+        try:
+            status = await self.db.run("construction.transaction", run)
+        finally:
+            # with_transaction re-runs the callback on transient write conflicts
+            self.stats.retries += max(0, calls - 1)
+            # The session bypassed the async wrappers, so drop cached copies by hand
+            self.userdata.invalidate({"userid": user_id})
+            self.invdata.invalidate({"userid": user_id})
+        if status == BUILT:
+            # Leaderboards and the premium cache follow writes through the wrappers' listeners
+            self.invdata._notify("update_one", (claim_query, claim_update), results["invdata"])
+            self.userdata._notify("update_one", (deduct_query, deduct_update), results["userdata"])
+        if status == ALREADY_BUILT:
+            status = await self._claim_failure(user_id, migrated)
+            if status is None:
+                return await self._construct_transaction(user_id, costs, record, timedown, migrated=True)
+        if status == INSUFFICIENT:
+            self.stats.conflicts += 1
+        return status
@@ -0,0 +1,130 @@
+import heapq
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("COOLDOWN_MAX_ENTRIES", "1000000"))
+
+
+class CooldownStore:
+    """Bounded in-process cooldown table.
+
+    Expiries are `time.monotonic()` deadlines kept in one dict per command,
+    so a check is a single dict lookup. A min-heap of deadlines lets every
+    call drop whatever has already expired, which keeps memory proportional
+    to the users actually on cooldown. When `max_entries` is reached the
+    entries closest to expiry are evicted first.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.shards = {}  # command -> {user_id: deadline}
+        self.heap = []  # (deadline, command, user_id)
+        self.size = 0
+        self.evictions = 0
+
+    def remaining(self, command, user_id, now=None):
+        now = time.monotonic() if now is None else now
+        deadline = self.shards.get(command, {}).get(user_id)
+        if deadline is None or deadline <= now:
+            return 0.0
+        return deadline - now
+
+    def set(self, command, user_id, seconds, now=None):
+        now = time.monotonic() if now is None else now
+        shard = self.shards.setdefault(command, {})
+        if user_id not in shard:
+            self.size += 1
+        deadline = now + seconds
+        shard[user_id] = deadline
+        heapq.heappush(self.heap, (deadline, command, user_id))
+        while self.size > self.max_entries:
+            self._pop(force=True)
+            self.evictions += 1
+
+    def prune(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self.heap and self.heap[0][0] <= now:
+            self._pop()
+
+    def _pop(self, force=False):
+        while self.heap:
+            deadline, command, user_id = heapq.heappop(self.heap)
+            shard = self.shards.get(command)
+            # Stale heap entry: the user's cooldown was renewed since it was pushed
+            if shard is None or shard.get(user_id) != deadline:
+                continue
+            del shard[user_id]
+            if not shard:
+                del self.shards[command]
+            self.size -= 1
+            return
+        if force:
+            self.size = 0
+
+    def __len__(self):
+        return self.size
+
+
+class MongoCooldownBackend:
+    """Shares cooldowns across bot processes and survives restarts.
+
+    One document per `command:user_id` holds the wall-clock deadline. A TTL
+    index on `expires` (see schema.py) lets Mongo delete finished cooldowns.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def acquire(self, command, user_id, seconds):
+        """Starts the cooldown and returns 0, or returns the seconds left"""
+        now = time.time()
+        key = f"{command}:{user_id}"
+        document = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$max": {"until": now}},
+            upsert=True,
+            return_document=True,
+        )
+        if document.get("until", 0) > now:
+            return document["until"] - now
+        # Only one process can move the deadline forward from the expired value
+        claimed = await self.collection.update_one(
+            {"_id": key, "until": document["until"]},
+            {"$set": {"until": now + seconds, "expires": datetime.now(timezone.utc) + timedelta(seconds=seconds)}},
+        )
+        if claimed.matched_count:
+            return 0.0
+        current = await self.collection.find_one({"_id": key})
+        return max(0.0, current.get("until", 0) - now) if current else 0.0
+
+
+class CooldownService:
+    """Shared cooldown checks for every cog, kept on the bot so `!reload` keeps them"""
+
+    def __init__(self, store=None, backend=None):
+        self.store = store or CooldownStore()
+        self.backend = backend
+        self.checks = 0
+
+    async def check(self, command, user_id, seconds):
+        """Returns `(on_cooldown, remaining_seconds)` and starts the cooldown when free"""
+        self.checks += 1
+        now = time.monotonic()
+        self.store.prune(now)
+        remaining = self.store.remaining(command, user_id, now)
+        if remaining:
+            return True, int(remaining)
+
+        if self.backend is not None:
+            remaining = await self.backend.acquire(command, user_id, seconds)
+            if remaining:
+                # Mirror the other process's cooldown locally to skip the next round-trip
+                self.store.set(command, user_id, remaining, now)
+                return True, int(remaining)
+
+        self.store.set(command, user_id, seconds, now)
+        return False, 0
+
+    def snapshot(self):
+        return {"entries": len(self.store), "evictions": self.store.evictions, "checks": self.checks}
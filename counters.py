@@ -0,0 +1,128 @@
+import logging
+import os
+import random
+import time
+
+from periodic import PeriodicTask
+
+logger = logging.getLogger("discord")
+
+DEFAULT_STRIPES = int(os.getenv("COUNTER_STRIPES", "16"))
+DEFAULT_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "2"))
+
+
+class StripedCounter:
+    """A global counter spread over `stripes` documents in `counters`.
+
+    `increment()` only adds to an in-process tally. A background task
+    flushes that tally every `flush_interval` seconds as one `$inc` on a
+    random stripe, so a signup wave costs a handful of writes spread over
+    several documents instead of one write per signup on a single hot
+    document. `total()` sums the stripes (cached for `read_ttl` seconds) and
+    adds whatever has not been flushed yet from this process.
+    """
+
+    def __init__(self, collection, name, stripes=DEFAULT_STRIPES, flush_interval=DEFAULT_FLUSH_INTERVAL, read_ttl=5.0):
+        self.collection = collection
+        self.name = name
+        self.stripes = stripes
+        self.flush_interval = flush_interval
+        self.read_ttl = read_ttl
+        self.pending = 0
+        self.flushes = 0
+        self.cached_total = None
+        self.cached_at = 0.0
+        self.flusher = PeriodicTask(f"Counter {name} flush", self.flush, flush_interval)
+
+    def _stripe_id(self, stripe):
+        return f"{self.name}:{stripe}"
+
+    async def seed(self, value):
+        """Carries over a pre-existing count once; later calls are no-ops"""
+        await self.collection.update_one(
+            {"_id": f"{self.name}:seed"},
+            {"$setOnInsert": {"counter": self.name, "value": value}},
+            upsert=True,
+        )
+
+    def increment(self, amount=1):
+        self.pending += amount
+
+    async def add(self, amount=1):
+        """Writes straight to a random stripe, skipping the in-process tally"""
+        stripe = random.randrange(self.stripes)
+        await self.collection.update_one(
+            {"_id": self._stripe_id(stripe)},
+            {"$inc": {"value": amount}, "$setOnInsert": {"counter": self.name}},
+            upsert=True,
+        )
+
+    async def flush(self):
+        delta, self.pending = self.pending, 0
+        if not delta:
+            return
+        try:
+            await self.add(delta)
+            self.flushes += 1
+            if self.cached_total is not None:
+                self.cached_total += delta
+        except Exception as e:
+            # Keep the tally; the next flush retries it
+            self.pending += delta
+            logger.error(f"Failed to flush counter {self.name}: {e}")
+
+    async def total(self, exact=False):
+        now = time.monotonic()
+        if exact or self.cached_total is None or now - self.cached_at > self.read_ttl:
+            documents = await self.collection.find({"counter": self.name}, {"value": 1})
+            self.cached_total = sum(document.get("value", 0) for document in documents)
+            self.cached_at = now
+        return self.cached_total + self.pending
+
+    def start(self):
+        return self.flusher.start()
+
+    async def aclose(self):
+        await self.flusher.aclose()
+        await self.flush()
+
+    def snapshot(self):
+        return {"pending": self.pending, "flushes": self.flushes, "cached_total": self.cached_total}
+
+
+class GlobalStats:
+    """Keeps `globaldata.users` as the published user count.
+
+    The striped counter is the source of truth. `publish()` periodically
+    writes its total into the owner's globaldata document so anything that
+    reads `users` there keeps working, at the cost of being a few seconds
+    behind.
+    """
+
+    def __init__(self, database, owner="alphayg", publish_interval=30.0):
+        self.globaldata = database["globaldata"]
+        self.owner = owner
+        self.publish_interval = publish_interval
+        self.users = StripedCounter(database["counters"], "users")
+        self.published = None
+        self.publisher = PeriodicTask("Global stats publish", self.publish, publish_interval)
+
+    async def bootstrap(self):
+        document = await self.globaldata.find_one({"owner": self.owner}, {"users": 1})
+        await self.users.seed((document or {}).get("users", 0))
+
+    async def publish(self):
+        total = await self.users.total(exact=True)
+        if total != self.published:
+            await self.globaldata.update_one({"owner": self.owner}, {"$set": {"users": total}})
+            self.published = total
+
+    def start(self, publisher=True):
+        self.users.start()
+        # Only one process needs to publish when running clustered
+        if publisher:
+            self.publisher.start()
+
+    async def aclose(self):
+        await self.publisher.aclose()
+        await self.users.aclose()
@@ -0,0 +1,293 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import UpdateOne
+
+from metrics import charge
+
+logger = logging.getLogger("discord")
+
+# Number of threads allowed to talk to Mongo at once
+DEFAULT_WORKERS = int(os.getenv("MONGO_WORKERS", "16"))
+
+
+class LatencyStats:
+    """Rolling latency samples for a single collection operation"""
+
+    def __init__(self, window=2048):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+
+    def record(self, elapsed, ok=True):
+        self.samples.append(elapsed)
+        self.count += 1
+        self.total += elapsed
+        if not ok:
+            self.errors += 1
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+        }
+
+
+class DatabaseMetrics:
+    """Per-call latency metrics keyed by `collection.operation`"""
+
+    def __init__(self):
+        self.ops = {}
+
+    def record(self, name, elapsed, ok=True):
+        stats = self.ops.get(name)
+        if stats is None:
+            stats = self.ops[name] = LatencyStats()
+        stats.record(elapsed, ok)
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in sorted(self.ops.items())}
+
+    def reset(self):
+        self.ops.clear()
+
+
+def _included_fields(projection):
+    # Only plain inclusion projections are understood; None means the full document
+    if not projection:
+        return None
+    if isinstance(projection, dict):
+        return [field for field, include in projection.items() if include and field != "_id"]
+    return list(projection)
+
+
+def _project(document, fields):
+    if document is None or fields is None:
+        return document
+    projected = {field: document[field] for field in fields if field in document}
+    if "_id" in document:
+        projected["_id"] = document["_id"]
+    return projected
+
+
+def _changed_nothing(result):
+    # An acknowledged update that modified and upserted nothing left every cached document current
+    return (getattr(result, "acknowledged", False) and getattr(result, "modified_count", None) == 0
+            and getattr(result, "upserted_id", None) is None)
+
+
+class AsyncCollection:
+    """Awaitable wrapper around a pymongo collection.
+
+    When the database has a document cache and this collection is cached,
+    `find_one({"userid": ...})` is served from it and every write through
+    this wrapper invalidates the documents it may have touched.
+    """
+
+    def __init__(self, database, collection, cache=None):
+        self.database = database
+        self.collection = collection
+        self.name = collection.name
+        self.cache = cache
+
+    async def _run(self, op, *args, **kwargs):
+        func = getattr(self.collection, op)
+        return await self.database.run(f"{self.name}.{op}", func, *args, **kwargs)
+
+    def _cache_key(self, query):
+        if isinstance(query, dict) and isinstance(query.get("userid"), str):
+            return (self.name, query["userid"])
+        return None
+
+    def invalidate(self, query=None):
+        """Drops cached documents a write matching `query` could have changed"""
+        if self.cache is None:
+            return
+        key = self._cache_key(query)
+        if key is not None:
+            self.cache.invalidate(key)
+        else:
+            self.cache.invalidate_collection(self.name)
+
+    def invalidate_each(self, queries):
+        """`invalidate()` for several writes: one key per user, the whole collection only for unkeyed filters"""
+        if self.cache is None:
+            return
+        keys = [self._cache_key(query) for query in queries]
+        if None in keys:
+            self.cache.invalidate_collection(self.name)
+            return
+        for key in keys:
+            self.cache.invalidate(key)
+
+    def _notify(self, op, args, result):
+        for listener in self.database.listeners.get(self.name, ()):
+            try:
+                listener(op, args, result)
+            except Exception as e:
+                logger.error(f"Write listener on {self.name} failed: {e}", exc_info=True)
+
+    async def _write(self, op, query, *args, **kwargs):
+        result = None
+        try:
+            result = await self._run(op, query, *args, **kwargs)
+        finally:
+            if not _changed_nothing(result):
+                self.invalidate(query)
+        self._notify(op, (query, *args), result)
+        return result
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        key = None
+        if self.cache is not None and not kwargs and len(query or {}) == 1:
+            key = self._cache_key(query)
+        if key is None:
+            return await self._run("find_one", query, projection, **kwargs)
+
+        fields = _included_fields(projection)
+        found, document = self.cache.get(key, fields)
+        if found:
+            return _project(document, fields)
+        token = self.cache.begin_read(key)
+        document = None
+        fill = False
+        try:
+            document = await self._run("find_one", query, projection)
+            fill = True
+        finally:
+            self.cache.end_read(key, token, document, fill, fields)
+        return document
+
+    async def find(self, *args, limit=0, **kwargs):
+        # Cursors iterate lazily over the network, so drain them on the executor too
+        def fetch():
+            cursor = self.collection.find(*args, **kwargs)
+            if limit:
+                cursor = cursor.limit(limit)
+            return list(cursor)
+        return await self.database.run(f"{self.name}.find", fetch)
+
+    async def insert_one(self, document, *args, **kwargs):
+        result = await self._run("insert_one", document, *args, **kwargs)
+        key = self._cache_key(document)
+        if self.cache is not None and key is not None:
+            # Write-through: the freshly inserted document is the current state
+            self.cache.invalidate(key)
+            self.cache.set(key, document)
+        self._notify("insert_one", (document, *args), result)
+        return result
+
+    async def insert_many(self, documents, *args, **kwargs):
+        try:
+            result = await self._run("insert_many", documents, *args, **kwargs)
+        finally:
+            self.invalidate()
+        self._notify("insert_many", (documents, *args), result)
+        return result
+
+    async def update_one(self, query, *args, **kwargs):
+        return await self._write("update_one", query, *args, **kwargs)
+
+    async def update_many(self, query, *args, **kwargs):
+        return await self._write("update_many", query, *args, **kwargs)
+
+    async def find_one_and_update(self, query, *args, **kwargs):
+        return await self._write("find_one_and_update", query, *args, **kwargs)
+
+    async def delete_one(self, query, *args, **kwargs):
+        return await self._write("delete_one", query, *args, **kwargs)
+
+    async def delete_many(self, query, *args, **kwargs):
+        return await self._write("delete_many", query, *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return await self._run("count_documents", *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        try:
+            result = await self._run("bulk_write", *args, **kwargs)
+        finally:
+            self.invalidate()
+        self._notify("bulk_write", args, result)
+        return result
+
+    async def bulk_update(self, updates, ordered=True):
+        """One `bulk_write` of an `UpdateOne` per `(filter, update)` pair.
+
+        Unlike `bulk_write()`, which cannot see inside the requests and drops
+        the whole collection from the cache, only the users the filters name
+        are invalidated, and listeners get the pairs themselves.
+        """
+        updates = list(updates)
+        requests = [UpdateOne(query, update) for query, update in updates]
+        try:
+            result = await self._run("bulk_write", requests, ordered=ordered)
+        finally:
+            self.invalidate_each(query for query, _ in updates)
+        self._notify("bulk_update", (updates,), result)
+        return result
+
+
+class AsyncDatabase:
+    """Shared data-access layer for every cog.
+
+    pymongo is blocking, so each call is offloaded to a bounded thread pool
+    and timed. Cogs get collections with `db["name"]` exactly like before,
+    but every operation has to be awaited. Passing a `DocumentCache` puts
+    per-user reads of `cached_collections` behind it.
+    """
+
+    def __init__(self, db, max_workers=DEFAULT_WORKERS, cache=None, cached_collections=("userdata", "invdata")):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo")
+        self.metrics = DatabaseMetrics()
+        self.cache = cache
+        self.cached_collections = set(cached_collections)
+        self.collections = {}
+        self.listeners = {}
+
+    def __getitem__(self, name):
+        collection = self.collections.get(name)
+        if collection is None:
+            cache = self.cache if name in self.cached_collections else None
+            collection = self.collections[name] = AsyncCollection(self, self.db[name], cache)
+        return collection
+
+    def add_listener(self, name, callback):
+        """Calls `callback(op, args, result)` after every successful write to collection `name`"""
+        self.listeners.setdefault(name, []).append(callback)
+
+    async def run(self, label, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        except Exception:
+            elapsed = time.perf_counter() - start
+            self.metrics.record(label, elapsed, ok=False)
+            charge("db", elapsed)
+            raise
+        elapsed = time.perf_counter() - start
+        self.metrics.record(label, elapsed)
+        charge("db", elapsed)
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import os
+import time
+
+import inventory
+from models import RESOURCES
+from periodic import PeriodicTask
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger("discord")
+
+TICK_INTERVAL = float(os.getenv("ECONOMY_TICK_INTERVAL", "3600"))
+BATCH_SIZE = int(os.getenv("ECONOMY_BATCH_SIZE", "5000"))
+# Buildings stop producing after this long without a settlement
+STORAGE_HOURS = float(os.getenv("ECONOMY_STORAGE_HOURS", "12"))
+
+# Hourly output for the tutorial buildings when buildings.json has no `produces`
+DEFAULT_PRODUCTION = {
+    "Oil Refinery": {"oil": 60},
+    "Steel Foundry": {"steel": 60},
+    "Grain Silos": {"food": 60},
+    "Armory": {"gold": 30},
+    "Research Lab": {"intel": 20},
+}
+
+
+def production_table(data):
+    """building id -> hourly output vector in RESOURCES order"""
+    table = {}
+    for building in data.buildings:
+        produces = building.produces or DEFAULT_PRODUCTION.get(building.name, {})
+        if produces:
+            table[building.id] = tuple(produces.get(resource, 0) for resource in RESOURCES)
+    return table
+
+
+def _elapsed(now, since, settled, storage):
+    start = max(since, settled)
+    if not start:
+        # Neither clock is known (players from before the economy); the first settle starts economy_at
+        return 0
+    return min(max(0, now - start), storage)
+
+
+def carry_vector(carry):
+    """`economy_carry` in RESOURCES order"""
+    carry = carry or {}
+    return [carry.get(resource, 0) for resource in RESOURCES]
+
+
+def accrue(buildings, settled, table, now, storage=STORAGE_HOURS * 3600, carry=None):
+    """Resources one player's buildings produced since `settled`, without writing anything.
+
+    Production is counted in unit-seconds (rate per hour times seconds) and
+    only whole units are paid out. Returns `(amounts, carry)`: the whole
+    units per resource, and the unit-seconds left over in RESOURCES order,
+    which the settle stores in `economy_carry` so frequent settles lose
+    nothing. `carry` is the stored leftover from the last settle.
+    """
+    totals = carry_vector(carry)
+    for building in buildings:
+        rates = table.get(building.get("id"))
+        if rates is None:
+            continue
+        elapsed = _elapsed(now, building.get("since", 0), settled, storage)
+        for i, rate in enumerate(rates):
+            totals[i] += rate * elapsed
+    return {resource: total // 3600 for resource, total in zip(RESOURCES, totals)}, [total % 3600 for total in totals]
+
+
+def accrue_batch(players, table, now, storage=STORAGE_HOURS * 3600):
+    """Vectorized `accrue` over many players.
+
+    `players` is a list of `(settled, buildings, carry)`. Returns
+    `(amounts, carries)`: one list of whole per-resource amounts and one of
+    leftover unit-seconds per player, in RESOURCES order. Uses NumPy when it
+    is installed; the pure Python path gives identical results.
+    """
+    if np is None:
+        results = [accrue(buildings, settled, table, now, storage, carry) for settled, buildings, carry in players]
+        return [[amounts[r] for r in RESOURCES] for amounts, _ in results], [carry for _, carry in results]
+
+    owners, since, rate_rows = [], [], []
+    settled = np.fromiter((player[0] for player in players), dtype=np.int64, count=len(players))
+    totals = np.asarray([carry_vector(player[2]) for player in players], dtype=np.int64).reshape(-1, len(RESOURCES))
+    for index, (_, buildings, _) in enumerate(players):
+        for building in buildings:
+            rates = table.get(building.get("id"))
+            if rates is not None:
+                owners.append(index)
+                since.append(building.get("since", 0))
+                rate_rows.append(rates)
+    if owners:
+        owners = np.asarray(owners, dtype=np.intp)
+        start = np.maximum(np.asarray(since, dtype=np.int64), settled[owners])
+        elapsed = np.clip(now - start, 0, int(storage))
+        elapsed[start == 0] = 0
+        np.add.at(totals, owners, np.asarray(rate_rows, dtype=np.int64) * elapsed[:, None])
+    return (totals // 3600).tolist(), (totals % 3600).tolist()
+
+
+def needs_settle(settled, amounts):
+    # Players without economy_at get it started even when nothing is owed yet
+    return not settled or any(amounts)
+
+
+def settle_update(user_id, settled, amounts, carry, now):
+    """Filter and update crediting `amounts` once; a concurrent settle makes it a no-op"""
+    # Documents from before the economy lack `economy_at`; $in with None matches those
+    query = {"userid": user_id, "economy_at": {"$in": [0, None]} if not settled else settled}
+    increments = {resource: amount for resource, amount in zip(RESOURCES, amounts) if amount}
+    update = {"$set": {
+        "economy_at": now,
+        "economy_carry": {resource: left for resource, left in zip(RESOURCES, carry) if left},
+    }}
+    if increments:
+        update["$inc"] = increments
+    return query, update
+
+
+class EconomyEngine:
+    """Settles building production for every player in batched passes.
+
+    Production is never stored per tick: a building yields its hourly rate
+    for the time since it was built (`since`) or since the player was last
+    settled (`userdata.economy_at`), capped at `storage_hours`. Fractions of
+    a unit are carried over in `economy_carry` rather than dropped, and
+    players without `economy_at` get their clock started by their first
+    settle. A scheduled pass reads inventories in `_id` order, computes a
+    whole batch at once and applies it with one unordered bulk write on
+    userdata, which invalidates only those players' cached documents. Each update
+    requires `economy_at` to still be the value the pass read, so a
+    concurrent `settle_user()` and a pass never credit the same hours twice.
+    """
+
+    def __init__(self, db, game_data, interval=TICK_INTERVAL, batch_size=BATCH_SIZE, storage_hours=STORAGE_HOURS):
+        self.userdata = db["userdata"]
+        self.invdata = db["invdata"]
+        self.game_data = game_data
+        self.interval = interval
+        self.batch_size = batch_size
+        self.storage = int(storage_hours * 3600)
+        self.table = {}
+        self.table_version = None
+        self.ticker = PeriodicTask("Economy tick", self.tick, interval)
+        self.last_pass = {}
+
+    def _table(self):
+        data = self.game_data.current()
+        if data.version != self.table_version:
+            self.table = production_table(data)
+            self.table_version = data.version
+        return self.table
+
+    async def settle_user(self, user_id, now=None):
+        """Credits one player's production right away; returns what was credited"""
+        now = int(time.time()) if now is None else now
+        inv_data, user = await asyncio.gather(
+            self.invdata.find_one({"userid": user_id}, {"built": 1, "buildings": 1}),
+            self.userdata.find_one({"userid": user_id}, {"economy_at": 1, "economy_carry": 1}),
+        )
+        if inv_data is None or user is None:
+            return {}
+        settled = user.get("economy_at", 0)
+        amounts, carry = accrue(inventory.buildings(inv_data), settled, self._table(), now, self.storage,
+                                user.get("economy_carry"))
+        amounts = [amounts[r] for r in RESOURCES]
+        if not needs_settle(settled, amounts):
+            # Nothing whole produced yet; leave the clock running instead of writing
+            return {}
+        query, update = settle_update(user_id, settled, amounts, carry, now)
+        result = await self.userdata.update_one(query, update)
+        return {r: amount for r, amount in zip(RESOURCES, amounts) if amount} if result.matched_count else {}
+
+    async def _batches(self):
+        last_id = None
+        # Players owning at least one building, in either inventory layout
+        query = {"$or": [{"built": {"$exists": True, "$ne": {}}}, {"buildings.id": {"$exists": True}}]}
+        while True:
+            page = dict(query)
+            if last_id is not None:
+                page["_id"] = {"$gt": last_id}
+            batch = await self.invdata.find(page, {"userid": 1, "built": 1, "buildings": 1}, sort=[("_id", 1)], limit=self.batch_size)
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]["_id"]
+            if len(batch) < self.batch_size:
+                return
+
+    async def tick(self, now=None):
+        """One pass over every player with buildings"""
+        now = int(time.time()) if now is None else now
+        started = time.perf_counter()
+        table = self._table()
+        players = credited = 0
+        compute = 0.0
+
+        async for batch in self._batches():
+            ids = [inventory["userid"] for inventory in batch]
+            users = await self.userdata.find({"userid": {"$in": ids}}, {"userid": 1, "economy_at": 1, "economy_carry": 1})
+            users = {user["userid"]: user for user in users}
+            rows = [
+                (users[inv["userid"]].get("economy_at", 0), inventory.buildings(inv), users[inv["userid"]].get("economy_carry"))
+                for inv in batch if inv["userid"] in users
+            ]
+            owners = [inv["userid"] for inv in batch if inv["userid"] in users]
+
+            start = time.perf_counter()
+            amounts, carries = await asyncio.to_thread(accrue_batch, rows, table, now, self.storage)
+            compute += time.perf_counter() - start
+
+            updates = [
+                settle_update(user_id, settled, produced, carry, now)
+                for user_id, (settled, _, _), produced, carry in zip(owners, rows, amounts, carries)
+                if needs_settle(settled, produced)
+            ]
+            if updates:
+                result = await self.userdata.bulk_update(updates, ordered=False)
+                credited += result.matched_count
+            players += len(rows)
+
+        self.last_pass = {
+            "players": players,
+            "credited": credited,
+            "compute_ms": round(compute * 1000, 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "at": now,
+        }
+        logger.info(f"Economy tick: {self.last_pass}")
+        return self.last_pass
+
+    def start(self):
+        return self.ticker.start()
+
+    def snapshot(self):
+        return {"numpy": np is not None, "last_pass": self.last_pass}
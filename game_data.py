@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+
+from models import USER_DEFAULTS, user_fields
+from periodic import PeriodicTask
+
+logger = logging.getLogger("discord")
+
+DATA_DIR = "data"
+BUILDINGS_FILE = os.path.join(DATA_DIR, "buildings.json")
+EMOJIS_FILE = os.path.join(DATA_DIR, "emojis.json")
+
+# Keys of a building definition that are not resource requirements
+META_KEYS = ("description", "id", "produces", "build_time")
+
+
+class GameDataError(ValueError):
+    pass
+
+
+class Building:
+    """A building definition compiled for fast requirement checks.
+
+    `costs` is aligned with `GameData.resources`, so checking a player is a
+    single pairwise comparison against their resource vector.
+    """
+
+    __slots__ = ("index", "name", "id", "description", "costs", "cost_map", "requirements", "produces", "build_time")
+
+    def __init__(self, index, name, id, description, costs, cost_map, requirements, produces, build_time=0):
+        self.index = index
+        self.name = name
+        self.id = id
+        self.description = description
+        self.costs = costs
+        self.cost_map = cost_map
+        self.requirements = requirements  # ((resource, label, emoji, amount), ...)
+        self.produces = produces  # {resource: amount per hour}
+        self.build_time = build_time  # seconds until it is finished, 0 for instant
+
+    def affordable(self, vector):
+        for have, need in zip(vector, self.costs):
+            if have < need:
+                return False
+        return True
+
+
+class GameData:
+    """Immutable snapshot of everything loaded from `data/`"""
+
+    def __init__(self, buildings, emojis, version):
+        self.version = version
+        self.raw_buildings = MappingProxyType(buildings)
+        self.emojis = MappingProxyType(emojis)
+        self.resources = tuple(sorted({name for data in buildings.values() for name in _requirement_names(data)}))
+        position = {resource: i for i, resource in enumerate(self.resources)}
+
+        compiled = []
+        for index, (name, data) in enumerate(buildings.items()):
+            cost_map = {key.lower(): value for key, value in data.items() if key not in META_KEYS}
+            costs = [0] * len(self.resources)
+            for resource, amount in cost_map.items():
+                costs[position[resource]] = amount
+            requirements = tuple(
+                (key.lower(), key.capitalize(), emojis.get(key.lower(), ""), value)
+                for key, value in data.items() if key not in META_KEYS
+            )
+            compiled.append(Building(index, name, data.get("id", 0), data.get("description", "No description available."),
+                                     tuple(costs), MappingProxyType(cost_map), requirements,
+                                     MappingProxyType({key.lower(): value for key, value in data.get("produces", {}).items()}),
+                                     data.get("build_time", 0)))
+        self.buildings = tuple(compiled)
+        self.by_name = MappingProxyType({building.name: building for building in compiled})
+        self.by_id = MappingProxyType({building.id: building for building in compiled})
+
+        # Only resources some building asks for are read from userdata
+        self.user_fields = user_fields(*(r for r in self.resources if r in USER_DEFAULTS))
+
+    def vector(self, user_data):
+        """The player's balances in `resources` order"""
+        return tuple(user_data.get(resource, 0) for resource in self.resources)
+
+    def meets_requirements(self, user_data, building):
+        return building.affordable(self.vector(user_data))
+
+
+def _requirement_names(data):
+    return [key.lower() for key in data if key not in META_KEYS]
+
+
+def validate_buildings(buildings):
+    if not isinstance(buildings, dict):
+        raise GameDataError("buildings.json must map building names to definitions")
+    seen_ids = {}
+    for name, data in buildings.items():
+        if not isinstance(data, dict):
+            raise GameDataError(f"Building {name!r} must be an object")
+        building_id = data.get("id", 0)
+        if not isinstance(building_id, int):
+            raise GameDataError(f"Building {name!r} has a non-integer id")
+        if "id" in data and building_id in seen_ids:
+            raise GameDataError(f"Buildings {seen_ids[building_id]!r} and {name!r} share id {building_id}")
+        seen_ids[building_id] = name
+        if not isinstance(data.get("description", ""), str):
+            raise GameDataError(f"Building {name!r} has a non-string description")
+        produces = data.get("produces", {})
+        if not isinstance(produces, dict) or not all(
+            isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in produces.values()
+        ):
+            raise GameDataError(f"Building {name!r} produces must map resources to non-negative integers per hour")
+        build_time = data.get("build_time", 0)
+        if isinstance(build_time, bool) or not isinstance(build_time, int) or build_time < 0:
+            raise GameDataError(f"Building {name!r} build_time must be a non-negative number of seconds")
+        for key, value in data.items():
+            if key in META_KEYS:
+                continue
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise GameDataError(f"Building {name!r} requirement {key!r} must be a non-negative integer")
+
+
+def validate_emojis(emojis):
+    if not isinstance(emojis, dict) or not all(isinstance(v, str) for v in emojis.values()):
+        raise GameDataError("emojis.json must map names to emoji strings")
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class GameDataRegistry:
+    """Loads `data/*.json` once and hot-swaps a new snapshot when they change.
+
+    Cogs call `current()` and keep the returned `GameData` for the whole
+    command, so a reload mid-command never mixes two versions. `current()`
+    never touches the disk: a background task started with `start()` stats
+    the files every `check_interval` seconds and reads, validates and swaps
+    in a changed snapshot on a worker thread. A reload that fails validation
+    keeps serving the previous snapshot.
+    """
+
+    def __init__(self, buildings_path=BUILDINGS_FILE, emojis_path=EMOJIS_FILE, check_interval=5.0):
+        self.buildings_path = buildings_path
+        self.emojis_path = emojis_path
+        self.check_interval = check_interval
+        self.data = GameData({}, {}, 0)
+        self.mtimes = None
+        self.reload_lock = threading.Lock()
+        self.checker = PeriodicTask("Game data check", self.check, check_interval)
+
+    def _stat(self):
+        mtimes = []
+        for path in (self.buildings_path, self.emojis_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def load(self):
+        """(Re)reads both files and swaps in a new snapshot if they are valid"""
+        with self.reload_lock:
+            mtimes = self._stat()
+            try:
+                buildings = _read_json(self.buildings_path)
+                validate_buildings(buildings)
+            except Exception as e:
+                logger.error(f"Error loading buildings: {e}")
+                buildings = None
+            try:
+                emojis = _read_json(self.emojis_path)
+                validate_emojis(emojis)
+            except Exception as e:
+                logger.error(f"Error loading emojis: {e}")
+                emojis = None
+
+            if buildings is None and emojis is None and self.data.version:
+                self.mtimes = mtimes
+                return self.data
+            if buildings is None:
+                buildings = dict(self.data.raw_buildings)
+            if emojis is None:
+                emojis = dict(self.data.emojis)
+            self.data = GameData(buildings, emojis, self.data.version + 1)
+            self.mtimes = mtimes
+            logger.info(f"Loaded game data v{self.data.version}: {len(self.data.buildings)} buildings")
+            return self.data
+
+    def current(self):
+        return self.data
+
+    async def check(self):
+        """Reloads off the event loop if either file changed since the last load"""
+        if await asyncio.to_thread(self._stat) != self.mtimes:
+            await asyncio.to_thread(self.load)
+        return self.data
+
+    def start(self):
+        return self.checker.start()
+
@@ -0,0 +1,250 @@
+import ast
+import asyncio
+import hashlib
+import importlib
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger("discord")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+EXTENSIONS_PACKAGE = "commands"
+
+# Set HOT_RELOAD_WATCH=1 in development to reload edited cogs automatically
+WATCH = os.getenv("HOT_RELOAD_WATCH", "0") == "1"
+WATCH_INTERVAL = float(os.getenv("HOT_RELOAD_INTERVAL", "1"))
+
+
+def _digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _imports(path):
+    """Top-level module names a source file imports"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+    return names
+
+
+class ReloadReport:
+    def __init__(self):
+        self.reloaded = []
+        self.loaded = []
+        self.unloaded = []
+        self.modules = []
+        self.failed = {}
+        self.unchanged = 0
+        self.elapsed = 0.0
+        self.sync = None
+
+    @property
+    def changed(self):
+        return bool(self.reloaded or self.loaded or self.unloaded)
+
+    def summary(self):
+        if not self.changed and not self.failed:
+            return f"✅ No changes, {self.unchanged} extensions up to date"
+        parts = []
+        if self.reloaded:
+            parts.append(f"reloaded {', '.join(self.reloaded)}")
+        if self.loaded:
+            parts.append(f"loaded {', '.join(self.loaded)}")
+        if self.unloaded:
+            parts.append(f"unloaded {', '.join(self.unloaded)}")
+        if self.modules:
+            parts.append(f"via {', '.join(self.modules)}")
+        if self.unchanged:
+            parts.append(f"{self.unchanged} unchanged")
+        if self.sync:
+            parts.append(f"sync: {self.sync}")
+        icon = "⚠️" if self.failed else "🔄"
+        message = f"{icon} {'; '.join(parts) or 'nothing reloaded'} ({self.elapsed * 1000:.0f} ms)"
+        for name, error in self.failed.items():
+            message += f"\n❌ `{name}`: {error}"
+        return message
+
+
+class HotReloader:
+    """Reloads only the extensions whose source, or a local module they
+    import, changed since the last load.
+
+    Files are compared by content hash (mtime is only a shortcut to skip
+    rehashing untouched files). Changed local helper modules are reloaded
+    first, in import order, then every extension that depends on them.
+    Cogs can list attributes in `PRESERVE_ON_RELOAD` to hand caches over to
+    their replacement, unless the attribute's class was reloaded itself.
+    """
+
+    def __init__(self, bot, root=ROOT, package=EXTENSIONS_PACKAGE):
+        self.bot = bot
+        self.root = root
+        self.package = package
+        self.files = {}  # module name -> (mtime_ns, digest)
+        self.lock = asyncio.Lock()
+        self.watcher = None
+
+    def _path(self, module):
+        return os.path.join(self.root, *module.split(".")) + ".py"
+
+    def extensions(self):
+        directory = os.path.join(self.root, self.package)
+        return sorted(f"{self.package}.{file[:-3]}" for file in os.listdir(directory)
+                      if file.endswith(".py") and not file.startswith("__"))
+
+    def _local(self, name):
+        return "." not in name and os.path.isfile(self._path(name))
+
+    def _dependencies(self, module, graph):
+        # Local helper modules imported by `module`, transitively
+        if module in graph:
+            return graph[module]
+        graph[module] = set()
+        try:
+            direct = {name for name in _imports(self._path(module)) if self._local(name)}
+        except (OSError, SyntaxError):
+            direct = set()
+        found = set(direct)
+        for name in direct:
+            found |= self._dependencies(name, graph)
+        graph[module] = found
+        return found
+
+    def _fingerprint(self, module):
+        path = self._path(module)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        known = self.files.get(module)
+        if known is not None and known[0] == mtime:
+            return known
+        return (mtime, _digest(path))
+
+    def scan(self):
+        """Current fingerprints of every extension and the helpers they import"""
+        graph = {}
+        modules = set()
+        for ext in self.extensions():
+            modules.add(ext)
+            modules |= self._dependencies(ext, graph)
+        return {module: self._fingerprint(module) for module in modules}, graph
+
+    def _changed(self, current):
+        def digest(print_):
+            return print_[1] if print_ else None
+        return {module for module, print_ in current.items() if digest(self.files.get(module)) != digest(print_)}
+
+    def mark_loaded(self):
+        """Records the current sources as the loaded baseline"""
+        self.files, _ = self.scan()
+
+    def _carry_state(self, ext, reloaded_modules):
+        preserved = {}
+        for cog in list(self.bot.cogs.values()):
+            if cog.__module__ != ext:
+                continue
+            state = {}
+            for name in getattr(cog, "PRESERVE_ON_RELOAD", ()):
+                value = getattr(cog, name, None)
+                if value is not None and type(value).__module__ not in reloaded_modules:
+                    state[name] = value
+            preserved[type(cog).__name__] = state
+        return preserved
+
+    def _restore_state(self, preserved):
+        for cog in self.bot.cogs.values():
+            for name, value in preserved.get(type(cog).__name__, {}).items():
+                setattr(cog, name, value)
+
+    async def reload(self, force=False):
+        async with self.lock:
+            start = time.perf_counter()
+            report = ReloadReport()
+            current, graph = await asyncio.to_thread(self.scan)
+            changed = self._changed(current)
+            loaded = set(self.bot.extensions)
+            extensions = self.extensions()
+            if force:
+                changed.update(extensions)
+
+            # Helpers first, in dependency order, so extensions import the new code
+            stale_helpers = {module for module in current if "." not in module and
+                             (module in changed or graph.get(module, set()) & changed)}
+            broken = set()
+            for module in sorted(stale_helpers, key=lambda name: len(graph.get(name, ()))):
+                if module not in sys.modules:
+                    continue
+                if graph.get(module, set()) & broken:
+                    broken.add(module)
+                    continue
+                try:
+                    importlib.reload(sys.modules[module])
+                    report.modules.append(module)
+                except Exception as e:
+                    broken.add(module)
+                    report.failed[module] = e
+                    logger.error(f"Failed to reload module {module}: {e}", exc_info=True)
+
+            for ext in extensions:
+                affected = ext in changed or graph.get(ext, set()) & stale_helpers
+                if not affected and ext in loaded:
+                    report.unchanged += 1
+                    continue
+                if graph.get(ext, set()) & broken:
+                    report.failed[ext] = "a module it imports failed to reload"
+                    continue
+                try:
+                    if ext in loaded:
+                        preserved = self._carry_state(ext, set(report.modules))
+                        # reload_extension rolls back to the old version if the new one fails
+                        await self.bot.reload_extension(ext)
+                        self._restore_state(preserved)
+                        report.reloaded.append(ext)
+                    else:
+                        await self.bot.load_extension(ext)
+                        report.loaded.append(ext)
+                except Exception as e:
+                    broken.add(ext)
+                    report.failed[ext] = e
+                    logger.error(f"Failed to reload {ext}: {e}", exc_info=True)
+
+            for ext in sorted(loaded):
+                if ext.startswith(f"{self.package}.") and ext not in extensions:
+                    try:
+                        await self.bot.unload_extension(ext)
+                        report.unloaded.append(ext)
+                    except Exception as e:
+                        report.failed[ext] = e
+
+            # Failed modules are forgotten so the next reload retries them
+            for module, print_ in current.items():
+                self.files[module] = None if module in broken else print_
+            report.elapsed = time.perf_counter() - start
+            if report.changed or report.failed:
+                logger.info(f"Hot reload: {report.summary()}")
+            return report
+
+    async def watch(self, interval=WATCH_INTERVAL, on_reload=None):
+        """Development mode: polls the sources and reloads whatever changed"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                report = await self.reload()
+                if report.changed and on_reload is not None:
+                    await on_reload(report)
+            except Exception as e:
+                logger.error(f"Hot reload watcher error: {e}", exc_info=True)
+
+    def start_watching(self, on_reload=None):
+        if self.watcher is None or self.watcher.done():
+            self.watcher = asyncio.get_running_loop().create_task(self.watch(on_reload=on_reload))
+        return self.watcher
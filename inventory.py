@@ -0,0 +1,142 @@
+import logging
+
+logger = logging.getLogger("discord")
+
+# invdata layout version. Version 2 keys everything by id:
+#   owned      {word: int}          bitset of building ids, WORD_BITS ids per word
+#   built      {building id: since} when each building's production clock starts
+#   units      {unit type: count}   recruited with $inc
+#   timedowns  {building id: {"name", "due"}} constructions still in progress
+# Version 1 documents hold `buildings`, `units` and `timedowns` as arrays and
+# are rewritten once by migrate() the first time a command needs them.
+INVENTORY_VERSION = 2
+
+# Bit 63 would make the stored int64 negative, so each word holds 63 ids
+WORD_BITS = 63
+
+
+def _word(building_id):
+    return str(building_id // WORD_BITS), 1 << (building_id % WORD_BITS)
+
+
+def building_bit(building_id):
+    """`(field, position, mask)` of a building's bit in the owned bitset.
+
+    Queries must use the position: Mongo's `$bitsAll*` only take numeric
+    masks below 2**31, while `$bit` updates take the full int64 mask.
+    """
+    word, mask = _word(building_id)
+    return f"owned.{word}", building_id % WORD_BITS, mask
+
+
+def empty():
+    return {"owned": {}, "built": {}, "units": {}, "timedowns": {}, "inv_version": INVENTORY_VERSION}
+
+
+def is_legacy(inventory):
+    return inventory.get("inv_version", 1) < INVENTORY_VERSION
+
+
+def owns(inventory, building_id):
+    """O(1) ownership check on a fetched inventory of either version"""
+    word, mask = _word(building_id)
+    if inventory.get("owned", {}).get(word, 0) & mask:
+        return True
+    # Version 1 documents are scanned until migrate() rewrites them
+    return any(b.get("id") == building_id for b in inventory.get("buildings") or ())
+
+
+def buildings(inventory):
+    """Owned buildings as `{"id", "since"}` records, whichever version the document is"""
+    records = [{"id": int(building_id), "since": since} for building_id, since in inventory.get("built", {}).items()]
+    for building in inventory.get("buildings") or ():
+        records.append({"id": building.get("id"), "since": building.get("since", 0)})
+    return records
+
+
+def unit_counts(inventory):
+    units = inventory.get("units") or {}
+    if isinstance(units, dict):
+        return units
+    counts = {}
+    for unit in units:
+        counts[unit.get("type")] = counts.get(unit.get("type"), 0) + unit.get("count", 0)
+    return counts
+
+
+def current(query):
+    """Restricts a filter to migrated documents, so dotted id paths are safe to write"""
+    return dict(query, inv_version=INVENTORY_VERSION)
+
+
+def migration(inventory):
+    """The update turning a version 1 document into version 2"""
+    owned, built = {}, {}
+    for building in inventory.get("buildings") or ():
+        building_id = building.get("id")
+        if not isinstance(building_id, int):
+            continue
+        word, mask = _word(building_id)
+        owned[word] = owned.get(word, 0) | mask
+        built[str(building_id)] = building.get("since", 0)
+    timedowns = {
+        str(timedown.get("id")): {"name": timedown.get("name"), "due": timedown.get("due")}
+        for timedown in inventory.get("timedowns") or () if isinstance(timedown, dict)
+    }
+    units = {key: count for key, count in unit_counts(inventory).items() if key and count}
+    update = {"$set": {"owned": owned, "built": built, "units": units, "timedowns": timedowns,
+                       "inv_version": INVENTORY_VERSION}}
+    if "buildings" in inventory:
+        update["$unset"] = {"buildings": ""}
+    return update
+
+
+async def migrate(collection, user_id):
+    """Rewrites the player's inventory to the current layout if it is still version 1.
+
+    Returns True when the player has an inventory in the current layout
+    afterwards, whoever converted it, and False when they have none. Every
+    write of the keyed layout is filtered on `inv_version` (see current()),
+    so a version 1 document cannot change between the read and this update
+    and whole-field `$set`s lose nothing. The same filter makes concurrent
+    migrations of one player apply once.
+    """
+    inventory = await collection.find_one({"userid": user_id})
+    if inventory is None:
+        return False
+    if not is_legacy(inventory):
+        return True
+    result = await collection.update_one(
+        {"userid": user_id, "inv_version": {"$ne": INVENTORY_VERSION}}, migration(inventory)
+    )
+    if result.matched_count:
+        logger.info(f"Migrated inventory of {user_id} to version {INVENTORY_VERSION}")
+    return True
+
+
+async def update_current(collection, user_id, query, update):
+    """`update_one` on the player's migrated document, migrating a legacy one first.
+
+    A miss is retried once the document is known to be current, so writes
+    racing the migration are not lost; a genuine miss costs one extra read
+    and write.
+    """
+    query = current(dict(query, userid=user_id))
+    result = await collection.update_one(query, update)
+    if not result.matched_count and await migrate(collection, user_id):
+        result = await collection.update_one(query, update)
+    return result
+
+
+async def recruit(collection, user_id, unit, count):
+    """Adds `count` units with a single `$inc`; concurrent recruits never lose each other"""
+    result = await update_current(collection, user_id, {}, {"$inc": {f"units.{unit}": count}})
+    return bool(result.matched_count)
+
+
+async def disband(collection, user_id, unit, count):
+    """Removes `count` units only if the player has that many; returns False otherwise"""
+    result = await update_current(
+        collection, user_id, {f"units.{unit}": {"$gte": count}}, {"$inc": {f"units.{unit}": -count}}
+    )
+    return bool(result.matched_count)
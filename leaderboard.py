@@ -0,0 +1,357 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+
+from periodic import PeriodicTask
+
+logger = logging.getLogger("discord")
+
+# userdata fields ranked by default; LEADERBOARDS adds others such as "oil,steel"
+DEFAULT_BOARDS = tuple(
+    field.strip() for field in os.getenv("LEADERBOARDS", "exp,wins,gold").split(",") if field.strip()
+)
+REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "5"))
+# Clustered processes only observe their own writes; a periodic rebuild catches up
+REBUILD_INTERVAL = float(os.getenv("LEADERBOARD_REBUILD_INTERVAL", "900"))
+
+# Scores below 2**EXACT_BITS get a bucket each; above that a bucket spans
+# 1/2**SUB_BITS of its power of two, and scores past 2**MAX_BITS share the last one
+EXACT_BITS = 16
+SUB_BITS = 12
+MAX_BITS = 48
+EXACT_BUCKETS = 1 << EXACT_BITS
+BUCKETS = EXACT_BUCKETS + (MAX_BITS - EXACT_BITS) * (1 << SUB_BITS)
+
+
+def bucket_of(score):
+    if score < EXACT_BUCKETS:
+        return max(score, 0)
+    exponent = score.bit_length() - 1
+    if exponent >= MAX_BITS:
+        return BUCKETS - 1
+    mantissa = (score >> (exponent - SUB_BITS)) & ((1 << SUB_BITS) - 1)
+    return EXACT_BUCKETS + ((exponent - EXACT_BITS) << SUB_BITS) + mantissa
+
+
+class Leaderboard:
+    """Ranks every player on one score with O(log n) updates and rank queries.
+
+    Scores are mapped to ordered buckets (exact below 65536, 1/4096 of a
+    power of two above) and a Fenwick tree counts the players per bucket,
+    so the number of players ahead of a score is one prefix sum plus the
+    few bucket-mates with a higher exact score. Ranks are competition
+    ranks: equal scores share a rank. Each bucket keeps its members, which
+    lets top() walk down from the highest bucket without sorting anyone
+    outside the result.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.tree = [0] * (BUCKETS + 1)
+        self.scores = {}  # userid -> score
+        self.members = {}  # bucket -> set of userids
+        self.version = 0
+        self.top_cache = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _add(self, bucket, delta):
+        i = bucket + 1
+        while i <= BUCKETS:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        """Players in buckets 0..bucket"""
+        i, total = bucket + 1, 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, position):
+        """Bucket holding the `position`-th lowest player (1-based)"""
+        i, step = 0, 1 << (BUCKETS.bit_length() - 1)
+        while step:
+            nxt = i + step
+            if nxt <= BUCKETS and self.tree[nxt] < position:
+                i = nxt
+                position -= self.tree[nxt]
+            step >>= 1
+        return i  # 0-based bucket
+
+    def load(self, rows):
+        """Replaces the board with `(userid, score)` rows, building the tree in O(buckets)"""
+        counts = [0] * (BUCKETS + 1)
+        self.scores = {}
+        self.members = {}
+        for user_id, score in rows:
+            score = max(int(score or 0), 0)
+            bucket = bucket_of(score)
+            self.scores[user_id] = score
+            self.members.setdefault(bucket, set()).add(user_id)
+            counts[bucket + 1] += 1
+        for i in range(1, BUCKETS + 1):
+            parent = i + (i & -i)
+            if parent <= BUCKETS:
+                counts[parent] += counts[i]
+        self.tree = counts
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self.top_cache.clear()
+
+    def set(self, user_id, score):
+        score = max(int(score or 0), 0)
+        old = self.scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._unlink(user_id, old)
+        self.scores[user_id] = score
+        bucket = bucket_of(score)
+        self.members.setdefault(bucket, set()).add(user_id)
+        self._add(bucket, 1)
+        self._changed()
+
+    def add(self, user_id, delta):
+        """Applies an `$inc`; returns False when the player is not on the board"""
+        old = self.scores.get(user_id)
+        if old is None:
+            return False
+        self.set(user_id, old + delta)
+        return True
+
+    def remove(self, user_id):
+        old = self.scores.pop(user_id, None)
+        if old is not None:
+            self._unlink(user_id, old)
+            self._changed()
+
+    def _unlink(self, user_id, score):
+        bucket = bucket_of(score)
+        members = self.members[bucket]
+        members.discard(user_id)
+        if not members:
+            del self.members[bucket]
+        self._add(bucket, -1)
+
+    def _ahead_in_bucket(self, bucket, score):
+        if bucket < EXACT_BUCKETS:
+            return 0
+        return sum(1 for user_id in self.members[bucket] if self.scores[user_id] > score)
+
+    def rank(self, user_id):
+        """1-based competition rank, or None for players not on the board"""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        bucket = bucket_of(score)
+        ahead = len(self.scores) - self._prefix(bucket) + self._ahead_in_bucket(bucket, score)
+        return ahead + 1
+
+    def top(self, k=10):
+        """The best `k` as `(rank, userid, score)`, ties ordered by userid"""
+        cached = self.top_cache.get(k)
+        if cached is not None:
+            return cached
+        entries = []
+        position = len(self.scores)
+        while len(entries) < k and position > 0:
+            bucket = self._find(position)
+            members = self.members[bucket]
+            needed = k - len(entries)
+            if bucket < EXACT_BUCKETS:
+                # Everyone here has the same score; a zero bucket can hold most players
+                chosen = heapq.nsmallest(needed, members)
+            else:
+                chosen = sorted(members, key=lambda user_id: (-self.scores[user_id], user_id))[:needed]
+            entries.extend((user_id, self.scores[user_id]) for user_id in chosen)
+            position -= len(members)
+
+        result = []
+        for index, (user_id, score) in enumerate(entries):
+            rank = result[-1][0] if result and result[-1][2] == score else index + 1
+            result.append((rank, user_id, score))
+        self.top_cache[k] = result
+        return result
+
+
+def _update_fields(update, field):
+    """How `update` touches `field`: ("set", value), ("inc", delta), ("other", None) or None"""
+    if field in update.get("$set", {}):
+        return "set", update["$set"][field]
+    if field in update.get("$inc", {}):
+        return "inc", update["$inc"][field]
+    for op, fields in update.items():
+        if op not in ("$set", "$inc") and isinstance(fields, dict) and field in fields:
+            return "other", None
+    return None
+
+
+class Leaderboards:
+    """Keeps one Leaderboard per ranked userdata field in step with the writes.
+
+    `rebuild()` reads each field through its `(field desc, userid)`
+    compound index (schema.py) as a covered query. After that the boards
+    follow the userdata writes the cogs already make: AsyncDatabase hands
+    every successful write to `observe()`, which applies `$set` and `$inc`
+    values directly. Writes it cannot apply exactly (a partly matched bulk
+    write, an upsert, an unfamiliar operator) mark the players dirty, and a
+    background task re-reads just those players every few seconds.
+    """
+
+    def __init__(self, database, fields=DEFAULT_BOARDS, refresh_interval=REFRESH_INTERVAL,
+                 rebuild_interval=REBUILD_INTERVAL):
+        self.userdata = database["userdata"]
+        self.fields = tuple(fields)
+        self.boards = {field: Leaderboard(field) for field in self.fields}
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.dirty = set()
+        self.stale = False
+        self.rebuilding = False
+        self.reading = frozenset()  # players whose refresh read is in flight
+        self.rebuilt_at = 0.0
+        self.applied = 0
+        self.refreshed = 0
+        self.refresher = PeriodicTask("Leaderboard refresh", self._catch_up, refresh_interval)
+        database.add_listener("userdata", self.observe)
+
+    def get(self, field):
+        return self.boards.get(field)
+
+    async def _read_board(self, field):
+        documents = await self.userdata.find(
+            {}, {"_id": 0, "userid": 1, field: 1}, sort=[(field, -1), ("userid", 1)]
+        )
+        board = Leaderboard(field)
+        await asyncio.to_thread(board.load, [(document.get("userid"), document.get(field, 0)) for document in documents])
+        return board
+
+    async def rebuild(self):
+        started = time.perf_counter()
+        self.rebuilding = True
+        try:
+            boards = await asyncio.gather(*(self._read_board(field) for field in self.fields))
+        finally:
+            self.rebuilding = False
+        self.stale = False
+        self.boards = {board.field: board for board in boards}
+        self.rebuilt_at = time.time()
+        # Writes that landed while the boards were being read
+        await self.refresh()
+        elapsed = time.perf_counter() - started
+        logger.info(f"Rebuilt leaderboards {', '.join(self.fields)} for {len(boards[0]) if boards else 0} players in {elapsed:.2f}s")
+
+    def observe(self, op, args, result):
+        """Write listener registered on userdata"""
+        if op in ("insert_one", "insert_many"):
+            documents = [args[0]] if op == "insert_one" else args[0]
+            for document in documents:
+                if isinstance(document.get("userid"), str):
+                    for board in self.boards.values():
+                        board.set(document["userid"], document.get(board.field, 0))
+                    if self._reading(document["userid"]):
+                        # The documents being read may predate this insert
+                        self.dirty.add(document["userid"])
+            self.applied += 1
+        elif op == "update_one":
+            exact = result.matched_count == 1 and result.upserted_id is None
+            self._observe_update(args[0], args[1], exact=exact, matched=exact or result.upserted_id is not None)
+        elif op == "find_one_and_update":
+            self._observe_update(args[0], args[1], exact=result is not None, matched=result is not None)
+        elif op == "bulk_update":
+            updates = args[0]
+            exact = result.matched_count == len(updates) and not getattr(result, "upserted_count", 0)
+            for query, update in updates:
+                if not isinstance(query, dict) or not isinstance(update, dict):
+                    self.stale = True
+                    continue
+                self._observe_update(query, update, exact=exact, matched=True)
+        elif op == "update_many" and isinstance(args[1], dict) and all(
+                _update_fields(args[1], field) is None for field in self.boards):
+            # Moves no score, like the premium sweep
+            pass
+        else:
+            query = args[0] if args else None
+            user_id = query.get("userid") if isinstance(query, dict) else None
+            if isinstance(user_id, str):
+                self.dirty.add(user_id)
+            else:
+                self.stale = True
+
+    def _reading(self, user_id):
+        return self.rebuilding or user_id in self.reading
+
+    def _observe_update(self, query, update, exact, matched):
+        user_id = query.get("userid")
+        touched = [(board, _update_fields(update, board.field)) for board in self.boards.values()]
+        touched = [(board, change) for board, change in touched if change is not None]
+        if not touched:
+            return
+        if not isinstance(user_id, str):
+            self.stale = True
+            return
+        if not matched:
+            return
+        if not exact:
+            self.dirty.add(user_id)
+            return
+        if self._reading(user_id):
+            # The documents being read may predate this write
+            self.dirty.add(user_id)
+        for board, (kind, value) in touched:
+            if kind == "set":
+                board.set(user_id, value)
+            elif kind != "inc" or not board.add(user_id, value):
+                self.dirty.add(user_id)
+        self.applied += 1
+
+    async def refresh(self):
+        if not self.dirty:
+            return
+        user_ids, self.dirty = list(self.dirty), set()
+        self.reading = frozenset(user_ids)
+        projection = {"_id": 0, "userid": 1, **{field: 1 for field in self.fields}}
+        try:
+            documents = await self.userdata.find({"userid": {"$in": user_ids}}, projection)
+        except Exception:
+            self.dirty.update(user_ids)
+            raise
+        finally:
+            self.reading = frozenset()
+        found = {document["userid"]: document for document in documents}
+        for user_id in user_ids:
+            if user_id in self.dirty:
+                # Written while the read was in flight, so the document may be older than the board; read it again next time
+                continue
+            document = found.get(user_id)
+            for board in self.boards.values():
+                if document is None:
+                    board.remove(user_id)
+                else:
+                    board.set(user_id, document.get(board.field, 0))
+        self.refreshed += len(user_ids)
+
+    async def _catch_up(self):
+        if self.stale or time.time() - self.rebuilt_at > self.rebuild_interval:
+            await self.rebuild()
+        else:
+            await self.refresh()
+
+    def start(self):
+        return self.refresher.start()
+
+    def snapshot(self):
+        return {
+            "players": {field: len(board) for field, board in self.boards.items()},
+            "applied": self.applied,
+            "refreshed": self.refreshed,
+            "dirty": len(self.dirty),
+            "rebuilt_at": self.rebuilt_at,
+        }
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import deque
+
+MESSAGE_LIMIT = 2000  # Discord message limit
+DEFAULT_CAPACITY = int(os.getenv("LOG_BUFFER_SIZE", "5000"))
+DEFAULT_FALLBACK_PATH = os.getenv("LOG_FALLBACK_PATH", os.path.join("logs", "discord_fallback.log"))
+
+
+class DiscordHandler(logging.Handler):
+    """Ships log records to a Discord channel without ever blocking the caller.
+
+    `emit` only appends to a bounded ring buffer (dropping the oldest record
+    on overflow) and nudges a single consumer task. The consumer packs as
+    many records as fit into one 2000-char message, backs off on 429s using
+    Discord's retry-after, and writes batches it cannot deliver to a local
+    file instead.
+    """
+
+    def __init__(self, bot, channel_id, capacity=DEFAULT_CAPACITY, fallback_path=DEFAULT_FALLBACK_PATH,
+                 linger=0.5, min_interval=1.0, max_interval=30.0):
+        super().__init__()
+        self.bot = bot
+        self.channel_id = channel_id
+        self.channel = None
+        self.buffer = deque(maxlen=capacity)
+        self.buffer_lock = threading.Lock()
+        self.fallback_path = fallback_path
+        self.linger = linger
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+
+        self.loop = None
+        self.wake = None
+        self.task = None
+        self.signalled = False
+
+        self.emitted = 0
+        self.dropped = 0
+        self.shipped = 0
+        self.messages = 0
+        self.fallback = 0
+        self.rate_limited = 0
+
+    def emit(self, record):
+        """This can run in any thread, so it only touches the locked buffer"""
+        try:
+            entry = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.buffer_lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(entry)
+            self.emitted += 1
+            signal = not self.signalled and self.loop is not None
+            if signal:
+                self.signalled = True
+        if signal:
+            try:
+                self.loop.call_soon_threadsafe(self.wake.set)
+            except RuntimeError:
+                pass  # Loop already closed during shutdown
+
+    def start(self, loop=None):
+        """Starts the consumer; safe to call more than once"""
+        if self.task is not None and not self.task.done():
+            return self.task
+        self.loop = loop or asyncio.get_running_loop()
+        self.wake = asyncio.Event()
+        self.task = self.loop.create_task(self.consume())
+        self.task.add_done_callback(self._restart)
+        self.wake.set()  # Flush anything logged before the loop existed
+        return self.task
+
+    def _restart(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Log consumer crashed, restarting: {task.exception()}", file=sys.stderr)
+            self.task = None
+            self.start(self.loop)
+
+    def _pack(self):
+        """Pops as many whole records as fit in one message, splitting oversized ones"""
+        parts = []
+        size = 0
+        with self.buffer_lock:
+            while self.buffer:
+                entry = self.buffer[0]
+                if len(entry) > MESSAGE_LIMIT:
+                    if parts:
+                        break
+                    self.buffer[0] = entry[MESSAGE_LIMIT:]
+                    parts.append(entry[:MESSAGE_LIMIT])
+                    break
+                added = len(entry) + (1 if parts else 0)
+                if size + added > MESSAGE_LIMIT:
+                    break
+                parts.append(self.buffer.popleft())
+                size += added
+        return "\n".join(parts), len(parts)
+
+    def pending_chars(self):
+        with self.buffer_lock:
+            return sum(len(entry) + 1 for entry in self.buffer)
+
+    async def consume(self):
+        """The one task allowed to talk to Discord for this handler"""
+        await self.bot.wait_until_ready()
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            with self.buffer_lock:
+                self.signalled = False
+
+            # Adaptive flush: a full message goes out now, a trickle waits to batch up
+            if self.pending_chars() < MESSAGE_LIMIT:
+                await asyncio.sleep(self.linger)
+
+            while True:
+                message, count = self._pack()
+                if not count:
+                    break
+                await self.ship(message, count)
+                await asyncio.sleep(self.interval)
+
+    async def ship(self, message, count):
+        if self.channel is None:
+            self.channel = self.bot.get_channel(self.channel_id)
+        if self.channel is None:
+            await self.write_fallback(message)
+            return
+        try:
+            await self.channel.send(message)
+        except Exception as e:
+            retry_after = _retry_after(e)
+            if retry_after is None:
+                print(f"Error shipping logs to Discord: {e}", file=sys.stderr)
+                await self.write_fallback(message)
+                return
+            # Rate limited: slow down and try this batch once more
+            self.rate_limited += 1
+            self.interval = min(self.max_interval, max(self.interval * 2, retry_after))
+            await asyncio.sleep(retry_after)
+            try:
+                await self.channel.send(message)
+            except Exception:
+                await self.write_fallback(message)
+                return
+        self.shipped += count
+        self.messages += 1
+        # Recover towards the base pace after each successful send
+        self.interval = max(self.min_interval, self.interval * 0.75)
+
+    async def write_fallback(self, message):
+        self.fallback += 1
+        await asyncio.to_thread(self._append_file, message)
+
+    def _append_file(self, message):
+        directory = os.path.dirname(self.fallback_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.fallback_path, "a", encoding="utf-8") as f:
+            f.write(message + "\n")
+
+    async def aclose(self):
+        """Cancels the consumer and spills anything still buffered to the fallback file"""
+        if self.task is not None:
+            self.task.remove_done_callback(self._restart)
+            self.task.cancel()
+        while True:
+            message, count = self._pack()
+            if not count:
+                break
+            await self.write_fallback(message)
+
+    def snapshot(self):
+        return {
+            "buffered": len(self.buffer),
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "shipped": self.shipped,
+            "messages": self.messages,
+            "fallback_batches": self.fallback,
+            "rate_limited": self.rate_limited,
+            "interval": round(self.interval, 2),
+        }
+
+
+def _retry_after(error):
+    # discord.RateLimited carries retry_after; a raw 429 HTTPException carries the headers
+    if getattr(error, "retry_after", None) is not None:
+        return float(error.retry_after)
+    if getattr(error, "status", None) == 429:
+        headers = getattr(getattr(error, "response", None), "headers", {}) or {}
+        return float(headers.get("Retry-After", headers.get("X-RateLimit-Reset-After", 1.0)))
+    return None
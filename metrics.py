@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+logger = logging.getLogger("discord")
+
+# Set METRICS_PORT to serve Prometheus text on 127.0.0.1:<port>/metrics
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Upper bounds in seconds, Prometheus' default latency buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The command currently running in this task, if any
+_span = ContextVar("command_span", default=None)
+
+
+class Span:
+    """Time one command invocation spent in Mongo and in Discord's API"""
+
+    __slots__ = ("command", "started", "db", "api", "errors")
+
+    def __init__(self, command):
+        self.command = command
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.api = 0.0
+        self.errors = 0
+
+
+def charge(kind, elapsed):
+    """Adds `elapsed` seconds of `db` or `api` time to the running command"""
+    span = _span.get()
+    if span is not None:
+        setattr(span, kind, getattr(span, kind) + elapsed)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class CommandStats:
+    __slots__ = ("total", "db", "api", "calls", "errors", "in_flight")
+
+    def __init__(self):
+        self.total = Histogram()
+        self.db = Histogram()
+        self.api = Histogram()
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records logged while a command runs against that command"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record):
+        span = _span.get()
+        if span is not None:
+            span.errors += 1
+
+
+class Instrumentation:
+    """Per-command latency, DB time, API time, errors and in-flight counts.
+
+    `begin()` and `end()` run from the bot's invoke hooks. DB time comes
+    from `AsyncDatabase.run` and API time from a wrapper around the HTTP
+    client, both charged to the command running in the current task via a
+    context variable. Errors are commands that raised or logged at ERROR
+    level, which is how every cog reports failures.
+    """
+
+    def __init__(self):
+        self.commands = {}
+        self.error_counter = ErrorCounter()
+        self.started = time.time()
+
+    def _stats(self, name):
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+        return stats
+
+    def install(self, bot):
+        logging.getLogger("discord").addHandler(self.error_counter)
+        request = bot.http.request
+
+        async def timed_request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await request(*args, **kwargs)
+            finally:
+                charge("api", time.perf_counter() - start)
+
+        bot.http.request = timed_request
+        bot.instrumentation = self
+
+    def begin(self, ctx):
+        name = ctx.command.qualified_name
+        self._stats(name).in_flight += 1
+        ctx.span = Span(name)
+        ctx.span_token = _span.set(ctx.span)
+
+    def end(self, ctx):
+        span = getattr(ctx, "span", None)
+        if span is None:
+            return
+        try:
+            _span.reset(ctx.span_token)
+        except ValueError:
+            # The hooks ran in different contexts; the span dies with the task anyway
+            pass
+        stats = self._stats(span.command)
+        stats.in_flight -= 1
+        stats.calls += 1
+        stats.total.observe(time.perf_counter() - span.started)
+        stats.db.observe(span.db)
+        stats.api.observe(span.api)
+        if span.errors or ctx.command_failed:
+            stats.errors += 1
+
+    def observe_app_command(self, name, elapsed):
+        """Slash-only commands bypass the invoke hooks; only their total is known"""
+        stats = self._stats(name)
+        stats.calls += 1
+        stats.total.observe(elapsed)
+
+    def snapshot(self):
+        return {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "in_flight": stats.in_flight,
+                "p50_ms": round(stats.total.quantile(0.5) * 1000, 1),
+                "p95_ms": round(stats.total.quantile(0.95) * 1000, 1),
+                "p99_ms": round(stats.total.quantile(0.99) * 1000, 1),
+                "db_avg_ms": round(stats.db.sum / stats.db.count * 1000, 1) if stats.db.count else 0.0,
+                "api_avg_ms": round(stats.api.sum / stats.api.count * 1000, 1) if stats.api.count else 0.0,
+            }
+            for name, stats in sorted(self.commands.items())
+        }
+
+    def render_prometheus(self):
+        lines = []
+        for metric, attr, help_text in (
+            ("legion_command_seconds", "total", "Command handling time"),
+            ("legion_command_db_seconds", "db", "Time a command spent waiting on MongoDB"),
+            ("legion_command_api_seconds", "api", "Time a command spent in Discord API calls"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, stats in sorted(self.commands.items()):
+                histogram = getattr(stats, attr)
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{command="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{command="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{command="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{metric}_count{{command="{name}"}} {histogram.count}')
+        for metric, attr, kind, help_text in (
+            ("legion_command_errors_total", "errors", "counter", "Commands that raised or logged an error"),
+            ("legion_command_in_flight", "in_flight", "gauge", "Commands currently running"),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in sorted(self.commands.items()):
+                lines.append(f'{metric}{{command="{name}"}} {getattr(stats, attr)}')
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """Minimal HTTP endpoint for Prometheus scrapes"""
+        async def handle(reader, writer):
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+                body = self.render_prometheus().encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                             b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+                await writer.drain()
+            except Exception:
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
@@ -0,0 +1,86 @@
+import copy
+import time
+
+import inventory
+
+# Spendable resources tracked on every userdata document
+RESOURCES = ("food", "steel", "oil", "gold", "intel")
+
+
+def new_user(user_id):
+    """Fresh userdata document for a newly forged Legion"""
+    return {
+        "userid": user_id,
+        "exp": 0,
+        "premium": int(time.time() + 3600),
+        "oncepremium": 0,
+        "battles": 0,
+        "wins": 0,
+        "tutorial": 0,
+        "food": 100,
+        "steel": 1000,
+        "oil": 1000,
+        "gold": 1000,
+        "intel": 100,
+        "faction": "",
+        "ext1": 0, "ext2": 0, "ext3": 0, "ext4": 0, "ext5": 0,
+        "ext6": "", "ext7": "", "ext8": "", "ext9": "", "ext10": "", "cooldowns": [],
+        # Production is settled up to this time, see economy.py
+        "economy_at": int(time.time()),
+        # Unit-seconds of production not yet worth a whole unit, per resource
+        "economy_carry": {}
+    }
+
+
+def new_inventory(user_id):
+    """Fresh invdata document for a newly forged Legion"""
+    return {
+        "userid": user_id,
+        # Keyed by id with counts and an ownership bitset, see inventory.py
+        **inventory.empty(),
+        "ext1": [], "ext2": [], "ext3": [], "ext4": [], "ext5": []
+    }
+
+
+# Values a projected read falls back to when an older document lacks a field
+USER_DEFAULTS = {key: value for key, value in new_user("").items() if key != "userid"}
+USER_DEFAULTS["premium"] = 0
+USER_DEFAULTS["economy_at"] = 0
+INVENTORY_DEFAULTS = {key: value for key, value in new_inventory("").items() if key != "userid"}
+# Documents without a version predate the keyed layout and still hold arrays
+INVENTORY_DEFAULTS["inv_version"] = 1
+INVENTORY_DEFAULTS["buildings"] = []
+
+
+class Projection:
+    """Declares which fields of a per-user document a command reads.
+
+    `fetch` returns None when the user has no document, otherwise a dict with
+    `_id` plus exactly the declared fields, missing ones filled from defaults.
+    An empty projection is an existence check.
+    """
+
+    def __init__(self, fields, defaults):
+        unknown = [field for field in fields if field not in defaults]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        self.fields = tuple(fields)
+        self.defaults = defaults
+        self.spec = {field: 1 for field in self.fields} or {"_id": 1}
+
+    async def fetch(self, collection, user_id):
+        document = await collection.find_one({"userid": user_id}, self.spec)
+        if document is None:
+            return None
+        for field in self.fields:
+            if field not in document:
+                document[field] = copy.deepcopy(self.defaults[field])
+        return document
+
+
+def user_fields(*fields):
+    return Projection(fields, USER_DEFAULTS)
+
+
+def inventory_fields(*fields):
+    return Projection(fields, INVENTORY_DEFAULTS)
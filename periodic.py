@@ -0,0 +1,53 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("discord")
+
+
+class PeriodicTask:
+    """Awaits `callback()` every `interval` seconds on a background task.
+
+    `interval` may also be a function returning the next delay, for loops
+    that pace themselves. `wake()` ends the current wait early. A callback
+    that raises is logged as "`name` failed" and runs again next time; the
+    task only stops on `aclose()`.
+    """
+
+    def __init__(self, name, callback, interval):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.woken = asyncio.Event()
+        self.task = None
+
+    def _delay(self):
+        delay = self.interval() if callable(self.interval) else self.interval
+        return max(0.0, delay)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.woken.wait(), timeout=self._delay())
+            except asyncio.TimeoutError:
+                pass
+            self.woken.clear()
+            try:
+                await self.callback()
+            except Exception as e:
+                logger.error(f"{self.name} failed: {e}", exc_info=True)
+
+    def wake(self):
+        self.woken.set()
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        return self.task
+
+    async def aclose(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
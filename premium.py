@@ -0,0 +1,143 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from periodic import PeriodicTask
+
+logger = logging.getLogger("discord")
+
+# `userdata.premium` is the epoch second a player's premium ends, 0 for none.
+# /start grants a one hour trial.
+SWEEP_INTERVAL = float(os.getenv("PREMIUM_SWEEP_INTERVAL", "60"))
+# Grants made by another process show up here after at most this long
+CACHE_TTL = float(os.getenv("PREMIUM_CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("PREMIUM_CACHE_MAX_ENTRIES", "100000"))
+
+
+def is_active(expiry, now=None):
+    """Whether a `premium` value still grants premium at `now`"""
+    if not isinstance(expiry, (int, float)):
+        return False
+    return expiry > (time.time() if now is None else now)
+
+
+def expired_filter(now):
+    # Answered by the partial `premium_expiry` index (schema.py), which only holds players with premium set
+    return {"premium": {"$gt": 0, "$lte": now}}
+
+
+SWEEP_UPDATE = {"$set": {"premium": 0}}
+
+
+def _is_sweep(query, update):
+    # An expired_filter() write of SWEEP_UPDATE
+    return (update == SWEEP_UPDATE and isinstance(query, dict) and set(query) == {"premium"}
+            and isinstance(query["premium"], dict) and set(query["premium"]) == {"$gt", "$lte"})
+
+
+class PremiumService:
+    """Premium checks for every cog and the sweep that downgrades expired players.
+
+    `is_premium(user_id)` compares the cached expiry with the clock, so a
+    cached entry stays correct as time passes and only a new grant can make
+    it stale. Grants written through this process update the cache from the
+    write listener; other processes' grants are picked up when the entry
+    ages out after CACHE_TTL.
+
+    The sweep resets every expired `premium` to 0 with one `update_many`
+    over the partial expiry index, so it examines only the players that
+    actually expired. It writes through `userdata` like any other write, so
+    the document cache and the other listeners see it; a sweep that
+    downgrades nobody invalidates nothing. The expiry cache ignores its own
+    sweeps, since a past expiry and 0 both read as not premium.
+    """
+
+    def __init__(self, database, interval=SWEEP_INTERVAL, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.userdata = database["userdata"]
+        self.interval = interval
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.expiries = OrderedDict()  # userid -> (expiry, cached at)
+        self.hits = 0
+        self.misses = 0
+        self.downgraded = 0
+        self.last_sweep = {}
+        self.sweeper = PeriodicTask("Premium sweep", self.sweep, interval)
+        database.add_listener("userdata", self.observe)
+
+    def _remember(self, user_id, expiry):
+        self.expiries[user_id] = (expiry, time.monotonic())
+        self.expiries.move_to_end(user_id)
+        while len(self.expiries) > self.max_entries:
+            self.expiries.popitem(last=False)
+
+    async def expiry(self, user_id):
+        """The player's premium expiry, 0 when they have none or no Legion"""
+        entry = self.expiries.get(user_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        document = await self.userdata.find_one({"userid": user_id}, {"premium": 1})
+        expiry = document.get("premium", 0) if document else 0
+        self._remember(user_id, expiry)
+        return expiry
+
+    async def is_premium(self, user_id):
+        return is_active(await self.expiry(user_id))
+
+    def observe(self, op, args, result):
+        """Write listener registered on userdata"""
+        if op in ("insert_one", "insert_many"):
+            documents = [args[0]] if op == "insert_one" else args[0]
+            for document in documents:
+                if document.get("userid") in self.expiries:
+                    self._remember(document["userid"], document.get("premium", 0))
+            return
+        if op == "bulk_update":
+            writes = args[0]
+        elif op == "bulk_write":
+            # Opaque requests: anything may have changed
+            writes = [(None, None)]
+        else:
+            writes = [(args[0] if args else None, args[1] if len(args) > 1 else None)]
+        for query, update in writes:
+            if _is_sweep(query, update):
+                continue
+            user_id = query.get("userid") if isinstance(query, dict) else None
+            touched = not isinstance(update, dict) or any(
+                isinstance(fields, dict) and "premium" in fields for fields in update.values()
+            )
+            if op.startswith("delete") or touched:
+                if isinstance(user_id, str):
+                    self.expiries.pop(user_id, None)
+                else:
+                    self.expiries.clear()
+
+    async def sweep(self, now=None):
+        """Downgrades every player whose premium has ended; returns how many"""
+        started = time.perf_counter()
+        now = int(time.time()) if now is None else now
+        result = await self.userdata.update_many(expired_filter(now), SWEEP_UPDATE)
+        self.downgraded += result.modified_count
+        self.last_sweep = {
+            "at": now,
+            "downgraded": result.modified_count,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        if result.modified_count:
+            logger.info(f"Premium ended for {result.modified_count} players")
+        return result.modified_count
+
+    def start(self):
+        return self.sweeper.start()
+
+    def snapshot(self):
+        return {
+            "cached": len(self.expiries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "downgraded": self.downgraded,
+            "last_sweep": self.last_sweep,
+        }
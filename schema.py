@@ -0,0 +1,102 @@
+import logging
+import os
+
+from leaderboard import DEFAULT_BOARDS
+
+logger = logging.getLogger("discord")
+
+# Set STRICT_INDEXES=1 to refuse to start when a hot query would scan a collection
+STRICT_INDEXES = os.getenv("STRICT_INDEXES", "0") == "1"
+
+# (collection, keys, options)
+INDEXES = [
+    ("userdata", [("userid", 1)], {"unique": True, "name": "userid_unique"}),
+    ("invdata", [("userid", 1)], {"unique": True, "name": "userid_unique"}),
+    ("globaldata", [("owner", 1)], {"unique": True, "name": "owner_unique"}),
+    ("counters", [("counter", 1)], {"name": "counter"}),
+    # Scheduler refills read pending timers in due order
+    ("timers", [("state", 1), ("due", 1)], {"name": "state_due"}),
+    # Premium sweeps walk expiries in order; players without premium stay out of the index
+    ("userdata", [("premium", 1)], {"partialFilterExpression": {"premium": {"$gt": 0}}, "name": "premium_expiry"}),
+    # Lets Mongo delete finished cooldowns for the shared cooldown backend
+    ("cooldowns", [("expires", 1)], {"expireAfterSeconds": 0, "name": "expires_ttl"}),
+]
+# Leaderboard rebuilds read each ranked field as a covered index scan
+INDEXES += [("userdata", [(field, -1), ("userid", 1)], {"name": f"{field}_rank"}) for field in DEFAULT_BOARDS]
+
+# Queries every command runs; each must be answered by an index
+HOT_QUERIES = [
+    ("userdata", {"userid": "0"}),
+    ("invdata", {"userid": "0"}),
+    ("globaldata", {"owner": "alphayg"}),
+]
+
+
+class SchemaError(RuntimeError):
+    pass
+
+
+def plan_stages(plan):
+    """Flattens every stage name out of an explain() winning plan"""
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if key in node:
+                pending.append(node[key])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+
+def _ensure(db):
+    created = []
+    for name, keys, options in INDEXES:
+        created.append(db[name].create_index(keys, **options))
+    return created
+
+
+def _explain(db):
+    plans = {}
+    for name, query in HOT_QUERIES:
+        explained = db[name].find(query).limit(1).explain()
+        plans[name] = plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+    return plans
+
+
+async def bootstrap(database, strict=STRICT_INDEXES):
+    """Creates the indexes the bot relies on and checks the hot query plans.
+
+    Raises `SchemaError` in strict mode when an index cannot be built or a
+    hot query still plans a COLLSCAN; otherwise the problem is logged.
+    """
+    try:
+        created = await database.run("schema.create_indexes", _ensure, database.db)
+        logger.info(f"Ensured indexes: {', '.join(created)}")
+    except Exception as e:
+        # Usually means duplicate userids already exist
+        logger.error(f"Failed to create indexes: {e}", exc_info=True)
+        if strict:
+            raise SchemaError(f"Failed to create indexes: {e}") from e
+
+    try:
+        plans = await database.run("schema.explain", _explain, database.db)
+    except Exception as e:
+        # Unreachable server, missing privileges or no explain support
+        logger.error(f"Failed to explain hot queries: {e}", exc_info=True)
+        if strict:
+            raise SchemaError(f"Failed to explain hot queries: {e}") from e
+        return {}
+    regressed = [name for name, stages in plans.items() if "COLLSCAN" in stages]
+    for name, stages in plans.items():
+        logger.info(f"Query plan for {name}: {' <- '.join(stages)}")
+    if regressed:
+        message = f"Hot queries fall back to COLLSCAN on: {', '.join(regressed)}"
+        logger.error(message)
+        if strict:
+            raise SchemaError(message)
+    return plans
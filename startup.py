@@ -0,0 +1,56 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("discord")
+
+# One JSON line per start, so cold-start time can be compared across releases
+DEFAULT_HISTORY_PATH = os.getenv("STARTUP_HISTORY_PATH", os.path.join("logs", "startup.jsonl"))
+
+
+class StartupTimer:
+    """Wall-clock breakdown of the phases between process start and ready"""
+
+    def __init__(self, started=None, history_path=DEFAULT_HISTORY_PATH):
+        self.started = time.perf_counter() if started is None else started
+        self.history_path = history_path
+        self.phases = {}
+
+    def mark(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, time.perf_counter() - start)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def report(self):
+        lines = [f"  {name:<12} {seconds * 1000:8.1f} ms" for name, seconds in self.phases.items()]
+        lines.append(f"  {'total':<12} {self.total() * 1000:8.1f} ms")
+        return "Startup timings:\n" + "\n".join(lines)
+
+    def snapshot(self):
+        return {
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "total_ms": round(self.total() * 1000, 1),
+        }
+
+    def save(self):
+        if not self.history_path:
+            return
+        try:
+            directory = os.path.dirname(self.history_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"at": time.time(), **self.snapshot()}) + "\n")
+        except Exception as e:
+            logger.error(f"Could not save startup timings: {e}")
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger("discord")
+
+
+def _scope(guild):
+    return "global" if guild is None else f"guild:{guild.id}"
+
+
+def _command_dict(command, tree):
+    # discord.py 2.4 made the tree an argument of to_dict()
+    try:
+        return command.to_dict(tree)
+    except TypeError:
+        return command.to_dict()
+
+
+def fingerprint(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def diff_payloads(old, new):
+    """Names of commands added, removed and changed between two payloads"""
+    old_by_name = {(command.get("type", 1), command["name"]): command for command in old}
+    new_by_name = {(command.get("type", 1), command["name"]): command for command in new}
+    return {
+        "added": sorted(name for key, name in new_by_name if (key, name) not in old_by_name),
+        "removed": sorted(name for key, name in old_by_name if (key, name) not in new_by_name),
+        "changed": sorted(name for (key, name), command in new_by_name.items()
+                          if (key, name) in old_by_name and old_by_name[(key, name)] != command),
+    }
+
+
+class SyncResult:
+    __slots__ = ("scope", "synced", "count", "diff")
+
+    def __init__(self, scope, synced, count, diff):
+        self.scope = scope
+        self.synced = synced
+        self.count = count
+        self.diff = diff
+
+    def describe(self):
+        changes = ", ".join(f"{kind}: {', '.join(names)}" for kind, names in self.diff.items() if names)
+        return changes or "no changes"
+
+
+class SyncManager:
+    """Pushes the slash command tree to Discord only when it changed.
+
+    The payload Discord would receive is hashed per scope (global or one
+    guild) and compared with the fingerprint stored in the `command_sync`
+    collection after the last successful push, so restarts, reconnects and
+    `!reload` of unchanged cogs cost no sync call at all.
+    """
+
+    def __init__(self, bot, collection):
+        self.bot = bot
+        self.collection = collection
+        self.pushes = 0
+        self.skipped = 0
+
+    def payload(self, guild=None):
+        tree = self.bot.tree
+        commands = [_command_dict(command, tree) for command in tree.get_commands(guild=guild)]
+        return sorted(commands, key=lambda command: (command.get("type", 1), command["name"]))
+
+    async def _stored(self, scope):
+        try:
+            return await self.collection.find_one({"_id": scope}) or {}
+        except Exception as e:
+            logger.error(f"Could not read sync state for {scope}: {e}")
+            return {}
+
+    async def diff(self, guild=None):
+        """Dry run: what a sync of this scope would change, without pushing"""
+        scope = _scope(guild)
+        stored = await self._stored(scope)
+        payload = self.payload(guild)
+        return SyncResult(scope, False, len(payload), diff_payloads(stored.get("commands", []), payload))
+
+    async def sync(self, guild=None, force=False):
+        scope = _scope(guild)
+        payload = self.payload(guild)
+        digest = fingerprint(payload)
+        stored = await self._stored(scope)
+        changes = diff_payloads(stored.get("commands", []), payload)
+
+        if not force and stored.get("fingerprint") == digest:
+            self.skipped += 1
+            logger.info(f"Command tree for {scope} unchanged ({len(payload)} commands), skipping sync")
+            return SyncResult(scope, False, len(payload), changes)
+
+        synced = await self.bot.tree.sync(guild=guild)
+        self.pushes += 1
+        try:
+            await self.collection.update_one(
+                {"_id": scope},
+                {"$set": {"fingerprint": digest, "commands": payload}},
+                upsert=True,
+            )
+        except Exception as e:
+            # The push went through; the next start simply syncs once more
+            logger.error(f"Could not store sync state for {scope}: {e}")
+        return SyncResult(scope, True, len(synced), changes)
+
+    def snapshot(self):
+        return {"pushes": self.pushes, "skipped": self.skipped}
@@ -0,0 +1,17 @@
+from battle import ATTACKER, DEFENDER, army_stats, luck, resolve_batch, resolve_one
+
+
+def test_late_rounds_do_not_repeat_the_next_seed():
+    for seed in range(100):
+        for round_index in range(8, 40):
+            assert luck(seed, round_index, ATTACKER) != luck(seed + 1, round_index - 8, ATTACKER)
+            assert luck(seed, round_index, DEFENDER) != luck(seed + 1, round_index - 8, DEFENDER)
+
+
+def test_batch_matches_single_replays_with_many_rounds():
+    attackers = [army_stats({"infantry": 40 + i, "tank": i % 7}, "Nova Pact") for i in range(50)]
+    defenders = [army_stats({"infantry": 45, "artillery": i % 5}, "Sentinel Order") for i in range(50)]
+    seeds = [1_000 + i for i in range(50)]
+    winners, attacker_hp, defender_hp = resolve_batch(attackers, defenders, seeds, rounds=20)
+    for i in range(50):
+        assert resolve_one(attackers[i], defenders[i], seeds[i], rounds=20) == (winners[i], attacker_hp[i], defender_hp[i])
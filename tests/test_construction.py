@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+import inventory
+from benchmarks.memory_mongo import MemoryDatabase
+from construction import ALREADY_BUILT, BUILT, INSUFFICIENT, NOT_REGISTERED, ConstructionEngine
+from database import AsyncDatabase
+from game_data import GameData
+from timers import CONSTRUCTION
+
+RAW_BUILDINGS = {
+    "Oil Refinery": {"id": 1, "description": "Refines oil", "Steel": 400, "Oil": 300},
+    "Barracks": {"id": 70, "description": "Trains troops", "Steel": 100, "build_time": 600},
+}
+DATA = GameData(RAW_BUILDINGS, {}, 1)
+REFINERY = DATA.by_name["Oil Refinery"]
+BARRACKS = DATA.by_name["Barracks"]
+
+MODES = pytest.mark.parametrize("use_transactions", [True, False], ids=["transaction", "two-step"])
+
+
+def make_db(steel=500, oil=500, legacy=False):
+    memory = MemoryDatabase()
+    memory["userdata"].insert_one({"userid": "1", "steel": steel, "oil": oil})
+    memory["invdata"].insert_one({"userid": "1", "buildings": []} if legacy else dict(inventory.empty(), userid="1"))
+    return memory, AsyncDatabase(memory)
+
+
+def balances(memory):
+    user = memory["userdata"].find_one({"userid": "1"})
+    return user["steel"], user["oil"]
+
+
+def owned(memory, building):
+    return inventory.owns(memory["invdata"].find_one({"userid": "1"}), building.id)
+
+
+class FailingScheduler:
+    def __init__(self):
+        self.handlers = {}
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    async def schedule(self, *args, **kwargs):
+        raise ConnectionError("timers unavailable")
+
+
+@MODES
+def test_concurrent_clicks_build_once(use_transactions):
+    async def scenario():
+        memory, db = make_db()
+        engine = ConstructionEngine(db, use_transactions=use_transactions)
+        statuses = await asyncio.gather(*(engine.construct("1", REFINERY) for _ in range(3)))
+        db.close()
+        return memory, statuses
+
+    memory, statuses = asyncio.run(scenario())
+    assert sorted(statuses) == [ALREADY_BUILT, ALREADY_BUILT, BUILT]
+    assert balances(memory) == (100, 200)
+    assert owned(memory, REFINERY)
+
+
+@MODES
+def test_insufficient_resources_release_the_claim(use_transactions):
+    async def scenario():
+        memory, db = make_db(oil=100)
+        engine = ConstructionEngine(db, use_transactions=use_transactions)
+        status = await engine.construct("1", REFINERY)
+        db.close()
+        return memory, status
+
+    memory, status = asyncio.run(scenario())
+    assert status == INSUFFICIENT
+    assert balances(memory) == (500, 100)
+    assert not owned(memory, REFINERY)
+
+
+@MODES
+def test_unregistered_player(use_transactions):
+    async def scenario():
+        db = AsyncDatabase(MemoryDatabase())
+        status = await ConstructionEngine(db, use_transactions=use_transactions).construct("1", REFINERY)
+        db.close()
+        return status
+
+    assert asyncio.run(scenario()) == NOT_REGISTERED
+
+
+@MODES
+def test_legacy_inventory_is_migrated_and_claimed(use_transactions):
+    async def scenario():
+        memory, db = make_db(legacy=True)
+        status = await ConstructionEngine(db, use_transactions=use_transactions).construct("1", REFINERY)
+        db.close()
+        return memory, status
+
+    memory, status = asyncio.run(scenario())
+    assert status == BUILT
+    assert not inventory.is_legacy(memory["invdata"].find_one({"userid": "1"}))
+    assert owned(memory, REFINERY)
+
+
+@MODES
+def test_already_built_costs_the_claim_and_one_read(use_transactions):
+    async def scenario():
+        memory, db = make_db(steel=5000, oil=5000)
+        engine = ConstructionEngine(db, use_transactions=use_transactions)
+        await engine.construct("1", REFINERY)
+        memory["invdata"].calls = memory["userdata"].calls = 0
+        status = await engine.construct("1", REFINERY)
+        db.close()
+        return memory, status
+
+    memory, status = asyncio.run(scenario())
+    assert status == ALREADY_BUILT
+    assert (memory["invdata"].calls, memory["userdata"].calls) == (2, 0)
+    assert balances(memory) == (4600, 4700)
+
+
+def test_transaction_rolls_back_the_claim_when_the_deduction_fails():
+    async def scenario():
+        memory, db = make_db()
+        userdata = memory["userdata"]
+
+        def broken_update(*args, **kwargs):
+            raise ConnectionError("primary stepped down")
+
+        userdata.update_one = broken_update
+        engine = ConstructionEngine(db, max_retries=0)
+        with pytest.raises(ConnectionError):
+            await engine.construct("1", REFINERY)
+        db.close()
+        return memory
+
+    memory = asyncio.run(scenario())
+    assert not owned(memory, REFINERY)
+    assert balances(memory) == (500, 500)
+
+
+def test_transaction_notifies_write_listeners():
+    async def scenario():
+        memory, db = make_db()
+        seen = []
+        db.add_listener("userdata", lambda op, args, result: seen.append((op, args[1], result.matched_count)))
+        await ConstructionEngine(db).construct("1", REFINERY)
+        db.close()
+        return seen
+
+    assert asyncio.run(scenario()) == [("update_one", {"$inc": {"steel": -400, "oil": -300}}, 1)]
+
+
+@MODES
+def test_schedule_failure_finishes_the_construction(use_transactions):
+    async def scenario():
+        memory, db = make_db()
+        scheduler = FailingScheduler()
+        engine = ConstructionEngine(db, use_transactions=use_transactions, scheduler=scheduler)
+        status = await engine.construct("1", BARRACKS)
+        db.close()
+        return memory, scheduler, status
+
+    memory, scheduler, status = asyncio.run(scenario())
+    assert status == BUILT
+    assert CONSTRUCTION in scheduler.handlers
+    assert owned(memory, BARRACKS)
+    assert memory["invdata"].find_one({"userid": "1"})["timedowns"] == {}
+    assert balances(memory) == (400, 500)
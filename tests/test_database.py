@@ -0,0 +1,38 @@
+import asyncio
+
+from benchmarks.memory_mongo import MemoryDatabase
+from cache import DocumentCache
+from database import AsyncDatabase
+
+
+def cached_db():
+    memory = MemoryDatabase()
+    memory["userdata"].insert_many([{"userid": str(i), "gold": 0} for i in range(3)])
+    cache = DocumentCache()
+    db = AsyncDatabase(memory, cache=cache)
+    for i in range(3):
+        cache.set(("userdata", str(i)), {"userid": str(i), "gold": 0})
+    return db, cache
+
+
+def test_bulk_update_invalidates_only_the_users_it_writes():
+    async def scenario():
+        db, cache = cached_db()
+        await db["userdata"].bulk_update([({"userid": "0"}, {"$inc": {"gold": 5}})], ordered=False)
+        document = await db["userdata"].find_one({"userid": "0"})
+        db.close()
+        return cache, document
+
+    cache, document = asyncio.run(scenario())
+    assert document["gold"] == 5
+    assert ("userdata", "1") in cache.entries and ("userdata", "2") in cache.entries
+
+
+def test_bulk_update_with_an_unkeyed_filter_clears_the_collection():
+    async def scenario():
+        db, cache = cached_db()
+        await db["userdata"].bulk_update([({"userid": "0"}, {"$inc": {"gold": 5}}), ({"gold": 0}, {"$set": {"gold": 1}})])
+        db.close()
+        return cache
+
+    assert not asyncio.run(scenario()).entries
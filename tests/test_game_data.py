@@ -0,0 +1,33 @@
+import asyncio
+import json
+import os
+
+from game_data import GameDataRegistry
+
+
+def write_buildings(path, steel):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"Oil Refinery": {"id": 1, "description": "Refines oil", "Steel": steel}}, f)
+
+
+def test_current_never_reads_the_files_and_check_swaps_in_changes(tmp_path):
+    buildings = tmp_path / "buildings.json"
+    emojis = tmp_path / "emojis.json"
+    emojis.write_text("{}", encoding="utf-8")
+    write_buildings(buildings, 100)
+    registry = GameDataRegistry(buildings_path=str(buildings), emojis_path=str(emojis))
+    registry.load()
+    first = registry.current()
+
+    write_buildings(buildings, 250)
+    os.utime(buildings, ns=(0, 1))
+    assert registry.current() is first
+
+    async def scenario():
+        return await registry.check()
+
+    second = asyncio.run(scenario())
+    assert registry.current() is second
+    assert second.version == first.version + 1
+    assert second.by_name["Oil Refinery"].cost_map["steel"] == 250
+    assert first.by_name["Oil Refinery"].cost_map["steel"] == 100
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from benchmarks.memory_mongo import MemoryDatabase
+from database import AsyncDatabase
+from leaderboard import Leaderboards
+
+
+def test_write_during_refresh_read_is_not_overwritten():
+    async def scenario():
+        memory = MemoryDatabase()
+        memory["userdata"].insert_many([{"userid": "1", "exp": 10}, {"userid": "2", "exp": 20}])
+        db = AsyncDatabase(memory)
+        boards = Leaderboards(db, fields=("exp",))
+        await boards.rebuild()
+
+        userdata = memory["userdata"]
+        read = userdata.find
+
+        def slow_find(*args, **kwargs):
+            # The documents are read first and arrive late, like a slow round-trip
+            documents = read(*args, **kwargs)
+            time.sleep(0.05)
+            return documents
+
+        userdata.find = slow_find
+        boards.dirty.add("1")
+        refresh = asyncio.ensure_future(boards.refresh())
+        await asyncio.sleep(0.01)
+        await db["userdata"].update_one({"userid": "1"}, {"$inc": {"exp": 100}})
+        await refresh
+        during = boards.get("exp").scores["1"], set(boards.dirty)
+        await boards.refresh()
+        db.close()
+        return during, boards.get("exp").scores["1"]
+
+    (score, dirty), settled = asyncio.run(scenario())
+    assert score == 110
+    assert dirty == {"1"}
+    assert settled == 110
+
+
+def test_inserts_during_rebuild_are_refreshed():
+    async def scenario():
+        memory = MemoryDatabase()
+        memory["userdata"].insert_many([{"userid": str(i), "exp": i} for i in range(100)])
+        db = AsyncDatabase(memory)
+        boards = Leaderboards(db, fields=("exp",))
+        rebuild = asyncio.ensure_future(boards.rebuild())
+        await asyncio.sleep(0)
+        await db["userdata"].insert_one({"userid": "new", "exp": 5000})
+        await rebuild
+        db.close()
+        return boards.get("exp").top(1)
+
+    assert asyncio.run(scenario()) == [(1, "new", 5000)]
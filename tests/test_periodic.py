@@ -0,0 +1,32 @@
+import asyncio
+
+from periodic import PeriodicTask
+
+
+def test_keeps_running_after_a_failure_and_wakes_early():
+    async def scenario():
+        calls = []
+
+        async def callback():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise RuntimeError("first round fails")
+
+        periodic = PeriodicTask("Test loop", callback, 0.01)
+        periodic.start()
+        await asyncio.sleep(0.05)
+        await periodic.aclose()
+        after_close = len(calls)
+        await asyncio.sleep(0.03)
+
+        slow = PeriodicTask("Slow loop", callback, 60)
+        slow.start()
+        await asyncio.sleep(0)
+        slow.wake()
+        await asyncio.sleep(0.01)
+        await slow.aclose()
+        return after_close, len(calls)
+
+    after_close, total = asyncio.run(scenario())
+    assert after_close >= 2
+    assert total == after_close + 1
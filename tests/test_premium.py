@@ -0,0 +1,33 @@
+import asyncio
+
+from benchmarks.memory_mongo import MemoryDatabase
+from cache import DocumentCache
+from database import AsyncDatabase
+from leaderboard import Leaderboards
+from premium import PremiumService
+
+
+def test_sweep_writes_through_the_cache_without_staling_leaderboards():
+    async def scenario():
+        memory = MemoryDatabase()
+        memory["userdata"].insert_many([{"userid": "1", "premium": 100, "exp": 5},
+                                        {"userid": "2", "premium": 900, "exp": 7}])
+        cache = DocumentCache()
+        db = AsyncDatabase(memory, cache=cache)
+        boards = Leaderboards(db, fields=("exp",))
+        await boards.rebuild()
+        service = PremiumService(db)
+        before = await db["userdata"].find_one({"userid": "1"})
+        await db["userdata"].find_one({"userid": "2"})
+
+        empty = await service.sweep(50)
+        kept = len(cache.entries)
+        swept = await service.sweep(500)
+        after = await db["userdata"].find_one({"userid": "1"})
+        db.close()
+        return before["premium"], empty, kept, swept, after["premium"], boards.stale
+
+    before, empty, kept, swept, after, stale = asyncio.run(scenario())
+    assert (before, empty, kept) == (100, 0, 2)
+    assert (swept, after) == (1, 0)
+    assert not stale
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+from benchmarks.memory_mongo import MemoryDatabase
+from database import AsyncDatabase
+from timers import CONSTRUCTION, TimerScheduler
+
+
+def test_poll_picks_up_timers_other_processes_schedule():
+    async def scenario():
+        db = AsyncDatabase(MemoryDatabase())
+        fired = []
+
+        async def handler(timers):
+            fired.extend(timer["userid"] for timer in timers)
+
+        primary = TimerScheduler(db["timers"], horizon=300, poll_interval=5)
+        primary.register(CONSTRUCTION, handler)
+        other = TimerScheduler(db["timers"], horizon=300)
+        now = time.time()
+        await primary.refill(now)
+
+        await other.schedule(CONSTRUCTION, "1", 7, now + 10)
+        # Another cluster's timer is not in the primary's heap until it looks
+        missed = await primary.fire_due(now + 20)
+        polled = await primary.poll(now + 5)
+        fired_after_poll = await primary.fire_due(now + 20)
+        db.close()
+        return missed, polled, fired_after_poll, fired
+
+    missed, polled, fired_after_poll, fired = asyncio.run(scenario())
+    assert (missed, polled, fired_after_poll) == (0, 1, 1)
+    assert fired == ["1"]
@@ -0,0 +1,236 @@
+import heapq
+import logging
+import os
+import time
+import uuid
+
+from periodic import PeriodicTask
+
+logger = logging.getLogger("discord")
+
+# Timer kinds; each has one handler registered with TimerScheduler.register()
+CONSTRUCTION = "construction"
+
+# Timers due within this many seconds are held in memory
+DEFAULT_HORIZON = float(os.getenv("TIMER_HORIZON", "300"))
+# How often the firing process looks for timers other processes scheduled (clustered mode)
+DEFAULT_POLL_INTERVAL = float(os.getenv("TIMER_POLL_INTERVAL", "5"))
+DEFAULT_BATCH_SIZE = int(os.getenv("TIMER_BATCH_SIZE", "500"))
+# A claimed timer whose process died is fired again after this long
+CLAIM_LEASE = 120
+RETRY_DELAY = 30
+
+
+class TimerScheduler:
+    """Durable one-shot timers, fired in batches.
+
+    Every pending timer is one document in `timers` keyed by
+    `kind:userid:key`, with a wall-clock `due` and a `state` that the
+    `state_due` index (schema.py) orders. Nothing scans users: the
+    scheduler keeps only the timers due within `horizon` seconds in a
+    min-heap, refilled by one indexed range query every half horizon, and
+    sleeps until the earliest of them.
+
+    Firing claims the due timers with a single `update_many` guarded on
+    `state`, so two processes never fire the same timer, hands each kind's
+    batch to its handler and deletes them once the handler returns. A
+    handler that raises pushes its batch back by RETRY_DELAY; claims left by
+    a crashed process go back to pending after CLAIM_LEASE. Because the
+    documents are the source of truth, timers survive restarts and overdue
+    ones fire on the first pass.
+
+    Only one process runs the loop. Timers that other processes schedule
+    inside its loaded window would otherwise wait for the next refill, up
+    to `horizon / 2` late; with `poll_interval` set, the loop also reads the
+    timers scheduled since its last look, so they fire at most
+    `poll_interval` seconds late.
+    """
+
+    def __init__(self, collection, horizon=DEFAULT_HORIZON, batch_size=DEFAULT_BATCH_SIZE, lease=CLAIM_LEASE,
+                 poll_interval=None):
+        self.collection = collection
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.polled_at = 0.0
+        self.handlers = {}
+        self.heap = []  # (due, timer_id)
+        self.queued = {}  # timer_id -> due currently in the heap
+        self.loaded_until = 0
+        self.next_refill = self.next_poll = 0.0
+        self.runner = PeriodicTask("Timer pass", self._pass, self._next_delay)
+        self.scheduled = 0
+        self.fired = 0
+        self.failed = 0
+        self.refills = 0
+        self.polls = 0
+        self.passes = 0
+
+    def register(self, kind, handler):
+        """`handler(timers)` is awaited with a list of due timer documents of `kind`"""
+        self.handlers[kind] = handler
+
+    @staticmethod
+    def timer_id(kind, user_id, key):
+        return f"{kind}:{user_id}:{key}"
+
+    def _queue(self, timer_id, due):
+        if self.queued.get(timer_id) == due:
+            return
+        self.queued[timer_id] = due
+        heapq.heappush(self.heap, (due, timer_id))
+
+    async def schedule(self, kind, user_id, key, due, payload=None):
+        """Creates or moves the timer; returns its id"""
+        timer_id = self.timer_id(kind, user_id, key)
+        await self.collection.update_one(
+            {"_id": timer_id},
+            {"$set": {"kind": kind, "userid": user_id, "key": key, "due": due,
+                      "payload": payload or {}, "state": "pending", "scheduled_at": time.time()}},
+            upsert=True,
+        )
+        self.scheduled += 1
+        # Later timers are picked up by a refill; sooner ones go straight into the heap
+        if due <= self.loaded_until:
+            earliest = self.heap[0][0] if self.heap else None
+            self._queue(timer_id, due)
+            if earliest is None or due < earliest:
+                self.runner.wake()
+        return timer_id
+
+    async def cancel(self, kind, user_id, key):
+        timer_id = self.timer_id(kind, user_id, key)
+        self.queued.pop(timer_id, None)
+        result = await self.collection.delete_one({"_id": timer_id, "state": "pending"})
+        return bool(result.deleted_count)
+
+    async def refill(self, now=None):
+        """Loads the pending timers due before `now + horizon`"""
+        now = time.time() if now is None else now
+        # Recover claims held by a process that stopped before finishing them
+        await self.collection.update_many(
+            {"state": "firing", "claimed_at": {"$lt": now - self.lease}},
+            {"$set": {"state": "pending"}},
+        )
+        until = now + self.horizon
+        timers = await self.collection.find(
+            {"state": "pending", "due": {"$lte": until}}, {"_id": 1, "due": 1}, sort=[("due", 1)]
+        )
+        for timer in timers:
+            self._queue(timer["_id"], timer["due"])
+        self.loaded_until = until
+        self.polled_at = now
+        self.refills += 1
+        return len(timers)
+
+    async def poll(self, now=None):
+        """Loads the timers scheduled since the last refill or poll that fall inside the loaded window"""
+        now = time.time() if now is None else now
+        # Overlapping the last poll absorbs clock differences between processes; _queue() skips repeats
+        since = self.polled_at - self.poll_interval
+        timers = await self.collection.find(
+            {"state": "pending", "due": {"$lte": self.loaded_until}, "scheduled_at": {"$gte": since}},
+            {"_id": 1, "due": 1},
+        )
+        for timer in timers:
+            self._queue(timer["_id"], timer["due"])
+        self.polled_at = now
+        self.polls += 1
+        return len(timers)
+
+    def _pop_due(self, now):
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now and len(due_ids) < self.batch_size:
+            due, timer_id = heapq.heappop(self.heap)
+            # Stale entry: the timer was cancelled or moved since it was pushed
+            if self.queued.get(timer_id) != due:
+                continue
+            del self.queued[timer_id]
+            due_ids.append(timer_id)
+        return due_ids
+
+    async def fire(self, timer_ids, now=None):
+        """Claims and fires the given timers; returns how many fired"""
+        now = time.time() if now is None else now
+        token = uuid.uuid4().hex
+        await self.collection.update_many(
+            {"_id": {"$in": timer_ids}, "state": "pending", "due": {"$lte": now}},
+            {"$set": {"state": "firing", "token": token, "claimed_at": now}},
+        )
+        # Only the ones this pass claimed; another process may have taken the rest
+        claimed = await self.collection.find({"_id": {"$in": timer_ids}, "token": token})
+        by_kind = {}
+        for timer in claimed:
+            by_kind.setdefault(timer["kind"], []).append(timer)
+
+        done, retry = [], []
+        for kind, timers in by_kind.items():
+            ids = [timer["_id"] for timer in timers]
+            handler = self.handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"no handler registered for timer kind {kind!r}")
+                await handler(timers)
+                done.extend(ids)
+            except Exception as e:
+                logger.error(f"Failed to fire {len(ids)} {kind} timers: {e}", exc_info=True)
+                self.failed += len(ids)
+                retry.extend(ids)
+
+        if done:
+            await self.collection.delete_many({"_id": {"$in": done}, "token": token})
+            self.fired += len(done)
+        if retry:
+            await self.collection.update_many(
+                {"_id": {"$in": retry}, "token": token},
+                {"$set": {"state": "pending", "due": now + RETRY_DELAY}},
+            )
+        return len(done)
+
+    async def fire_due(self, now=None):
+        """Fires everything in the heap that is due, one batch at a time"""
+        now = time.time() if now is None else now
+        fired = 0
+        while True:
+            timer_ids = self._pop_due(now)
+            if not timer_ids:
+                return fired
+            fired += await self.fire(timer_ids, now)
+            self.passes += 1
+
+    async def _pass(self):
+        now = time.time()
+        if now >= self.next_refill:
+            await self.refill(now)
+            self.next_refill = now + self.horizon / 2
+            self.next_poll = now + (self.poll_interval or self.horizon)
+        elif self.poll_interval and now >= self.next_poll:
+            await self.poll(now)
+            self.next_poll = now + self.poll_interval
+        await self.fire_due(now)
+
+    def _next_delay(self):
+        # Sleeps until the next refill, poll or due timer; schedule() wakes it for sooner ones
+        wake_at = min(self.next_refill, self.next_poll) if self.poll_interval else self.next_refill
+        if self.heap:
+            wake_at = min(wake_at, self.heap[0][0])
+        return wake_at - time.time()
+
+    def start(self):
+        return self.runner.start()
+
+    async def aclose(self):
+        await self.runner.aclose()
+
+    def snapshot(self):
+        return {
+            "in_memory": len(self.queued),
+            "next_due": self.heap[0][0] if self.heap else None,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "failed": self.failed,
+            "refills": self.refills,
+            "polls": self.polls,
+            "passes": self.passes,
+        }
@@ -0,0 +1,85 @@
+import os
+import sys
+from collections import OrderedDict
+
+# Most menus tracked at once; the oldest are forgotten first
+DEFAULT_MAX_MENUS = int(os.getenv("VIEW_REGISTRY_MAX", "100000"))
+
+
+class ViewRegistry:
+    """Tracks each user's newest menu per kind and keeps no View alive.
+
+    Menu buttons are DynamicItems, so presses are dispatched from the
+    custom_id alone. `opened()` therefore stops the View right after it was
+    sent, which drops it from discord.py's view store instead of holding
+    one object (and its timeout task) per open menu.
+
+    Every menu kind allows one live menu per user: opening a new one
+    supersedes the previous. Only the snowflake of the interaction or
+    message that opened it is stored. Snowflakes are time-ordered, so a
+    press on a message older than the user's latest open of that kind
+    belongs to a superseded menu. Users without a record (evicted, or
+    after a restart) are let through.
+    """
+
+    def __init__(self, max_menus=DEFAULT_MAX_MENUS):
+        self.max_menus = max_menus
+        self.menus = OrderedDict()  # (kind, user_id) -> snowflake of the open
+        self.opened_count = 0
+        self.superseded = 0
+        self.evictions = 0
+        self.released = 0
+
+    def release(self, view):
+        """Stops `view` so discord.py forgets it; the DynamicItems keep working"""
+        if view is not None and not view.is_finished():
+            view.stop()
+            self.released += 1
+
+    def opened(self, kind, user_id, snowflake, view=None):
+        key = (kind, user_id)
+        previous = self.menus.pop(key, None)
+        self.menus[key] = max(snowflake, previous or 0)
+        self.opened_count += 1
+        while len(self.menus) > self.max_menus:
+            self.menus.popitem(last=False)
+            self.evictions += 1
+        self.release(view)
+
+    def is_superseded(self, kind, user_id, message_id):
+        latest = self.menus.get((kind, user_id))
+        if latest is not None and latest > message_id:
+            self.superseded += 1
+            return True
+        return False
+
+    def closed(self, kind, user_id):
+        self.menus.pop((kind, user_id), None)
+
+    def live_views(self, bot):
+        """Views discord.py still holds, normally only ones sent outside the registry"""
+        store = getattr(getattr(bot, "_connection", None), "_view_store", None)
+        return len(getattr(store, "_views", ())) if store is not None else None
+
+    def snapshot(self, bot=None):
+        by_kind = {}
+        for kind, _ in self.menus:
+            by_kind[kind] = by_kind.get(kind, 0) + 1
+        snapshot = {
+            "menus": len(self.menus),
+            "by_kind": by_kind,
+            "approx_bytes": sys.getsizeof(self.menus) + len(self.menus) * 150,
+            "opened": self.opened_count,
+            "superseded_presses": self.superseded,
+            "evictions": self.evictions,
+            "views_released": self.released,
+        }
+        if bot is not None:
+            snapshot["library_views"] = self.live_views(bot)
+        try:
+            import resource
+            # ru_maxrss is KiB on Linux
+            snapshot["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        except ImportError:
+            pass
+        return snapshot